@@ -1,18 +1,23 @@
 import os
-import time
-import random
-import re
-from urllib.parse import urlparse
 
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+from busqueda import UMBRAL_CONFIANZA, buscar_en_cascada, buscar_sitios_concurrente
+from cache_busquedas import CacheBusquedas
+from http_cliente import obtener_sesion
+from limitador import crear_limitador_cse
+from puntuacion import PuntuadorOficial
+from salida import formatos_desde_entorno, guardar_resultados
+
 # Load API keys from .env
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 CSE_ID = os.getenv("GOOGLE_CSE_ID")
 
+# Limitador compartido por todas las llamadas a Google CSE
+limitador_cse = crear_limitador_cse()
+
 # -----------------------------
 # Funciones de scoring
 # -----------------------------
@@ -30,130 +35,123 @@ def generar_consultas_optimizadas(consulta_original: str):
     return consultas
 
 def es_sitio_oficial(url: str, domain: str, title: str, snippet: str, consulta: str) -> int:
-    score = 0
-    consulta_lower = consulta.lower()
-    domain_lower = domain.lower()
-    title_lower = title.lower()
-    snippet_lower = snippet.lower()
-    
-    consulta_base = re.sub(r'\b(software|hardware|inc|corp|ltd|llc|sa|srl|gmbh|ag)\b', '', consulta_lower).strip()
-    palabras_consulta = [p for p in consulta_base.split() if len(p) > 2]
-
-    for palabra in palabras_consulta:
-        if palabra in domain_lower:
-            score += 25
-    if any(domain_lower.startswith(f"{palabra}.") or f".{palabra}." in domain_lower for palabra in palabras_consulta):
-        score += 40
-    if domain.endswith(('.com', '.net', '.org', '.io', '.tech')):
-        score += 15
-    social_platforms = [
-        'facebook.com', 'twitter.com', 'linkedin.com', 'youtube.com', 'instagram.com',
-        'wikipedia.org', 'crunchbase.com', 'bloomberg.com', 'reuters.com',
-        'amazon.com', 'ebay.com', 'alibaba.com', 'github.com'
-    ]
-    for platform in social_platforms:
-        if platform in domain_lower:
-            score -= 30
-            break
-    official_words = ['official', 'homepage', 'home page', 'corporate', 'company']
-    if any(word in title_lower for word in official_words):
-        score += 10
-    palabras_en_titulo = sum(1 for palabra in palabras_consulta if palabra in title_lower)
-    score += palabras_en_titulo * 5
-    subdomain_penalties = ['support.', 'help.', 'docs.', 'forum.', 'community.', 'blog.']
-    if any(sub in domain_lower for sub in subdomain_penalties):
-        score -= 10
-    if url.count('/') > 3:
-        score -= 5
-    if url.startswith('https://'):
-        score += 5
-    return max(0, min(100, score))
-
-def seleccionar_mejor_url_oficial(consulta: str, candidatos):
+    """Score 0-100 de un candidato; para varios candidatos usar un único PuntuadorOficial"""
+    return PuntuadorOficial(consulta).puntuar(url, domain, title, snippet)
+
+def seleccionar_mejor_url_oficial(consulta: str, candidatos, puntuador=None):
     if not candidatos:
         return None, "sin candidatos"
-    scored_candidates = []
-    for item in candidatos:
-        url = item.get("href", "")
-        title = item.get("title", "")
-        snippet = item.get("snippet", "")
-        domain = item.get("displayLink", "")
-        if not url:
-            continue
-        score = es_sitio_oficial(url, domain, title, snippet, consulta)
-        scored_candidates.append({"score": score, "url": url, "domain": domain})
-    if not scored_candidates:
+    mejor = (puntuador or PuntuadorOficial(consulta)).mejor(candidatos)
+    if mejor is None:
         return None, "sin candidatos válidos"
-    scored_candidates.sort(key=lambda x: x['score'], reverse=True)
-    best = scored_candidates[0]
-    return best['url'], f"score {best['score']}, domain: {best['domain']}"
+    score, _, best = mejor
+    return best['href'], f"score {score}, domain: {best.get('displayLink', '')}"
 
 # -----------------------------
 # Function for Google CSE
 # -----------------------------
-def buscar_con_google_cse_multiples(consultas):
+def buscar_con_google_cse_multiples(consultas, cache=None, limitador=None, registro=None):
+    limitador = limitador or limitador_cse
     todos_candidatos = []
     urls_vistas = set()
     for query in consultas[:3]:  # hasta 3 consultas
-        try:
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                'key': API_KEY,
-                'cx': CSE_ID,
-                'q': query,
-                'num': 5,
-                'safe': 'medium'
-            }
-            response = requests.get(url, params=params, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                for item in data.get('items', []):
-                    href = item.get("link", "")
-                    if href and href not in urls_vistas:
-                        candidato = {
-                            "title": item.get("title", ""),
-                            "href": href,
-                            "snippet": item.get("snippet", ""),
-                            "displayLink": item.get("displayLink", "")
-                        }
-                        todos_candidatos.append(candidato)
-                        urls_vistas.add(href)
-            elif response.status_code == 429:
-                print("Rate limit, esperando 30s...")
-                time.sleep(30)
-            time.sleep(1)
-        except Exception as e:
-            print(f"Error en consulta '{query}': {e}")
+        items = cache.obtener(query) if cache is not None else None
+        if items is None:
+            try:
+                url = "https://www.googleapis.com/customsearch/v1"
+                params = {
+                    'key': API_KEY,
+                    'cx': CSE_ID,
+                    'q': query,
+                    'num': 5,
+                    'safe': 'medium'
+                }
+                response = limitador.ejecutar(lambda: obtener_sesion("cse").get(url, params=params, timeout=15))
+                if registro is not None:
+                    registro.append(query)
+                if response.status_code == 200:
+                    items = response.json().get('items', [])
+                    if cache is not None:
+                        cache.guardar(query, items)
+                elif response.status_code == 429:
+                    print(f"Rate limit persistente en consulta '{query}'")
+            except Exception as e:
+                print(f"Error en consulta '{query}': {e}")
+        for item in items or []:
+            href = item.get("link", "")
+            if href and href not in urls_vistas:
+                candidato = {
+                    "title": item.get("title", ""),
+                    "href": href,
+                    "snippet": item.get("snippet", ""),
+                    "displayLink": item.get("displayLink", "")
+                }
+                todos_candidatos.append(candidato)
+                urls_vistas.add(href)
     return todos_candidatos
 
+def buscar_consulta_registrada(query, cache=None):
+    """Candidatos de una consulta y cuántas peticiones a CSE costó (para `buscar_en_cascada`)"""
+    registro = []
+    candidatos = buscar_con_google_cse_multiples([query], cache, registro=registro)
+    return candidatos, len(registro)
+
+def buscar_sitio_oficial(consulta, cache=None, umbral=UMBRAL_CONFIANZA):
+    """Búsqueda en cascada: corta cuando un candidato alcanza `umbral`; devuelve (url, notas, consultas_usadas)"""
+    consultas = generar_consultas_optimizadas(consulta)[:3]
+    puntuador = PuntuadorOficial(consulta)
+    candidatos, usadas = buscar_en_cascada(
+        consultas,
+        lambda query: buscar_consulta_registrada(query, cache),
+        puntuador.puntuar_candidato,
+        umbral
+    )
+    url, notas = seleccionar_mejor_url_oficial(consulta, candidatos, puntuador)
+    return url, notas, usadas
+
 # -----------------------------
 # Main flow
 # -----------------------------
 def main():
     input_excel = "./app/input.xlsx"
-    output_excel = "./app/output_con_urls.xlsx"
+    output_base = "./app/output_con_urls"  # + extensión de cada formato (VERIFICACION_FORMATOS)
+    formatos = formatos_desde_entorno()
 
     df = pd.read_excel(input_excel)
     df['url_oficial'] = None
     df['notas_busqueda'] = None
+    df['consultas_usadas'] = None
+    cache = CacheBusquedas()
 
+    consultas_por_fila = {}
     for idx, row in df.iterrows():
         consulta = str(row[df.columns[0]]).strip()
         if not consulta:
             df.at[idx, 'notas_busqueda'] = "consulta vacía"
             continue
+        consultas_por_fila[idx] = consulta
 
-        print(f"\nBuscando sitio oficial de: {consulta}")
-        consultas = generar_consultas_optimizadas(consulta)
-        candidatos = buscar_con_google_cse_multiples(consultas)
-        url, notas = seleccionar_mejor_url_oficial(consulta, candidatos)
+    print(f"\nBuscando sitio oficial de {len(consultas_por_fila)} empresas...")
+    resultados = buscar_sitios_concurrente(
+        consultas_por_fila, lambda consulta: buscar_sitio_oficial(consulta, cache)
+    )
+    for idx, (url, notas, usadas) in resultados.items():
+        df.at[idx, 'consultas_usadas'] = usadas
         df.at[idx, 'url_oficial'] = url
         df.at[idx, 'notas_busqueda'] = notas
-        print(f"→ {url} ({notas})")
-        time.sleep(random.uniform(2,4))  # delay entre consultas
+        print(f"{consultas_por_fila[idx]} → {url} ({notas})")
+
+    print(f"Consultas usadas: {sum(r[2] for r in resultados.values())} para {len(resultados)} empresas")
+    stats_cache = cache.estadisticas()
+    print(f"Caché de búsquedas: {stats_cache['aciertos']} aciertos, {stats_cache['fallos']} fallos")
+    cache.cerrar()
+    stats_limitador = limitador_cse.resumen()
+    print(f"Limitador CSE: {stats_limitador['peticiones']} peticiones, "
+          f"{stats_limitador['segundos_esperando_fichas'] + stats_limitador['segundos_en_backoff']:.1f}s en espera")
 
-    df.to_excel(output_excel, index=False)
-    print(f"\n✅ Resultados guardados en '{output_excel}'")
+    print()
+    for ruta in guardar_resultados(df, output_base, formatos):
+        print(f"✅ Resultados guardados en '{ruta}'")
 
 if __name__ == "__main__":
     main()
@@ -1,16 +1,30 @@
 import os
-import time
-import random
-import re
-from urllib.parse import urlparse
+import threading
+from itertools import chain
 from difflib import SequenceMatcher
 
 import pandas as pd
 import requests
 from dotenv import load_dotenv
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from urllib.parse import urlparse
+
+from busqueda import UMBRAL_CONFIANZA, buscar_en_cascada, buscar_sitios_concurrente, resolver_por_dominio
+from cache_busquedas import CacheBusquedas, normalizar_consulta
+from categorizacion import categorizar, categorizar_columna
+from checkpoints import Checkpoint, huella_archivo
+from estado import EstadoVerificacion
+from deduplicacion import detectar_duplicados_bloques
+from http_cliente import estadisticas_dns, obtener_sesion
+from instrumentacion import CronometroFases, activar, guardar_reporte, instrumentar
+from limitador import crear_limitador_cse
+from normalizacion import limpiar_columna, limpiar_nombre
+from paralelo import detectar_duplicados_paralelo, limpiar_columna_paralelo, procesos_desde_entorno
+from pipeline import EtapaLotes
+from salida import EXTENSIONES, EscritorBloques, formatos_desde_entorno, guardar_resultados
+from salida_excel import rellenos_por_estado
+from puntuacion import PuntuadorOficial
+from streaming import (ENCODINGS, TAMANO_BLOQUE, detectar_encoding, escribir_bloques, etapa_busqueda,
+                       etapa_categorizacion, etapa_verificacion, leer_en_bloques)
+from verificacion import VerificadorContinuo, control_desde_entorno, estadisticas_sondeo, pedir_url, sondear_url
 
 # Cargar API keys desde .env
 try:
@@ -23,6 +37,12 @@ except Exception as e:
     API_KEY = None
     CSE_ID = None
 
+# Endpoint de Google CSE (los benchmarks lo apuntan a un servidor local)
+URL_CSE = "https://www.googleapis.com/customsearch/v1"
+
+# Limitador compartido por todas las llamadas a Google CSE
+limitador_cse = crear_limitador_cse()
+
 # -----------------------------
 # Funciones de detección de duplicados
 # -----------------------------
@@ -31,30 +51,25 @@ def similarity(a, b):
     return SequenceMatcher(None, a.lower().strip(), b.lower().strip()).ratio()
 
 def limpiar_nombre_empresa(nombre):
-    """Limpia el nombre de la empresa para comparación"""
-    if pd.isna(nombre):
-        return ""
-    
-    # Convertir a string y limpiar
-    nombre = str(nombre).lower().strip()
-    
-    # Remover sufijos corporativos comunes
-    sufijos = [
-        r'\b(inc|corp|corporation|ltd|limited|llc|llp|lp|co|company|enterprises|group|holding|international|global|worldwide|systems|solutions|software|technologies|technology|tech|services|consulting|digital|media|studios|games|entertainment|publishing|publishers|hardware|computers|computing)\b',
-        r'\b(gmbh|ag|sa|srl|spa|bv|nv|oy|ab|as|\&|\+|\.|,)\b'
-    ]
-    
-    for sufijo in sufijos:
-        nombre = re.sub(sufijo, '', nombre)
-    
-    # Remover caracteres especiales y espacios extra
-    nombre = re.sub(r'[^\w\s]', ' ', nombre)
-    nombre = re.sub(r'\s+', ' ', nombre).strip()
-    
-    return nombre
+    """Limpia el nombre de la empresa para comparación (patrones precompilados y memoizados)"""
+    return limpiar_nombre(nombre)
+
+@instrumentar()
+def detectar_duplicados(df, name_col, threshold=0.85, metodo="bloques", procesos=1):
+    """Detecta empresas duplicadas basándose en similaridad de nombres
+
+    metodo="bloques" limpia cada nombre una sola vez y sólo compara pares que
+    comparten n-gramas (ver deduplicacion.py); metodo="exhaustivo" es la
+    comparación original todos contra todos. Con procesos > 1 la limpieza y
+    la búsqueda de pares se reparten en un pool de procesos (ver paralelo.py).
+    """
+    if metodo == "bloques":
+        if procesos > 1:
+            nombres = limpiar_columna_paralelo(df[name_col], procesos).tolist()
+            return detectar_duplicados_paralelo(nombres, threshold, procesos)
+        nombres = limpiar_columna(df[name_col]).tolist()
+        return detectar_duplicados_bloques(nombres, threshold)
 
-def detectar_duplicados(df, name_col, threshold=0.85):
-    """Detecta empresas duplicadas basándose en similaridad de nombres"""
     duplicados = []
     procesados = set()
     
@@ -90,104 +105,10 @@ def detectar_duplicados(df, name_col, threshold=0.85):
 # -----------------------------
 # Funciones de categorización
 # -----------------------------
+@instrumentar()
 def categorizar_empresa(nombre, website=""):
-    """Categoriza una empresa basándose en su nombre y website"""
-    if pd.isna(nombre):
-        return "Unknown", "No data"
-    
-    nombre = str(nombre).lower()
-    website = str(website).lower() if not pd.isna(website) else ""
-    texto_completo = f"{nombre} {website}"
-    
-    # Palabras clave para categorización
-    categorias = {
-        # Publisher categories
-        "Game Publisher": [
-            "games", "gaming", "entertainment", "studios", "interactive", "digital entertainment",
-            "game", "publisher", "publishing", "media", "activision", "electronic arts", "ubisoft"
-        ],
-        "Book Publisher": [
-            "books", "publishing", "publications", "press", "editorial", "penguin", "harper",
-            "macmillan", "scholastic", "textbook", "academic press"
-        ],
-        "Software Publisher": [
-            "software", "applications", "apps", "programs", "development", "dev", "solutions",
-            "microsoft", "adobe", "autodesk", "oracle"
-        ],
-        "Media Publisher": [
-            "media", "news", "magazine", "newspaper", "broadcast", "streaming", "content",
-            "netflix", "disney", "warner", "paramount"
-        ],
-        
-        # Hardware categories
-        "Computer Hardware": [
-            "computers", "pc", "laptop", "desktop", "workstation", "server", "dell", "hp",
-            "lenovo", "asus", "acer", "apple computer"
-        ],
-        "Components Provider": [
-            "components", "parts", "processors", "cpu", "gpu", "memory", "storage", "motherboard",
-            "intel", "amd", "nvidia", "corsair", "kingston", "seagate", "western digital"
-        ],
-        "Network Hardware": [
-            "network", "networking", "router", "switch", "firewall", "wireless", "wifi",
-            "cisco", "netgear", "tp-link", "ubiquiti", "juniper"
-        ],
-        "Mobile Hardware": [
-            "mobile", "smartphone", "tablet", "phone", "cellular", "samsung", "apple iphone",
-            "huawei", "xiaomi", "oneplus"
-        ],
-        
-        # Service categories
-        "Cloud Services": [
-            "cloud", "hosting", "datacenter", "infrastructure", "saas", "paas", "iaas",
-            "amazon aws", "google cloud", "microsoft azure", "digitalocean"
-        ],
-        "IT Services": [
-            "consulting", "services", "integration", "support", "managed services",
-            "ibm services", "accenture", "capgemini", "tcs"
-        ],
-        "Security Provider": [
-            "security", "cybersecurity", "antivirus", "firewall", "encryption", "norton",
-            "mcafee", "symantec", "kaspersky", "palo alto"
-        ]
-    }
-    
-    # Buscar coincidencias
-    puntuaciones = {}
-    for categoria, palabras in categorias.items():
-        score = 0
-        for palabra in palabras:
-            if palabra in texto_completo:
-                # Dar más peso si aparece en el nombre
-                if palabra in nombre:
-                    score += 3
-                else:
-                    score += 1
-        puntuaciones[categoria] = score
-    
-    # Encontrar la mejor categoría
-    if puntuaciones:
-        mejor_categoria = max(puntuaciones.items(), key=lambda x: x[1])
-        if mejor_categoria[1] > 0:
-            # Generar descripción corta
-            categoria = mejor_categoria[0]
-            if "Publisher" in categoria:
-                tipo = "Publisher"
-                descripcion = categoria.replace(" Publisher", "").replace("_", " ")
-            elif "Hardware" in categoria or "Provider" in categoria:
-                tipo = "Hardware Provider"
-                descripcion = categoria.replace(" Hardware", "").replace(" Provider", "").replace("_", " ")
-            elif "Services" in categoria:
-                tipo = "Service Provider"
-                descripcion = categoria.replace(" Services", "").replace(" Provider", "").replace("_", " ")
-            else:
-                tipo = "Other"
-                descripcion = categoria.replace("_", " ")
-            
-            return tipo, descripcion[:50]  # Limitar a 50 caracteres
-    
-    # Categoría por defecto
-    return "Unknown", "Unclassified"
+    """Categoriza una empresa basándose en su nombre y website (tabla precompilada en categorizacion.py)"""
+    return categorizar(nombre, website)
 
 # -----------------------------
 # Funciones de scoring para búsqueda
@@ -205,146 +126,127 @@ def generar_consultas_optimizadas(consulta_original: str):
     ]
     return consultas
 
-def es_sitio_oficial(url: str, domain: str, title: str, snippet: str, consulta: str) -> int:
-    score = 0
-    consulta_lower = consulta.lower()
-    domain_lower = domain.lower()
-    title_lower = title.lower()
-    snippet_lower = snippet.lower()
-    
-    consulta_base = re.sub(r'\b(software|hardware|inc|corp|ltd|llc|sa|srl|gmbh|ag)\b', '', consulta_lower).strip()
-    palabras_consulta = [p for p in consulta_base.split() if len(p) > 2]
-
-    # Palabra en dominio
-    for palabra in palabras_consulta:
-        if palabra in domain_lower:
-            score += 25
-    
-    # Dominio exacto
-    if any(domain_lower.startswith(f"{palabra}.") or f".{palabra}." in domain_lower for palabra in palabras_consulta):
-        score += 40
-    
-    # TLD común
-    if domain.endswith(('.com', '.net', '.org', '.io', '.tech', '.sl')):
-        score += 15
-    
-    # Penalizar plataformas sociales
-    social_platforms = [
-        'facebook.com', 'twitter.com', 'linkedin.com', 'youtube.com', 'instagram.com',
-        'wikipedia.org', 'crunchbase.com', 'bloomberg.com', 'reuters.com',
-        'amazon.com', 'ebay.com', 'alibaba.com', 'github.com'
-    ]
-    for platform in social_platforms:
-        if platform in domain_lower:
-            score -= 30
-            break
-    
-    # Palabras oficiales en título
-    official_words = ['official', 'homepage', 'home page', 'corporate', 'company']
-    if any(word in title_lower for word in official_words):
-        score += 10
-    
-    # Palabras de consulta en título
-    palabras_en_titulo = sum(1 for palabra in palabras_consulta if palabra in title_lower)
-    score += palabras_en_titulo * 5
-    
-    # Penalizar subdominios
-    subdomain_penalties = ['support.', 'help.', 'docs.', 'forum.', 'community.', 'blog.']
-    if any(sub in domain_lower for sub in subdomain_penalties):
-        score -= 10
-    
-
-
-# Penalizar URLs profundas excepto si contienen /#/
-def calcular_score(url, score):
-    parsed = urlparse(url)
-    path = parsed.path
+# Mismas reglas que el scoring genérico, sumando el TLD .sl
+class PuntuadorSitio(PuntuadorOficial):
+    TLDS = PuntuadorOficial.TLDS + ('.sl',)
 
-    if url.count('/') > 3 and '/#/' not in path:
-        score -= 5
 
-    if url.startswith('https://'):
-        score += 5
-
-    return max(0, min(100, score))
+def es_sitio_oficial(url: str, domain: str, title: str, snippet: str, consulta: str) -> int:
+    """Score 0-100 de un candidato; para varios candidatos usar un único PuntuadorSitio"""
+    return PuntuadorSitio(consulta).puntuar(url, domain, title, snippet)
 
 
-def seleccionar_mejor_url_oficial(consulta: str, candidatos):
+def seleccionar_mejor_url_oficial(consulta: str, candidatos, puntuador=None):
     if not candidatos:
         return None, "no candidates"
     
-    scored_candidates = []
-    for item in candidatos:
-        url = item.get("href", "")
-        title = item.get("title", "")
-        snippet = item.get("snippet", "")
-        domain = item.get("displayLink", "")
-        
-        if not url:
-            continue
-        
-        score = es_sitio_oficial(url, domain, title, snippet, consulta)
-        scored_candidates.append({"score": score, "url": url, "domain": domain})
-    
-    if not scored_candidates:
+    puntuador = puntuador or PuntuadorSitio(consulta)
+    mejor = puntuador.mejor(candidatos)
+    if mejor is None:
         return None, "no valid candidates"
     
-    scored_candidates.sort(key=lambda x: x['score'], reverse=True)
-    best = scored_candidates[0]
-    return best['url'], f"score {best['score']}, domain: {best['domain']}"
+    score, _, best = mejor
+    return best['href'], f"score {score}, domain: {best.get('displayLink', '')}"
 
 # -----------------------------
 # Función para Google CSE
 # -----------------------------
-def buscar_con_google_cse_multiples(consultas):
-    # Verificar que las API keys estén disponibles
-    if not API_KEY or not CSE_ID:
-        print("❌ Google API keys not found. Skipping search.")
-        return []
-    
+@instrumentar("cse.peticion")
+def _pedir_cse(url, params):
+    """Una petición HTTP a la API (se mide aparte de la espera en el limitador)"""
+    return obtener_sesion("cse").get(url, params=params, timeout=15)
+
+@instrumentar()
+def buscar_con_google_cse_multiples(consultas, cache=None, limitador=None, registro=None):
+    """Consulta Google CSE; con `cache` (CacheBusquedas) sólo se llama a la API en los fallos.
+
+    Todas las llamadas pasan por `limitador` (por defecto el compartido `limitador_cse`).
+    Si se pasa `registro` (lista), se agrega cada consulta que llegó a la API.
+    """
+    limitador = limitador or limitador_cse
     todos_candidatos = []
     urls_vistas = set()
     
     for query in consultas[:3]:  # hasta 3 consultas
-        try:
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                'key': API_KEY,
-                'cx': CSE_ID,
-                'q': query,
-                'num': 5,
-                'safe': 'medium'
-            }
-            
-            response = requests.get(url, params=params, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                for item in data.get('items', []):
-                    href = item.get("link", "")
-                    if href and href not in urls_vistas:
-                        candidato = {
-                            "title": item.get("title", ""),
-                            "href": href,
-                            "snippet": item.get("snippet", ""),
-                            "displayLink": item.get("displayLink", "")
-                        }
-                        todos_candidatos.append(candidato)
-                        urls_vistas.add(href)
-            elif response.status_code == 429:
-                print("Rate limit, esperando 30s...")
-                time.sleep(30)
-            
-            time.sleep(1)  # delay entre consultas
-        except Exception as e:
-            print(f"Error en consulta '{query}': {e}")
+        items = cache.obtener(query) if cache is not None else None
+        
+        if items is None:
+            # Verificar que las API keys estén disponibles
+            if not API_KEY or not CSE_ID:
+                print("❌ Google API keys not found. Skipping search.")
+                break
+            try:
+                url = URL_CSE
+                params = {
+                    'key': API_KEY,
+                    'cx': CSE_ID,
+                    'q': query,
+                    'num': 5,
+                    'safe': 'medium'
+                }
+                
+                response = limitador.ejecutar(lambda: _pedir_cse(url, params))
+                if registro is not None:
+                    registro.append(query)
+                if response.status_code == 200:
+                    items = response.json().get('items', [])
+                    if cache is not None:
+                        cache.guardar(query, items)
+                elif response.status_code == 429:
+                    print(f"Rate limit persistente en consulta '{query}'")
+                
+            except Exception as e:
+                print(f"Error en consulta '{query}': {e}")
+        
+        for item in items or []:
+            href = item.get("link", "")
+            if href and href not in urls_vistas:
+                candidato = {
+                    "title": item.get("title", ""),
+                    "href": href,
+                    "snippet": item.get("snippet", ""),
+                    "displayLink": item.get("displayLink", "")
+                }
+                todos_candidatos.append(candidato)
+                urls_vistas.add(href)
     
     return todos_candidatos
 
+def buscar_consulta_registrada(query, cache=None):
+    """Candidatos de una consulta y cuántas peticiones a CSE costó (para `buscar_en_cascada`)"""
+    registro = []
+    candidatos = buscar_con_google_cse_multiples([query], cache, registro=registro)
+    return candidatos, len(registro)
+
+@instrumentar()
+def buscar_sitio_oficial(consulta, cache=None, umbral=UMBRAL_CONFIANZA):
+    """Busca el sitio oficial de una empresa; devuelve (url, notas, consultas_usadas)
+
+    Las consultas se lanzan en cascada y se corta en cuanto un candidato
+    alcanza `umbral` (umbral=None lanza siempre las 3).
+    """
+    consultas = generar_consultas_optimizadas(consulta)[:3]
+    puntuador = PuntuadorSitio(consulta)
+    candidatos, usadas = buscar_en_cascada(
+        consultas,
+        lambda query: buscar_consulta_registrada(query, cache),
+        puntuador.puntuar_candidato,
+        umbral
+    )
+    url, notas = seleccionar_mejor_url_oficial(consulta, candidatos, puntuador)
+    return url, notas, usadas
+
 # -----------------------------
 # Función para verificar URLs (modificada para True/False)
 # -----------------------------
-def verificar_url(url):
-    """Verifica si una URL es accesible y funciona correctamente"""
+@instrumentar()
+def verificar_url(url, modo="sonda", registro=None):
+    """Verifica si una URL es accesible y funciona correctamente
+
+    modo="sonda" pide HEAD (y GET en streaming si el servidor lo rechaza) sin
+    descargar la página; modo="get" descarga la página completa como antes.
+    `registro` (lista opcional) acumula bytes y latencia de cada sondeo.
+    """
     if pd.isna(url) or not str(url).strip():
         return False, "Empty URL"
     
@@ -355,11 +257,14 @@ def verificar_url(url):
         url_str = 'http://' + url_str
     
     try:
-        response = requests.get(url_str, timeout=10, allow_redirects=True)
-        if response.status_code == 404:
+        if modo == "sonda":
+            status_code = sondear_url(url_str, timeout=10, registro=registro)
+        else:
+            status_code = pedir_url(url_str, timeout=10, registro=registro)
+        if status_code == 404:
             return False, "Error 404"
-        elif response.status_code >= 400:
-            return False, f"Error {response.status_code}"
+        elif status_code >= 400:
+            return False, f"Error {status_code}"
         else:
             return True, "OK"
     except requests.exceptions.Timeout:
@@ -371,13 +276,154 @@ def verificar_url(url):
     except Exception as e:
         return False, f"General Error: {str(e)[:50]}"
 
+# -----------------------------
+# Detección de columnas
+# -----------------------------
+def detectar_columnas(columnas):
+    """Devuelve (name_col, website_col); website_col es None si no hay columna de URL"""
+    name_col = None
+    website_col = None
+    
+    for col in columnas:
+        col_lower = col.lower()
+        if any(word in col_lower for word in ['company', 'name', 'publisher', 'empresa', 'nombre']):
+            if name_col is None:
+                name_col = col
+        elif any(word in col_lower for word in ['website', 'url', 'site', 'web', 'sitio']):
+            if website_col is None:
+                website_col = col
+    
+    if name_col is None:
+        name_col = columnas[0]  # usar primera columna como fallback
+        print(f"Using '{name_col}' as name column")
+    
+    return name_col, website_col
+
+# -----------------------------
+# Modo streaming (listas muy grandes)
+# -----------------------------
+def main_streaming(input_file, output_base, tamano_bloque=TAMANO_BLOQUE, formatos=("csv",),
+                   incremental=False, max_edad_horas=24):
+    """Procesa el CSV por bloques (búsqueda, verificación, categorización) y escribe la salida incrementalmente.
+
+    `formatos` admite csv, parquet y arrow (el Excel no se puede escribir por
+    bloques). No detecta duplicados: eso requiere comparar todas las filas entre sí.
+    Con `incremental` no se vuelven a pedir los sitios verificados OK hace menos
+    de `max_edad_horas` (ver EstadoVerificacion).
+    """
+    formatos = [f for f in formatos if f != "xlsx"] or ["csv"]
+    encoding = detectar_encoding(input_file)
+    if encoding is None:
+        print("❌ Could not detect the CSV encoding. Please check the file.")
+        return
+    print(f"Streaming '{input_file}' ({encoding}) in chunks of {tamano_bloque} rows...")
+    
+    bloques = leer_en_bloques(input_file, encoding, tamano_bloque)
+    primero = next(bloques, None)
+    if primero is None:
+        print("❌ Input file is empty")
+        return
+    
+    name_col, website_col = detectar_columnas(primero.columns)
+    bloques = chain([primero], bloques)
+    if website_col is None:
+        website_col = 'Website'  # crear nueva columna
+        bloques = (bloque.assign(**{website_col: None}) for bloque in bloques)
+        print(f"Creating new column '{website_col}'")
+    print(f"Name column: {name_col}")
+    print(f"Website column: {website_col}")
+    
+    cache = CacheBusquedas()
+    totales = {"bloques": 0, "encontradas": 0, "funcionando": 0, "con_errores": 0}
+    
+    def al_escribir(bloque):
+        totales["bloques"] += 1
+        totales["encontradas"] += int(bloque['found_url'].notna().sum())
+        totales["funcionando"] += int((bloque['url_works'] == "True").sum())
+        totales["con_errores"] += int(((bloque['url_works'] == "False")
+                                       & (bloque['verification_status'] != "No URL")).sum())
+        print(f"Chunk {totales['bloques']}: rows {bloque.index[0] + 1}-{bloque.index[-1] + 1} written")
+    
+    # Cadena de generadores: cada bloque recorre todas las etapas antes de leer el siguiente
+    bloques = etapa_busqueda(
+        bloques, name_col, website_col,
+        lambda consulta: buscar_sitio_oficial(consulta, cache),
+        resolver=lambda consultas: resolver_por_dominio(consultas, es_sitio_oficial)
+    )
+    historial = EstadoVerificacion(max_edad=max_edad_horas * 3600) if incremental else None
+    # Un solo control para todos los bloques: el nivel aprendido no se pierde entre bloques
+    control = control_desde_entorno()
+    bloques = etapa_verificacion(bloques, website_col, cache=historial, control=control)
+    bloques = etapa_categorizacion(bloques, name_col, website_col)
+    escritores = [EscritorBloques(output_base + EXTENSIONES[f], f) for f in formatos]
+    filas = escribir_bloques(bloques, escritores, al_escribir)
+    cache.cerrar()
+    if historial is not None:
+        historial.cerrar()
+    
+    print(f"\n📊 Total records: {filas}")
+    print(f"🔍 Found URLs (new): {totales['encontradas']}")
+    print(f"✅ Working URLs: {totales['funcionando']}")
+    print(f"❌ URLs with errors: {totales['con_errores']}")
+    for escritor in escritores:
+        print(f"📁 File saved: '{escritor.ruta}'")
+
+# -----------------------------
+# Reporte de rendimiento
+# -----------------------------
+def guardar_reporte_corrida(ruta, cronometro, **extra):
+    """Cierra la última fase y vuelca el reporte JSON con limitador, caché DNS y sondeo escalonado"""
+    cronometro.terminar()
+    guardar_reporte(ruta, limitador=limitador_cse.resumen(), dns=dict(estadisticas_dns),
+                    sondeo=dict(estadisticas_sondeo), **extra)
+    print(f"📈 Performance report saved: '{ruta}'")
+
 # -----------------------------
 # Función principal
 # -----------------------------
-def main():
+def main(incremental=None, max_edad_horas=None, tamano_bloque=None):
+    """Corrida completa sobre publishers.csv.
+
+    Con incremental=True (o VERIFICACION_INCREMENTAL=1) sólo se buscan los
+    nombres nuevos y sólo se vuelven a verificar las URLs nuevas, fallidas o
+    verificadas hace más de `max_edad_horas` (VERIFICACION_MAX_EDAD_HORAS, 24
+    por defecto); el resto se copia de las corridas anteriores. Los nombres
+    sin sitio encontrado o buscados hace más de VERIFICACION_MAX_EDAD_BUSQUEDAS_HORAS
+    (720 por defecto) se vuelven a buscar.
+    
+    Con tamano_bloque (o VERIFICACION_TAMANO_BLOQUE) se usa el modo streaming
+    (`main_streaming`), que escribe un CSV en vez del Excel.
+    
+    VERIFICACION_FORMATOS elige los formatos de salida, separados por comas:
+    xlsx (por defecto), parquet, arrow y/o csv (ver salida.py).
+    
+    Las verificaciones se guardan por sitio (URL canónica) en
+    estado_verificacion.sqlite; sólo el modo incremental las reutiliza, y
+    sólo los OK: los errores se vuelven a verificar siempre.
+    
+    VERIFICACION_PROCESOS=N (o "auto") reparte la detección de duplicados
+    entre N procesos.
+    
+    VERIFICACION_CONCURRENCIA=fija desactiva el ajuste automático de
+    peticiones en vuelo (por defecto "adaptativa", ver ControlConcurrencia).
+    
+    Con VERIFICACION_REPORTE=<ruta.json> se activa la instrumentación y al
+    final se escribe un reporte con el tiempo de cada fase, latencias
+    p50/p95/p99 de las funciones calientes, contadores y esperas del limitador.
+    """
+    ruta_reporte = os.getenv("VERIFICACION_REPORTE")
+    if ruta_reporte:
+        activar()
+    cronometro = CronometroFases()
+    
+    if incremental is None:
+        incremental = os.getenv("VERIFICACION_INCREMENTAL", "0") == "1"
+    if max_edad_horas is None:
+        max_edad_horas = float(os.getenv("VERIFICACION_MAX_EDAD_HORAS", "24"))
+    
     # Configuración de archivos
     input_file = "./app/publishers.csv"  # Archivo CSV de entrada
-    output_excel = "./app/publishers_verified.xlsx"
+    output_base = "./app/publishers_verified"  # + extensión de cada formato
     
     # Verificar que el archivo de entrada existe
     if not os.path.exists(input_file):
@@ -385,11 +431,26 @@ def main():
         print("Please make sure the CSV file exists in the correct location.")
         return
     
+    if tamano_bloque is None and os.getenv("VERIFICACION_TAMANO_BLOQUE"):
+        tamano_bloque = int(os.getenv("VERIFICACION_TAMANO_BLOQUE"))
+    # Se valida antes de empezar para no fallar recién al guardar
+    formatos = formatos_desde_entorno("csv" if tamano_bloque else "xlsx")
+    if tamano_bloque:
+        # Las etapas se intercalan bloque a bloque: una sola fase, el detalle está en las latencias
+        cronometro.fase("streaming")
+        main_streaming(input_file, output_base, tamano_bloque, formatos, incremental, max_edad_horas)
+        if ruta_reporte:
+            guardar_reporte_corrida(ruta_reporte, cronometro)
+        return
+    
     # Cargar datos desde CSV con manejo de encoding
+    cronometro.fase("carga")
     print("Cargando archivo CSV...")
     
-    # Intentar diferentes encodings
-    encodings_to_try = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-8-sig']
+    # Intentar diferentes encodings, empezando por el detectado en una muestra
+    # (los anteriores a él ya fallan en la muestra, así que el resultado es el mismo)
+    detectado = detectar_encoding(input_file)
+    encodings_to_try = [e for e in ENCODINGS if e == detectado] + [e for e in ENCODINGS if e != detectado]
     df = None
     
     for encoding in encodings_to_try:
@@ -410,21 +471,7 @@ def main():
         return
     
     # Buscar columnas de nombre y website
-    name_col = None
-    website_col = None
-    
-    for col in df.columns:
-        col_lower = col.lower()
-        if any(word in col_lower for word in ['company', 'name', 'publisher', 'empresa', 'nombre']):
-            if name_col is None:
-                name_col = col
-        elif any(word in col_lower for word in ['website', 'url', 'site', 'web', 'sitio']):
-            if website_col is None:
-                website_col = col
-    
-    if name_col is None:
-        name_col = df.columns[0]  # usar primera columna como fallback
-        print(f"Using '{name_col}' as name column")
+    name_col, website_col = detectar_columnas(df.columns)
     
     if website_col is None:
         website_col = 'Website'  # crear nueva columna
@@ -434,12 +481,27 @@ def main():
     print(f"Name column: {name_col}")
     print(f"Website column: {website_col}")
     
+    # Checkpoint ligado al contenido del CSV: si la corrida anterior se cortó, se reanuda
+    checkpoint = Checkpoint(huella_archivo(input_file))
+    if checkpoint.reanudado:
+        print(f"Resuming from checkpoint '{checkpoint.ruta}'")
+    # Resultados de corridas anteriores (se actualiza siempre; se consulta en modo incremental)
+    max_edad_busquedas = float(os.getenv("VERIFICACION_MAX_EDAD_BUSQUEDAS_HORAS", "720")) * 3600
+    historial = EstadoVerificacion(max_edad=max_edad_horas * 3600, max_edad_busquedas=max_edad_busquedas)
+    if incremental:
+        print(f"Incremental mode: re-verifying URLs older than {max_edad_horas:g}h or previously failed")
+    
     # FASE 0: Detectar duplicados
+    cronometro.fase("duplicados")
     print("\n" + "="*50)
     print("PHASE 0: Detecting duplicates...")
     print("="*50)
     
-    duplicados = detectar_duplicados(df, name_col)
+    duplicados = checkpoint.resultado_fase("duplicados")
+    if duplicados is None:
+        duplicados = [[int(idx) for idx in grupo]
+                      for grupo in detectar_duplicados(df, name_col, procesos=procesos_desde_entorno())]
+        checkpoint.guardar_fase("duplicados", duplicados)
     df['is_duplicate'] = False
     df['duplicate_group'] = None
     
@@ -459,19 +521,27 @@ def main():
     # Agregar columnas de resultado
     df['found_url'] = None
     df['search_notes'] = None
+    df['search_queries'] = None
     df['url_works'] = None  # Será True/False
     df['verification_status'] = None
     df['company_type'] = None
     df['category_description'] = None
     
-    # FASE 1: Buscar URLs faltantes
+    # FASES 1-3: búsqueda -> verificación -> categorización, encadenadas
+    # Cada fila pasa a la etapa siguiente en cuanto está lista (ver pipeline.py): las
+    # filas que ya tienen URL se verifican mientras la búsqueda espera cuota de CSE.
+    cronometro.fase("pipeline")
     print("\n" + "="*50)
-    print("PHASE 1: Searching for missing URLs...")
+    print("PHASES 1-3: Searching, verifying and categorizing (pipelined)...")
     print("="*50)
     
     filas_sin_url = df[df[website_col].isna() | (df[website_col].str.strip() == '')].index
     print(f"Found {len(filas_sin_url)} rows without URL")
+    cache = CacheBusquedas()
+    buscadas = checkpoint.completadas("busqueda")
+    verificadas = checkpoint.completadas("verificacion")
     
+    consultas_por_fila = {}
     for idx in filas_sin_url:
         if idx >= len(df):
             continue
@@ -480,42 +550,174 @@ def main():
         if not consulta or consulta.lower() == 'nan':
             df.at[idx, 'search_notes'] = "empty name"
             continue
-
-        print(f"\nSearching official site for: {consulta}")
-        consultas = generar_consultas_optimizadas(consulta)
-        candidatos = buscar_con_google_cse_multiples(consultas)
-        url, notas = seleccionar_mejor_url_oficial(consulta, candidatos)
-        
+        consultas_por_fila[idx] = consulta
+    
+    # Filas ya buscadas en una corrida anterior
+    resultados = {idx: tuple(buscadas[idx]) for idx in consultas_por_fila if idx in buscadas}
+    if resultados:
+        print(f"Skipping {len(resultados)} companies already searched (checkpoint)")
+    por_buscar = {idx: c for idx, c in consultas_por_fila.items() if idx not in resultados}
+    
+    # Modo incremental: los nombres ya buscados en corridas anteriores se copian tal cual
+    arrastradas = set()
+    if incremental:
+        previas = historial.busquedas_previas(por_buscar.values())
+        for idx, consulta in por_buscar.items():
+            previa = previas.get(normalizar_consulta(consulta))
+            if previa is not None:
+                resultados[idx] = (previa[0], previa[1], 0)
+                arrastradas.add(idx)
+        por_buscar = {idx: c for idx, c in por_buscar.items() if idx not in arrastradas}
+        print(f"Carried over {len(arrastradas)} searches from previous runs")
+    
+    # URL de partida de cada fila: la del CSV o la ya encontrada (checkpoint / corridas anteriores)
+    nombres = df[name_col]
+    urls_conocidas = {idx: str(df.at[idx, website_col]) for idx in df.index if idx not in filas_sin_url}
+    urls_conocidas.update({idx: url for idx, (url, _, _) in resultados.items() if url})
+    
+    # Etapa 3: categorización por lotes (nombre y URL final de cada fila)
+    categorias = {}
+    
+    def categorizar_lote(lote):
+        filas = [idx for idx, _ in lote]
+        tabla = categorizar_columna(pd.Series([nombres[idx] for idx in filas], index=filas),
+                                    pd.Series([url for _, url in lote], index=filas, dtype=object))
+        categorias.update(zip(filas, zip(tabla['company_type'], tabla['category_description'])))
+    
+    categorizador = EtapaLotes(categorizar_lote, nombre="categorizacion").iniciar()
+    
+    # Etapa 2: verificación continua (límite global y por host, una vez por sitio, caché entre corridas)
+    urls_finales = {}
+    verificaciones = {}
+    desde_checkpoint = set()
+    
+    def registrar_verificados(lote):
+        checkpoint.guardar_varios("verificacion", {idx: [*resultado, urls_finales[idx]] for idx, resultado in lote})
+        for idx, resultado in lote:
+            verificaciones[idx] = resultado
+            categorizador.enviar((idx, urls_finales[idx]))
+    
+    # al_verificar corre en el hilo del event loop: sólo encola, y el checkpoint (un
+    # commit por lote) y el paso a la categorización se hacen en este hilo. La cola no
+    # tiene tope para que una escritura lenta nunca frene las peticiones en vuelo
+    escritor = EtapaLotes(registrar_verificados, tamano_cola=0, nombre="checkpoint_verificacion").iniciar()
+    
+    def al_verificar(idx, resultado):
+        escritor.enviar((idx, resultado))
+    
+    # Modo incremental: el historial hace de caché del verificador (sólo los OK de
+    # hace menos de max_edad_horas), y cada resultado nuevo se registra en él
+    verificador = VerificadorContinuo(al_verificar, cache=historial if incremental else None,
+                                      control=control_desde_entorno()).iniciar()
+    
+    def a_verificar(idx, url):
+        """Pasa una fila (con su URL final o None) a la etapa que le toca"""
+        if not url or not str(url).strip():
+            categorizador.enviar((idx, None))
+            return
+        url = urls_finales[idx] = str(url)
+        # Reutilizar lo verificado en una corrida anterior si la URL no cambió
+        if idx in verificadas and verificadas[idx][2] == url:
+            verificaciones[idx] = tuple(verificadas[idx][:2])
+            desde_checkpoint.add(idx)
+        else:
+            verificador.enviar(idx, url)
+            return
+        categorizador.enviar((idx, url))
+    
+    # Las filas que no necesitan búsqueda entran desde otro hilo, en paralelo con la etapa 1
+    ya_resueltas = dict(resultados)
+    error_alimentador = []
+    
+    def alimentar():
+        try:
+            for idx in df.index:
+                if idx not in consultas_por_fila:
+                    a_verificar(idx, urls_conocidas.get(idx))
+                elif idx in ya_resueltas:
+                    a_verificar(idx, ya_resueltas[idx][0])
+        except BaseException as e:
+            error_alimentador.append(e)
+    
+    alimentador = threading.Thread(target=alimentar, name="alimentador", daemon=True)
+    alimentador.start()
+    
+    # Etapa 1: atajo por dominio (DNS + sondeo) antes de gastar cuota, luego CSE
+    adivinados = resolver_por_dominio(por_buscar, es_sitio_oficial)
+    print(f"Resolved {len(adivinados)} companies by domain guess")
+    for idx, (url, notas) in adivinados.items():
+        resultados[idx] = (url, notas, 0)
+        checkpoint.guardar("busqueda", idx, resultados[idx])
+        a_verificar(idx, url)
+    pendientes = {idx: c for idx, c in por_buscar.items() if idx not in adivinados}
+    
+    def al_buscar(idx, resultado):
+        checkpoint.guardar("busqueda", idx, resultado)
+        a_verificar(idx, resultado[0])
+    
+    # Búsquedas en paralelo (una por nombre distinto), al ritmo del limitador compartido;
+    # cada fila se guarda en el checkpoint y pasa a verificarse en cuanto termina
+    print(f"Searching official sites for {len(pendientes)} companies...")
+    resultados.update(buscar_sitios_concurrente(
+        pendientes, lambda consulta: buscar_sitio_oficial(consulta, cache), al_completar=al_buscar
+    ))
+    alimentador.join()
+    verificador.cerrar()
+    escritor.cerrar()
+    categorizador.cerrar()
+    if error_alimentador:
+        raise error_alimentador[0]
+    
+    resultados = {idx: resultados[idx] for idx in consultas_por_fila}
+    historial.guardar_busquedas({
+        consultas_por_fila[idx]: resultado for idx, resultado in resultados.items() if idx not in arrastradas
+    })
+    
+    for idx, (url, notas, usadas) in resultados.items():
+        df.at[idx, 'search_queries'] = usadas
         if url:
             df.at[idx, website_col] = url
             df.at[idx, 'found_url'] = url
         
         df.at[idx, 'search_notes'] = notas
-        print(f"→ {url} ({notas})")
-        
-        # Delay entre búsquedas para evitar rate limits
-        time.sleep(random.uniform(2, 4))
-    
-    # FASE 2: Verificar todas las URLs
-    print("\n" + "="*50)
-    print("PHASE 2: Verifying URL functionality...")
-    print("="*50)
-    
-    total_urls = len(df[df[website_col].notna() & (df[website_col].str.strip() != '')])
-    print(f"Verifying {total_urls} URLs...")
+        print(f"{consultas_por_fila[idx]} → {url} ({notas})")
+    
+    consultas_totales = sum(usadas for _, _, usadas in resultados.values())
+    print(f"Queries spent: {consultas_totales} for {len(resultados)} companies")
+    stats_cache = cache.estadisticas()
+    print(f"Search cache: {stats_cache['aciertos']} hits, {stats_cache['fallos']} misses")
+    stats_limitador = limitador_cse.resumen()
+    print(f"Rate limiter: {stats_limitador['peticiones']} requests, "
+          f"{stats_limitador['segundos_esperando_fichas'] + stats_limitador['segundos_en_backoff']:.1f}s throttled, "
+          f"{stats_limitador['reintentos']} retries")
+    cache.cerrar()
+    
+    print(f"Verified {len(verificaciones)} URLs")
+    stats_concurrencia = verificador.control.resumen()
+    if stats_concurrencia["adaptativo"]:
+        print(f"Adaptive concurrency: {stats_concurrencia['limite']} in flight at the end "
+              f"(range {stats_concurrencia['minimo']}-{stats_concurrencia['maximo']}, "
+              f"{stats_concurrencia['reducciones']} reductions)")
+    print(f"Dead hosts: {estadisticas_sondeo['dns']} DNS failures, {estadisticas_sondeo['conexion']} connect timeouts, "
+          f"{estadisticas_sondeo['lectura']} read timeouts ({estadisticas_sondeo['segundos_ahorrados']:.0f}s of "
+          f"waiting saved by the short connect timeout)")
+    if desde_checkpoint:
+        print(f"Skipped {len(desde_checkpoint)} URLs already verified (checkpoint)")
+    stats_verificaciones = None
+    if incremental:
+        stats_verificaciones = historial.estadisticas()
+        print(f"Carried over {stats_verificaciones['aciertos']} recent verifications "
+              f"({stats_verificaciones['fallos']} sites verified again)")
+    else:
+        # En modo incremental ya los registró el verificador; acá no se pisa la fecha de los arrastrados
+        historial.guardar_verificaciones({urls_finales[idx]: resultado for idx, resultado in verificaciones.items()})
+    historial.cerrar()
     
     urls_con_error = []
-    
-    for idx, row in df.iterrows():
-        url = row[website_col]
-        if pd.isna(url) or not str(url).strip():
-            df.at[idx, 'url_works'] = "False"
-            df.at[idx, 'verification_status'] = "No URL"
-            continue
-        
-        print(f"Verifying: {url}")
-        funciona, estado = verificar_url(url)
-        
+    df['url_works'] = "False"
+    df['verification_status'] = "No URL"
+    for idx, (funciona, estado) in sorted(verificaciones.items()):
+        url = df.at[idx, website_col]
         df.at[idx, 'url_works'] = "True" if funciona else "False"  # Force English text
         df.at[idx, 'verification_status'] = estado
         
@@ -524,61 +726,30 @@ def main():
             print(f"❌ {url} - {estado}")
         else:
             print(f"✅ {url} - OK")
-        
-        time.sleep(0.5)  # pequeño delay
     
-    # FASE 3: Categorizar empresas
-    print("\n" + "="*50)
-    print("PHASE 3: Categorizing companies...")
-    print("="*50)
-    
-    for idx, row in df.iterrows():
-        nombre = row[name_col]
-        website = row[website_col]
-        
-        tipo, descripcion = categorizar_empresa(nombre, website)
-        df.at[idx, 'company_type'] = tipo
-        df.at[idx, 'category_description'] = descripcion
-        
+    df['company_type'] = [categorias[idx][0] for idx in df.index]
+    df['category_description'] = [categorias[idx][1] for idx in df.index]
+    for nombre, tipo, descripcion in zip(df[name_col], df['company_type'], df['category_description']):
         print(f"{nombre} → {tipo}: {descripcion}")
     
+
     # FASE 4: Guardar y resaltar errores
+    cronometro.fase("salida")
     print("\n" + "="*50)
     print("PHASE 4: Saving results and highlighting errors...")
     print("="*50)
     
-    # Guardar a Excel
-    df.to_excel(output_excel, index=False)
+    # Guardar en los formatos pedidos; el Excel sale en una sola pasada con los colores
+    # ya aplicados. Prioridad: duplicados (azul) > errores (amarillo) > encontradas (verde)
+    print(f"Highlighting {len(urls_con_error)} rows with errors...")
+    rutas = guardar_resultados(df, output_base, formatos, rellenos_por_estado(df))
+    print(f"Format applied successfully")
     
-    # Aplicar formato de color
-    if urls_con_error or duplicados:
-        wb = load_workbook(output_excel)
-        ws = wb.active
-        
-        # Definir colores
-        yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Amarillo para errores
-        green_fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")   # Verde claro para encontradas
-        blue_fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")    # Azul claro para duplicados
-        
-        print(f"Highlighting {len(urls_con_error)} rows with errors...")
-        
-        for row_idx in range(2, ws.max_row + 1):  # empezar desde fila 2 (después del header)
-            df_row_idx = row_idx - 2  # ajustar índice para DataFrame
-            
-            if df_row_idx < len(df):
-                # Prioridad: duplicados (azul) > errores (amarillo) > encontradas (verde)
-                if df.at[df_row_idx, 'is_duplicate']:
-                    for col in range(1, ws.max_column + 1):
-                        ws.cell(row=row_idx, column=col).fill = blue_fill
-                elif not df.at[df_row_idx, 'url_works']:
-                    for col in range(1, ws.max_column + 1):
-                        ws.cell(row=row_idx, column=col).fill = yellow_fill
-                elif pd.notna(df.at[df_row_idx, 'found_url']):
-                    for col in range(1, ws.max_column + 1):
-                        ws.cell(row=row_idx, column=col).fill = green_fill
-        
-        wb.save(output_excel)
-        print(f"Format applied successfully")
+    # Corrida completa: la próxima empieza de cero
+    checkpoint.borrar()
+    if ruta_reporte:
+        guardar_reporte_corrida(ruta_reporte, cronometro, cache_busquedas=stats_cache,
+                                cache_verificaciones=stats_verificaciones, concurrencia=stats_concurrencia)
     
     # RESUMEN FINAL
     print("\n" + "="*60)
@@ -605,7 +776,9 @@ def main():
     for categoria, count in categorias.items():
         print(f"   - {categoria}: {count}")
     
-    print(f"\n📁 File saved: '{output_excel}'")
+    print()
+    for ruta in rutas:
+        print(f"📁 File saved: '{ruta}'")
     print("🎨 Format applied:")
     print("   - Blue: Duplicate companies")
     print("   - Yellow: URLs with errors")
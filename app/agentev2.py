@@ -1,16 +1,24 @@
 import os
-import time
-import random
 import re
-from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
 import requests
 from dotenv import load_dotenv
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from rapidfuzz import fuzz, process
+
+from busqueda import UMBRAL_CONFIANZA, buscar_en_cascada, buscar_sitios_concurrente, resolver_por_dominio
+from cache_busquedas import CacheBusquedas
+from categorizacion import categorizar
+from deduplicacion import detectar_duplicados_matriz
+from estado import EstadoVerificacion
+from http_cliente import estadisticas_dns, obtener_sesion
+from instrumentacion import CronometroFases, activar, guardar_reporte, instrumentar
+from limitador import crear_limitador_cse
+from normalizacion import limpiar_nombre
+from paralelo import categorizar_columna_paralelo, limpiar_columna_paralelo, procesos_desde_entorno
+from puntuacion import PuntuadorOficial
+from salida import formatos_desde_entorno, guardar_resultados
+from salida_excel import rellenos_por_estado
+from verificacion import control_desde_entorno, estadisticas_sondeo, pedir_url, sondear_url, verificar_urls
 
 # -----------------------------
 # Cargar API keys desde .env
@@ -25,98 +33,36 @@ except Exception as e:
     API_KEY = None
     CSE_ID = None
 
+# Endpoint de Google CSE (los benchmarks lo apuntan a un servidor local)
+URL_CSE = "https://www.googleapis.com/customsearch/v1"
+
+# Limitador compartido por todas las llamadas a Google CSE
+limitador_cse = crear_limitador_cse()
+
 # -----------------------------
 # Funciones de detección de duplicados
 # -----------------------------
 def limpiar_nombre_empresa(nombre):
-    """Limpia el nombre de la empresa para comparación"""
-    if pd.isna(nombre):
-        return ""
-    
-    nombre = str(nombre).lower().strip()
-    sufijos = [
-        r'\b(inc|corp|corporation|ltd|limited|llc|llp|lp|co|company|enterprises|group|holding|international|global|worldwide|systems|solutions|software|technologies|technology|tech|services|consulting|digital|media|studios|games|entertainment|publishing|publishers|hardware|computers|computing)\b',
-        r'\b(gmbh|ag|sa|srl|spa|bv|nv|oy|ab|as|\&|\+|\.|,)\b'
-    ]
-    for sufijo in sufijos:
-        nombre = re.sub(sufijo, '', nombre)
-    nombre = re.sub(r'[^\w\s]', ' ', nombre)
-    nombre = re.sub(r'\s+', ' ', nombre).strip()
-    return nombre
+    """Limpia el nombre de la empresa para comparación (ver normalizacion.py)"""
+    return limpiar_nombre(nombre)
 
-def detectar_duplicados(df, name_col, threshold=85):
-    """Detecta duplicados usando rapidfuzz (más rápido que difflib)"""
-    df['clean_name'] = df[name_col].apply(limpiar_nombre_empresa)
-    duplicados = []
-    seen = set()
+@instrumentar()
+def detectar_duplicados(df, name_col, threshold=85, chunk=2000, workers=-1, procesos=1):
+    """Detecta duplicados con una matriz rapidfuzz por bloques y componentes conexas
 
-    for i, name in enumerate(df['clean_name']):
-        if i in seen or not name:
-            continue
-        matches = process.extract(name, df['clean_name'], scorer=fuzz.ratio, limit=None)
-        grupo = [j for j, score in [(idx, s) for idx, s in enumerate(dict(matches).values())] if score >= threshold and j != i]
-        if grupo:
-            duplicados.append([i] + grupo)
-            seen.update(grupo)
-    return duplicados
+    La matriz ya usa todos los núcleos (`workers`); con procesos > 1 también
+    la limpieza de nombres se reparte en un pool de procesos.
+    """
+    df['clean_name'] = limpiar_columna_paralelo(df[name_col], procesos)
+    return detectar_duplicados_matriz(df['clean_name'].tolist(), threshold, chunk, workers)
 
 # -----------------------------
 # Funciones de categorización
 # -----------------------------
+@instrumentar()
 def categorizar_empresa(nombre, website=""):
-    if pd.isna(nombre):
-        return "Unknown", "No data"
-    
-    nombre = str(nombre).lower()
-    website = str(website).lower() if not pd.isna(website) else ""
-    texto_completo = f"{nombre} {website}"
-    
-    categorias = {
-        "Game Publisher": ["games", "gaming", "entertainment", "studios", "interactive", "digital entertainment",
-                           "game", "publisher", "publishing", "media", "activision", "electronic arts", "ubisoft"],
-        "Book Publisher": ["books", "publishing", "publications", "press", "editorial", "penguin", "harper",
-                           "macmillan", "scholastic", "textbook", "academic press"],
-        "Software Publisher": ["software", "applications", "apps", "programs", "development", "dev", "solutions",
-                               "microsoft", "adobe", "autodesk", "oracle"],
-        "Media Publisher": ["media", "news", "magazine", "newspaper", "broadcast", "streaming", "content",
-                            "netflix", "disney", "warner", "paramount"],
-        "Computer Hardware": ["computers", "pc", "laptop", "desktop", "workstation", "server", "dell", "hp",
-                              "lenovo", "asus", "acer", "apple computer"],
-        "Components Provider": ["components", "parts", "processors", "cpu", "gpu", "memory", "storage", "motherboard",
-                                "intel", "amd", "nvidia", "corsair", "kingston", "seagate", "western digital"],
-        "Network Hardware": ["network", "networking", "router", "switch", "firewall", "wireless", "wifi",
-                             "cisco", "netgear", "tp-link", "ubiquiti", "juniper"],
-        "Mobile Hardware": ["mobile", "smartphone", "tablet", "phone", "cellular", "samsung", "apple iphone",
-                            "huawei", "xiaomi", "oneplus"],
-        "Cloud Services": ["cloud", "hosting", "datacenter", "infrastructure", "saas", "paas", "iaas",
-                           "amazon aws", "google cloud", "microsoft azure", "digitalocean"],
-        "IT Services": ["consulting", "services", "integration", "support", "managed services",
-                        "ibm services", "accenture", "capgemini", "tcs"],
-        "Security Provider": ["security", "cybersecurity", "antivirus", "firewall", "encryption", "norton",
-                              "mcafee", "symantec", "kaspersky", "palo alto"]
-    }
-    
-    puntuaciones = {}
-    for categoria, palabras in categorias.items():
-        score = 0
-        for palabra in palabras:
-            if palabra in texto_completo:
-                score += 3 if palabra in nombre else 1
-        puntuaciones[categoria] = score
-    
-    if puntuaciones:
-        mejor_categoria = max(puntuaciones.items(), key=lambda x: x[1])
-        if mejor_categoria[1] > 0:
-            categoria = mejor_categoria[0]
-            if "Publisher" in categoria:
-                return "Publisher", categoria.replace(" Publisher", "")
-            elif "Hardware" in categoria or "Provider" in categoria:
-                return "Hardware Provider", categoria.replace(" Hardware", "").replace(" Provider", "")
-            elif "Services" in categoria:
-                return "Service Provider", categoria.replace(" Services", "").replace(" Provider", "")
-            else:
-                return "Other", categoria
-    return "Unknown", "Unclassified"
+    """Categoriza una empresa basándose en su nombre y website (tabla precompilada en categorizacion.py)"""
+    return categorizar(nombre, website)
 
 # -----------------------------
 # Funciones de scoring / búsqueda
@@ -132,86 +78,102 @@ def generar_consultas_optimizadas(consulta_original: str):
         f'{consulta_clean} technology company'
     ]
 
-def es_sitio_oficial(url: str, domain: str, title: str, snippet: str, consulta: str) -> int:
-    score = 0
-    consulta_lower = consulta.lower()
-    domain_lower = domain.lower()
-    title_lower = title.lower()
-    snippet_lower = snippet.lower()
-    
-    consulta_base = re.sub(r'\b(software|hardware|inc|corp|ltd|llc|sa|srl|gmbh|ag)\b', '', consulta_lower).strip()
-    palabras_consulta = [p for p in consulta_base.split() if len(p) > 2]
+# Versión reducida del scoring: sin penalizar subdominios ni reglas de URL
+class PuntuadorSitio(PuntuadorOficial):
+    OFICIALES = re.compile('official|homepage|corporate|company')
+    PENALIZAR_SUBDOMINIOS = False
+    REGLAS_URL = False
 
-    for palabra in palabras_consulta:
-        if palabra in domain_lower:
-            score += 25
-    if any(domain_lower.startswith(f"{palabra}.") or f".{palabra}." in domain_lower for palabra in palabras_consulta):
-        score += 40
-    if domain.endswith(('.com', '.net', '.org', '.io', '.tech')):
-        score += 15
-    social_platforms = ['facebook.com','twitter.com','linkedin.com','youtube.com','instagram.com','wikipedia.org',
-                        'crunchbase.com','bloomberg.com','reuters.com','amazon.com','ebay.com','alibaba.com','github.com']
-    if any(platform in domain_lower for platform in social_platforms):
-        score -= 30
-    if any(word in title_lower for word in ['official', 'homepage', 'corporate', 'company']):
-        score += 10
-    score += sum(1 for palabra in palabras_consulta if palabra in title_lower) * 5
-    return max(0, min(100, score))
+def es_sitio_oficial(url: str, domain: str, title: str, snippet: str, consulta: str) -> int:
+    """Score 0-100 de un candidato; para varios candidatos usar un único PuntuadorSitio"""
+    return PuntuadorSitio(consulta).puntuar(url, domain, title, snippet)
 
-def seleccionar_mejor_url_oficial(consulta: str, candidatos):
+def seleccionar_mejor_url_oficial(consulta: str, candidatos, puntuador=None):
     if not candidatos:
         return None, "no candidates"
-    scored_candidates = []
-    for item in candidatos:
-        url = item.get("href", "")
-        if not url:
-            continue
-        score = es_sitio_oficial(url, item.get("displayLink",""), item.get("title",""), item.get("snippet",""), consulta)
-        scored_candidates.append({"score": score, "url": url, "domain": item.get("displayLink","")})
-    if not scored_candidates:
+    mejor = (puntuador or PuntuadorSitio(consulta)).mejor(candidatos)
+    if mejor is None:
         return None, "no valid candidates"
-    best = max(scored_candidates, key=lambda x: x['score'])
-    return best['url'], f"score {best['score']}, domain: {best['domain']}"
+    score, _, best = mejor
+    return best['href'], f"score {score}, domain: {best.get('displayLink', '')}"
+
+@instrumentar("cse.peticion")
+def _pedir_cse(url, params):
+    """Una petición HTTP a la API (se mide aparte de la espera en el limitador)"""
+    return obtener_sesion("cse").get(url, params=params, timeout=15)
 
-def buscar_con_google_cse_multiples(consultas):
-    if not API_KEY or not CSE_ID:
-        return []
+@instrumentar()
+def buscar_con_google_cse_multiples(consultas, cache=None, limitador=None, registro=None):
+    limitador = limitador or limitador_cse
     todos_candidatos, urls_vistas = [], set()
     for query in consultas[:2]:  # menos consultas
-        try:
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {'key': API_KEY, 'cx': CSE_ID, 'q': query, 'num': 5, 'safe': 'medium'}
-            response = requests.get(url, params=params, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                for item in data.get('items', []):
-                    href = item.get("link", "")
-                    if href and href not in urls_vistas:
-                        todos_candidatos.append({
-                            "title": item.get("title", ""),
-                            "href": href,
-                            "snippet": item.get("snippet", ""),
-                            "displayLink": item.get("displayLink", "")
-                        })
-                        urls_vistas.add(href)
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"Error en consulta '{query}': {e}")
+        items = cache.obtener(query) if cache is not None else None
+        if items is None:
+            if not API_KEY or not CSE_ID:
+                break
+            try:
+                url = URL_CSE
+                params = {'key': API_KEY, 'cx': CSE_ID, 'q': query, 'num': 5, 'safe': 'medium'}
+                response = limitador.ejecutar(lambda: _pedir_cse(url, params))
+                if registro is not None:
+                    registro.append(query)
+                if response.status_code == 200:
+                    items = response.json().get('items', [])
+                    if cache is not None:
+                        cache.guardar(query, items)
+            except Exception as e:
+                print(f"Error en consulta '{query}': {e}")
+        for item in items or []:
+            href = item.get("link", "")
+            if href and href not in urls_vistas:
+                todos_candidatos.append({
+                    "title": item.get("title", ""),
+                    "href": href,
+                    "snippet": item.get("snippet", ""),
+                    "displayLink": item.get("displayLink", "")
+                })
+                urls_vistas.add(href)
     return todos_candidatos
 
+def buscar_consulta_registrada(query, cache=None):
+    """Candidatos de una consulta y cuántas peticiones a CSE costó (para `buscar_en_cascada`)"""
+    registro = []
+    candidatos = buscar_con_google_cse_multiples([query], cache, registro=registro)
+    return candidatos, len(registro)
+
+
+@instrumentar()
+def buscar_sitio_oficial(consulta, cache=None, umbral=UMBRAL_CONFIANZA):
+    """Búsqueda en cascada: corta cuando un candidato alcanza `umbral`; devuelve (url, notas, consultas_usadas)"""
+    consultas = generar_consultas_optimizadas(consulta)[:2]
+    puntuador = PuntuadorSitio(consulta)
+    candidatos, usadas = buscar_en_cascada(
+        consultas,
+        lambda query: buscar_consulta_registrada(query, cache),
+        puntuador.puntuar_candidato,
+        umbral
+    )
+    url, notas = seleccionar_mejor_url_oficial(consulta, candidatos, puntuador)
+    return url, notas, usadas
+
 # -----------------------------
 # Funciones de verificación
 # -----------------------------
-def verificar_url(url):
+@instrumentar()
+def verificar_url(url, modo="sonda", registro=None):
+    """Verifica una URL; modo="sonda" usa HEAD/GET en streaming, modo="get" descarga la página"""
     if pd.isna(url) or not str(url).strip():
         return False, "Empty URL"
     url_str = str(url).strip()
     if not url_str.startswith(('http://','https://')):
         url_str = 'http://' + url_str
     try:
-        response = requests.get(url_str, timeout=10, allow_redirects=True)
-        if response.status_code >= 400:
-            return False, f"Error {response.status_code}"
+        if modo == "sonda":
+            status_code = sondear_url(url_str, timeout=10, registro=registro)
+        else:
+            status_code = pedir_url(url_str, timeout=10, registro=registro)
+        if status_code >= 400:
+            return False, f"Error {status_code}"
         return True, "OK"
     except requests.exceptions.Timeout:
         return False, "Timeout"
@@ -220,22 +182,14 @@ def verificar_url(url):
     except Exception as e:
         return False, f"Error: {str(e)[:50]}"
 
-def verificar_urls_batch(df, website_col):
-    resultados = {}
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_idx = {
-            executor.submit(verificar_url, df.at[idx, website_col]): idx
-            for idx in df.index
-            if pd.notna(df.at[idx, website_col]) and str(df.at[idx, website_col]).strip()
-        }
-        for future in as_completed(future_to_idx):
-            idx = future_to_idx[future]
-            try:
-                funciona, estado = future.result()
-                resultados[idx] = (funciona, estado)
-            except Exception as e:
-                resultados[idx] = (False, f"Error: {e}")
-    for idx, (funciona, estado) in resultados.items():
+def verificar_urls_batch(df, website_col, **config):
+    """Verifica todas las URLs del DataFrame con el verificador asíncrono (un pedido por sitio distinto)"""
+    filas = [
+        idx for idx in df.index
+        if pd.notna(df.at[idx, website_col]) and str(df.at[idx, website_col]).strip()
+    ]
+    resultados = verificar_urls(df.loc[filas, website_col], **config)
+    for idx, (funciona, estado) in zip(filas, resultados):
         df.at[idx, 'url_works'] = "True" if funciona else "False"
         df.at[idx, 'verification_status'] = estado
     return df
@@ -244,12 +198,26 @@ def verificar_urls_batch(df, website_col):
 # Función principal
 # -----------------------------
 def main():
+    """Con VERIFICACION_REPORTE=<ruta.json> escribe al final el reporte de tiempos por fase (ver instrumentacion.py).
+
+    VERIFICACION_PROCESOS=N (o "auto") reparte normalización y categorización entre N procesos.
+    VERIFICACION_CONCURRENCIA=fija mantiene el tope de peticiones en vuelo sin ajustarlo.
+    VERIFICACION_INCREMENTAL=1 no vuelve a pedir los sitios verificados OK hace menos de
+    VERIFICACION_MAX_EDAD_HORAS (24 por defecto; ver EstadoVerificacion).
+    """
+    ruta_reporte = os.getenv("VERIFICACION_REPORTE")
+    if ruta_reporte:
+        activar()
+    cronometro = CronometroFases()
     input_file = "./app/publishers.csv"
-    output_excel = "./app/publishers_verified.xlsx"
+    output_base = "./app/publishers_verified"  # + extensión de cada formato (VERIFICACION_FORMATOS)
+    formatos = formatos_desde_entorno()
+    procesos = procesos_desde_entorno()
     if not os.path.exists(input_file):
         print(f"❌ Input file not found: {input_file}")
         return
     
+    cronometro.fase("carga")
     print("Cargando archivo CSV...")
     encodings_to_try = ['utf-8','latin-1','cp1252','iso-8859-1','utf-8-sig']
     df = None
@@ -279,8 +247,9 @@ def main():
         website_col = 'Website'
         df[website_col] = None
     
+    cronometro.fase("duplicados")
     print("Detectando duplicados...")
-    duplicados = detectar_duplicados(df, name_col)
+    duplicados = detectar_duplicados(df, name_col, procesos=procesos)
     df['is_duplicate'] = False
     df['duplicate_group'] = None
     for i, grupo in enumerate(duplicados):
@@ -290,60 +259,80 @@ def main():
     
     df['found_url'], df['search_notes'], df['url_works'], df['verification_status'] = None, None, None, None
     df['company_type'], df['category_description'] = None, None
+    df['search_queries'] = None
     
+    cronometro.fase("busqueda")
     print("Buscando URLs faltantes...")
     filas_sin_url = df[df[website_col].isna() | (df[website_col].str.strip() == '')].index
-    cache_busquedas = {}
+    cache_cse = CacheBusquedas()
+    consultas_por_fila = {}
     for idx in filas_sin_url:
         consulta = str(df.at[idx, name_col]).strip()
         if not consulta or consulta.lower() == 'nan':
             df.at[idx, 'search_notes'] = "empty name"
             continue
-        if consulta in cache_busquedas:
-            url, notas = cache_busquedas[consulta]
-        else:
-            consultas = generar_consultas_optimizadas(consulta)
-            candidatos = buscar_con_google_cse_multiples(consultas)
-            url, notas = seleccionar_mejor_url_oficial(consulta, candidatos)
-            cache_busquedas[consulta] = (url, notas)
+        consultas_por_fila[idx] = consulta
+    # Primero dominios adivinados (sin cuota); el resto va a CSE
+    adivinados = resolver_por_dominio(consultas_por_fila, es_sitio_oficial)
+    print(f"Resueltas por dominio: {len(adivinados)}")
+    pendientes = {idx: c for idx, c in consultas_por_fila.items() if idx not in adivinados}
+    # Nombres repetidos se buscan una sola vez; las empresas van en paralelo
+    resultados = buscar_sitios_concurrente(
+        pendientes, lambda consulta: buscar_sitio_oficial(consulta, cache_cse)
+    )
+    resultados.update({idx: (url, notas, 0) for idx, (url, notas) in adivinados.items()})
+    resultados = {idx: resultados[idx] for idx in consultas_por_fila}
+    for idx, (url, notas, usadas) in resultados.items():
+        df.at[idx, 'search_queries'] = usadas
         if url:
             df.at[idx, website_col] = url
             df.at[idx, 'found_url'] = url
         df.at[idx, 'search_notes'] = notas
     
+    print(f"Consultas usadas: {sum(r[2] for r in resultados.values())} para {len(resultados)} empresas")
+    stats_cache = cache_cse.estadisticas()
+    print(f"Caché CSE: {stats_cache['aciertos']} aciertos, {stats_cache['fallos']} fallos")
+    cache_cse.cerrar()
+    stats_limitador = limitador_cse.resumen()
+    print(f"Limitador CSE: {stats_limitador['peticiones']} peticiones, "
+          f"{stats_limitador['segundos_esperando_fichas'] + stats_limitador['segundos_en_backoff']:.1f}s en espera")
+    
+    cronometro.fase("verificacion")
     print("Verificando URLs en paralelo...")
-    df = verificar_urls_batch(df, website_col)
+    historial = None
+    if os.getenv("VERIFICACION_INCREMENTAL", "0") == "1":
+        historial = EstadoVerificacion(max_edad=float(os.getenv("VERIFICACION_MAX_EDAD_HORAS", "24")) * 3600)
+    control = control_desde_entorno()
+    df = verificar_urls_batch(df, website_col, cache=historial, control=control)
+    stats_concurrencia = control.resumen()
+    if stats_concurrencia["adaptativo"]:
+        print(f"Concurrencia adaptativa: {stats_concurrencia['limite']} en vuelo al final "
+              f"(rango {stats_concurrencia['minimo']}-{stats_concurrencia['maximo']}, "
+              f"{stats_concurrencia['reducciones']} reducciones)")
+    print(f"Sitios muertos: {estadisticas_sondeo['dns']} sin DNS, {estadisticas_sondeo['conexion']} sin conexión, "
+          f"{estadisticas_sondeo['lectura']} sin respuesta ({estadisticas_sondeo['segundos_ahorrados']:.0f}s de "
+          f"espera ahorrados por el timeout corto de conexión)")
+    stats_verificaciones = None
+    if historial is not None:
+        stats_verificaciones = historial.estadisticas()
+        print(f"Verificaciones reutilizadas: {stats_verificaciones['aciertos']} aciertos, {stats_verificaciones['fallos']} fallos")
+        historial.cerrar()
     
+    cronometro.fase("categorizacion")
     print("Categorizar empresas...")
-    df[['company_type','category_description']] = df.apply(
-        lambda row: pd.Series(categorizar_empresa(row[name_col], row[website_col])),
-        axis=1
-    )
-    
-    print("Guardando Excel...")
-    df.to_excel(output_excel, index=False)
-    
-    wb = load_workbook(output_excel)
-    ws = wb.active
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    green_fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-    blue_fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
+    df[['company_type','category_description']] = categorizar_columna_paralelo(df[name_col], df[website_col], procesos)
     
-    for row_idx in range(2, ws.max_row+1):
-        df_row_idx = row_idx - 2
-        if df_row_idx < len(df):
-            if df.at[df_row_idx, 'is_duplicate']:
-                for col in range(1, ws.max_column+1):
-                    ws.cell(row=row_idx, column=col).fill = blue_fill
-            elif df.at[df_row_idx, 'url_works'] == "False":
-                for col in range(1, ws.max_column+1):
-                    ws.cell(row=row_idx, column=col).fill = yellow_fill
-            elif pd.notna(df.at[df_row_idx, 'found_url']):
-                for col in range(1, ws.max_column+1):
-                    ws.cell(row=row_idx, column=col).fill = green_fill
+    cronometro.fase("salida")
+    print(f"Guardando resultados ({', '.join(formatos)})...")
+    # Excel en una sola pasada: duplicados (azul) > URL con error (amarillo) > encontradas (verde)
+    for ruta in guardar_resultados(df, output_base, formatos, rellenos_por_estado(df)):
+        print(f"✅ Archivo guardado: {ruta}")
     
-    wb.save(output_excel)
-    print("✅ Archivo guardado y coloreado")
+    cronometro.terminar()
+    if ruta_reporte:
+        guardar_reporte(ruta_reporte, limitador=stats_limitador, dns=dict(estadisticas_dns),
+                        cache_busquedas=stats_cache, cache_verificaciones=stats_verificaciones,
+                        concurrencia=stats_concurrencia, sondeo=dict(estadisticas_sondeo))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,672 @@
+"""Benchmarks de rendimiento del pipeline.
+
+Uso (desde la raíz del repo):
+    python app/benchmarks.py dedup --filas 2000 10000 50000
+    python app/benchmarks.py verificacion --urls 200 2000 --latencia 0.2
+    python app/benchmarks.py escalonado --urls 2000 --timeout 10
+    python app/benchmarks.py sondeo --urls 200 --tamano-cuerpo 2000000
+    python app/benchmarks.py sesion --peticiones 500
+    python app/benchmarks.py normalizacion --nombres 100000
+    python app/benchmarks.py excel --filas 2000 100000
+    python app/benchmarks.py pipeline --filas 1000 10000 100000 --json bench.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zlib
+from contextlib import redirect_stdout
+import random
+import re
+import socket
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import requests
+from openpyxl import load_workbook
+from urllib.parse import parse_qs, urlparse
+
+import agente
+import agentev2
+import busqueda
+import instrumentacion
+import normalizacion
+import verificacion
+from categorizacion import categorizar_columna
+from http_cliente import obtener_sesion
+from limitador import LimitadorTasa
+from puntuacion import PuntuadorOficial
+from salida_excel import AZUL, AMARILLO, VERDE, escribir_excel, rellenos_por_estado
+from verificacion import verificar_urls
+
+# -----------------------------
+# Datos sintéticos
+# -----------------------------
+SUFIJOS_SINTETICOS = ["Inc", "Corp", "LLC", "Ltd", "Software", "Games", "Studios",
+                      "Technologies", "Media", "Systems", "GmbH", "S.A.", ""]
+
+
+def generar_nombres(n, semilla=42, prop_variantes=0.1):
+    """Genera n nombres de empresa sintéticos con una fracción de variantes casi duplicadas"""
+    rnd = random.Random(semilla)
+    silabas = [c + v + f for c in "bcdfghklmnprstvxz" for v in "aeiou" for f in ("", "n", "r", "x", "ss")]
+    nombres = []
+    while len(nombres) < n:
+        if nombres and rnd.random() < prop_variantes:
+            # Variante de un nombre ya generado (typo, sufijo distinto, mayúsculas)
+            base = rnd.choice(nombres).split(" ")[0]
+            if len(base) > 4 and rnd.random() < 0.5:
+                pos = rnd.randrange(len(base))
+                base = base[:pos] + rnd.choice(string.ascii_lowercase) + base[pos + 1:]
+            nombres.append(f"{base.upper() if rnd.random() < 0.3 else base} {rnd.choice(SUFIJOS_SINTETICOS)}".strip())
+        else:
+            base = "".join(rnd.choice(silabas) for _ in range(rnd.randint(2, 4))).capitalize()
+            if rnd.random() < 0.4:
+                base += " " + "".join(rnd.choice(silabas) for _ in range(rnd.randint(1, 3))).capitalize()
+            nombres.append(f"{base} {rnd.choice(SUFIJOS_SINTETICOS)}".strip())
+    return nombres
+
+
+def _cronometrar(funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+# -----------------------------
+# Benchmark: detección de duplicados
+# -----------------------------
+def bench_dedup(filas, max_exhaustivo=5000, procesos=1):
+    """Compara la deduplicación por bloques y por matriz contra la comparación O(n²) original
+
+    Con procesos > 1 también mide la versión por bloques repartida en un pool de procesos.
+    """
+    print(f"{'filas':>8} {'metodo':>11} {'segundos':>10} {'grupos':>7} {'iguales':>8}")
+    for n in filas:
+        df = pd.DataFrame({"Name": generar_nombres(n)})
+        grupos, t_bloques = _cronometrar(agente.detectar_duplicados, df, "Name", metodo="bloques")
+        iguales = "-"
+        if n <= max_exhaustivo:
+            referencia, t_exhaustivo = _cronometrar(agente.detectar_duplicados, df, "Name", metodo="exhaustivo")
+            iguales = str(grupos == referencia)
+            print(f"{n:>8} {'exhaustivo':>11} {t_exhaustivo:>10.2f} {len(referencia):>7} {'-':>8}")
+        print(f"{n:>8} {'bloques':>11} {t_bloques:>10.2f} {len(grupos):>7} {iguales:>8}")
+        if procesos > 1:
+            grupos_pool, t_pool = _cronometrar(agente.detectar_duplicados, df, "Name", procesos=procesos)
+            etiqueta = f"{procesos} procesos"
+            print(f"{n:>8} {etiqueta:>11} {t_pool:>10.2f} {len(grupos_pool):>7} {str(grupos_pool == grupos):>8}")
+        # agentev2: matriz rapidfuzz + componentes conexas (otra semántica de grupos)
+        grupos_matriz, t_matriz = _cronometrar(agentev2.detectar_duplicados, df, "Name")
+        print(f"{n:>8} {'matriz':>11} {t_matriz:>10.2f} {len(grupos_matriz):>7} {'-':>8}")
+
+
+# -----------------------------
+# Servidor HTTP local que simula sitios lentos, caídos y con redirecciones
+# -----------------------------
+class ManejadorStub(BaseHTTPRequestHandler):
+    """Rutas: /lento (200 tras `latencia` con un cuerpo de `tamano_cuerpo` bytes),
+    /404, /redirige (302 -> /lento) y /cuelga (no responde en `cuelgue` segundos:
+    timeout del cliente). Si `acepta_head` es False, HEAD devuelve 405."""
+    latencia = 0.2
+    tamano_cuerpo = 0
+    cuelgue = 30
+    acepta_head = True
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _responder(self, con_cuerpo):
+        cuerpo = b""
+        if self.path.startswith("/cuelga"):
+            time.sleep(self.cuelgue)
+            self.close_connection = True
+            return
+        if self.path.startswith("/404"):
+            self.send_response(404)
+        elif self.path.startswith("/redirige"):
+            self.send_response(302)
+            self.send_header("Location", "/lento")
+        else:
+            time.sleep(self.latencia)
+            self.send_response(200)
+            cuerpo = b"x" * self.tamano_cuerpo
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if con_cuerpo:
+            try:
+                self.wfile.write(cuerpo)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # el cliente cerró tras las cabeceras
+
+    def do_GET(self):
+        self._responder(con_cuerpo=True)
+
+    def do_HEAD(self):
+        if not self.acepta_head:
+            self.send_response(405)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._responder(con_cuerpo=False)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clientes que cortan la conexión a propósito (sondeos, timeouts)
+
+
+def levantar_granja_stub(hosts=8, latencia=0.2, tamano_cuerpo=0, cuelgue=30):
+    """Levanta un servidor por host (127.0.0.2, 127.0.0.3, ...) y devuelve sus bases.
+
+    Los hosts impares rechazan HEAD, como muchos servidores reales.
+    """
+    servidores, bases = [], []
+    for k in range(hosts):
+        manejador = type("Manejador", (ManejadorStub,), {
+            "latencia": latencia, "tamano_cuerpo": tamano_cuerpo, "acepta_head": k % 2 == 0,
+            "cuelgue": cuelgue,
+        })
+        servidor = ServidorStub((f"127.0.0.{k + 2}", 0), manejador)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+        bases.append(f"http://127.0.0.{k + 2}:{servidor.server_address[1]}")
+    return servidores, bases
+
+
+# Puerto 9 (discard) en loopback: conexión rechazada al instante
+HOSTS_CAIDOS = [f"http://127.0.0.{k}:9" for k in range(100, 110)]
+
+
+def _url_stub(r, bases, rnd, prop_cuelga=0.0, sitio=""):
+    """URL de la granja según `r` en [0, 1): lentas, 404, redirecciones, colgadas o hosts caídos.
+
+    `sitio` se agrega a la ruta para que cada fila sea un sitio distinto (la
+    verificación pide una sola vez cada URL canónica).
+    """
+    if r < prop_cuelga:
+        return f"{rnd.choice(bases)}/cuelga/{sitio}"
+    if r < 0.7:
+        return f"{rnd.choice(bases)}/lento/{sitio}"
+    if r < 0.8:
+        return f"{rnd.choice(bases)}/404/{sitio}"
+    if r < 0.9:
+        return f"{rnd.choice(bases)}/redirige/{sitio}"
+    return f"{rnd.choice(HOSTS_CAIDOS)}/{sitio}"
+
+
+def generar_urls_stub(n, bases, semilla=42, prop_cuelga=0.0):
+    """Mezcla de URLs: 70% lentas, 10% 404, 10% redirecciones, 10% hosts caídos.
+
+    Con `prop_cuelga` esa fracción (tomada de las lentas) no responde a tiempo.
+    """
+    rnd = random.Random(semilla)
+    return [_url_stub(rnd.random(), bases, rnd, prop_cuelga, i) for i in range(n)]
+
+# -----------------------------
+# Benchmark: verificación de URLs
+# -----------------------------
+def bench_verificacion(cantidades, latencia=0.2, max_secuencial=200):
+    """Compara el bucle secuencial de `verificar_url` contra el verificador asíncrono"""
+    servidores, bases = levantar_granja_stub(latencia=latencia)
+    print(f"{'urls':>8} {'motor':>11} {'segundos':>10} {'urls/s':>9} {'iguales':>8}")
+    try:
+        for n in cantidades:
+            urls = generar_urls_stub(n, bases)
+            # Sin sondeo escalonado: mismos estados que `verificar_url`
+            resultados, t_async = _cronometrar(verificar_urls, urls, escalonado=False)
+            iguales = "-"
+            if n <= max_secuencial:
+                referencia, t_sec = _cronometrar(lambda: [agente.verificar_url(u) for u in urls])
+                iguales = str(resultados == referencia)
+                print(f"{n:>8} {'secuencial':>11} {t_sec:>10.2f} {n / t_sec:>9.1f} {'-':>8}")
+            print(f"{n:>8} {'async':>11} {t_async:>10.2f} {n / t_async:>9.1f} {iguales:>8}")
+    finally:
+        for servidor in servidores:
+            servidor.shutdown()
+
+
+# -----------------------------
+# Benchmark: sondeo escalonado con hosts muertos
+# -----------------------------
+def levantar_hosts_sin_respuesta(hosts=20):
+    """Hosts (127.0.0.230, ...) que nunca aceptan: backlog lleno, así el connect cuelga hasta el timeout"""
+    sockets, bases = [], []
+    for k in range(hosts):
+        servidor = socket.socket()
+        servidor.bind((f"127.0.0.{230 + k}", 0))
+        servidor.listen(0)
+        direccion = servidor.getsockname()
+        relleno = socket.create_connection(direccion)  # ocupa el único lugar del backlog
+        sockets += [servidor, relleno]
+        bases.append(f"http://{direccion[0]}:{direccion[1]}")
+    return sockets, bases
+
+
+def bench_escalonado(n, timeout=10, prop_muertos=0.3, prop_cuelga=0.02, hosts=32, latencia=0.05):
+    """Timeout único vs sondeo escalonado (DNS -> conexión -> lectura) con una fracción de sitios muertos.
+
+    La mitad de los muertos son dominios inexistentes (.invalid) y la otra
+    mitad hosts que no aceptan conexiones; `prop_cuelga` aceptan pero no responden.
+    """
+    servidores, bases = levantar_granja_stub(hosts=hosts, latencia=latencia, cuelgue=timeout + 1)
+    sockets, sin_respuesta = levantar_hosts_sin_respuesta()
+    rnd = random.Random(42)
+    urls = []
+    for i in range(n):
+        r = rnd.random()
+        if r < prop_muertos / 2:
+            urls.append(f"http://sitio-muerto-{i}.invalid/")
+        elif r < prop_muertos:
+            urls.append(f"{rnd.choice(sin_respuesta)}/{i}")
+        elif r < prop_muertos + prop_cuelga:
+            urls.append(f"{rnd.choice(bases)}/cuelga/{i}")
+        else:
+            urls.append(f"{rnd.choice(bases)}/lento/{i}")
+
+    print(f"{'modo':>11} {'segundos':>10} {'urls/s':>9}  estados")
+    try:
+        for escalonado in (False, True):
+            verificacion.reiniciar_estadisticas_sondeo()
+            resultados, t = _cronometrar(verificar_urls, urls, timeout=timeout, escalonado=escalonado)
+            estados = pd.Series([estado for _, estado in resultados]).value_counts().to_dict()
+            modo = "escalonado" if escalonado else "único"
+            print(f"{modo:>11} {t:>10.2f} {n / t:>9.1f}  {estados}")
+        stats = verificacion.estadisticas_sondeo
+        print(f"Escalones: {stats['dns']} DNS, {stats['conexion']} conexión, {stats['lectura']} lectura; "
+              f"{stats['segundos_ahorrados']:.0f}s de espera ahorrados en conexiones muertas")
+    finally:
+        for servidor in servidores:
+            servidor.shutdown()
+        for sock in sockets:
+            sock.close()
+
+
+# -----------------------------
+# Benchmark: sondeo HEAD vs GET completo
+# -----------------------------
+def bench_sondeo(n, latencia=0.05, tamano_cuerpo=2_000_000):
+    """Compara `verificar_url` con GET completo y en modo sonda (bytes y latencia por URL)"""
+    servidores, bases = levantar_granja_stub(latencia=latencia, tamano_cuerpo=tamano_cuerpo)
+    urls = generar_urls_stub(n, bases)
+    print(f"{'modo':>6} {'segundos':>10} {'ms/url':>8} {'MB':>10} {'iguales':>8}")
+    try:
+        referencia = None
+        for modo in ("get", "sonda"):
+            registro = []
+            resultados, t = _cronometrar(lambda: [agente.verificar_url(u, modo=modo, registro=registro) for u in urls])
+            iguales = "-" if referencia is None else str(resultados == referencia)
+            referencia = referencia or resultados
+            megas = sum(r["bytes"] for r in registro) / 1e6
+            print(f"{modo:>6} {t:>10.2f} {1000 * t / n:>8.1f} {megas:>10.2f} {iguales:>8}")
+    finally:
+        for servidor in servidores:
+            servidor.shutdown()
+
+
+# -----------------------------
+# Benchmark: sesión compartida vs requests.get sueltos
+# -----------------------------
+def bench_sesion(n):
+    """Latencia por petición con requests.get (conexión nueva cada vez) vs la sesión con pool"""
+    servidores, bases = levantar_granja_stub(hosts=1, latencia=0)
+    url = f"{bases[0]}/404"
+    print(f"{'cliente':>14} {'ms/peticion':>12}")
+    try:
+        for nombre, get in (("requests.get", requests.get), ("sesion", obtener_sesion().get)):
+            _, t = _cronometrar(lambda: [get(url, timeout=5) for _ in range(n)])
+            print(f"{nombre:>14} {1000 * t / n:>12.2f}")
+    finally:
+        for servidor in servidores:
+            servidor.shutdown()
+
+
+# -----------------------------
+# Benchmark: normalización de nombres
+# -----------------------------
+def _limpiar_referencia(nombre):
+    """Implementación original de limpiar_nombre_empresa (re.sub sin compilar, por elemento)"""
+    if pd.isna(nombre):
+        return ""
+    nombre = str(nombre).lower().strip()
+    sufijos = [
+        r'\b(inc|corp|corporation|ltd|limited|llc|llp|lp|co|company|enterprises|group|holding|international|global|worldwide|systems|solutions|software|technologies|technology|tech|services|consulting|digital|media|studios|games|entertainment|publishing|publishers|hardware|computers|computing)\b',
+        r'\b(gmbh|ag|sa|srl|spa|bv|nv|oy|ab|as|\&|\+|\.|,)\b'
+    ]
+    for sufijo in sufijos:
+        nombre = re.sub(sufijo, '', nombre)
+    nombre = re.sub(r'[^\w\s]', ' ', nombre)
+    nombre = re.sub(r'\s+', ' ', nombre).strip()
+    return nombre
+
+
+def bench_normalizacion(n):
+    """Original por elemento vs memoizado vs columna (factorize + .str) sobre n nombres sintéticos"""
+    serie = pd.Series(generar_nombres(n, prop_variantes=0.3))
+    referencia, t_ref = _cronometrar(lambda: [_limpiar_referencia(x) for x in serie])
+    normalizacion._limpiar.cache_clear()
+    memo, t_memo = _cronometrar(lambda: [normalizacion.limpiar_nombre(x) for x in serie])
+    columna, t_col = _cronometrar(normalizacion.limpiar_columna, serie)
+    print(f"{'metodo':>12} {'segundos':>10} {'iguales':>8}")
+    print(f"{'original':>12} {t_ref:>10.3f} {'-':>8}")
+    print(f"{'memoizado':>12} {t_memo:>10.3f} {str(memo == referencia):>8}")
+    print(f"{'columna':>12} {t_col:>10.3f} {str(columna.tolist() == referencia):>8}")
+
+
+# -----------------------------
+# Escritura de Excel
+# -----------------------------
+def generar_salida(n, semilla=42):
+    """DataFrame con las columnas de salida de agente.py y estados aleatorios"""
+    rnd = np.random.default_rng(semilla)
+    nombres = generar_nombres(n, semilla)
+    duplicado = rnd.random(n) < 0.05
+    encontrada = rnd.random(n) < 0.3
+    return pd.DataFrame({
+        "Company": nombres,
+        "Website": [f"https://www.{re.sub(r'[^a-z]', '', x.lower())}.com" for x in nombres],
+        "is_duplicate": duplicado,
+        "duplicate_group": np.where(duplicado, "Group_1", None),
+        "found_url": np.where(encontrada, "https://found.example.com", None),
+        "search_notes": np.where(encontrada, "score 95, domain: found.example.com", None),
+        "search_queries": np.where(encontrada, 1, np.nan),
+        "url_works": np.where(rnd.random(n) < 0.2, "False", "True"),
+        "verification_status": "OK",
+        "company_type": "Publisher",
+        "category_description": "Software",
+    })
+
+
+def _excel_referencia(df, ruta):
+    """Fase 4 original: to_excel, load_workbook y relleno celda por celda"""
+    df.to_excel(ruta, index=False)
+    wb = load_workbook(ruta)
+    ws = wb.active
+    for row_idx in range(2, ws.max_row + 1):
+        df_row_idx = row_idx - 2
+        if df.at[df_row_idx, 'is_duplicate']:
+            relleno = AZUL
+        elif df.at[df_row_idx, 'url_works'] == "False":
+            relleno = AMARILLO
+        elif pd.notna(df.at[df_row_idx, 'found_url']):
+            relleno = VERDE
+        else:
+            continue
+        for col in range(1, ws.max_column + 1):
+            ws.cell(row=row_idx, column=col).fill = relleno
+    wb.save(ruta)
+
+
+def _colores_y_valores(ruta):
+    ws = load_workbook(ruta, read_only=True).active
+    return [
+        [(c.value, c.fill.fgColor.rgb if getattr(c, "fill", None) and c.fill.fill_type else None) for c in fila]
+        for fila in ws.rows
+    ]
+
+
+def bench_excel(filas, max_referencia=5000):
+    """Fase 4 original vs escritura write-only en una pasada"""
+    print(f"{'filas':>8} {'original(s)':>12} {'una pasada(s)':>14} {'iguales':>8}")
+    with tempfile.TemporaryDirectory() as directorio:
+        nuevo = os.path.join(directorio, "bench_nuevo.xlsx")
+        referencia = os.path.join(directorio, "bench_referencia.xlsx")
+        for n in filas:
+            df = generar_salida(n)
+            _, t_nuevo = _cronometrar(lambda: escribir_excel(df, nuevo, rellenos_por_estado(df)))
+            t_ref, iguales = "-", "-"
+            if n <= max_referencia:
+                _, t_ref = _cronometrar(_excel_referencia, df, referencia)
+                iguales = _colores_y_valores(referencia) == _colores_y_valores(nuevo)
+                t_ref = f"{t_ref:.2f}"
+            print(f"{n:>8} {t_ref:>12} {t_nuevo:>14.2f} {str(iguales):>8}")
+
+
+# -----------------------------
+# Benchmark: pipeline completo offline
+# -----------------------------
+# agente.main / agentev2.main corren de punta a punta sin red: Google CSE se
+# reemplaza por un servidor local que devuelve resultados sintéticos y los
+# sitios por la granja stub (latencia, 404, redirecciones, cuelgues y hosts
+# caídos). Cada corrida usa un directorio temporal (cachés y checkpoints en
+# frío) y el reporte de instrumentacion.py para el tiempo de cada fase. Con
+# la misma semilla los datos son idénticos, así que los números se pueden
+# comparar entre commits.
+
+class ManejadorCSE(BaseHTTPRequestHandler):
+    """Imita /customsearch/v1: el sitio "oficial" de la empresa (en la granja) más un perfil en LinkedIn"""
+    latencia = 0.05
+    bases = []
+    prop_cuelga = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.latencia)
+        consulta = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        # La primera consulta de la cascada lleva el nombre entre comillas
+        nombre = consulta.split('"')[1] if consulta.startswith('"') else consulta
+        slug = normalizacion.limpiar_nombre(nombre).replace(" ", "") or "empresa"
+        # Destino determinista por nombre: misma respuesta en todas las corridas
+        semilla = zlib.crc32(slug.encode())
+        rnd = random.Random(semilla)
+        oficial = _url_stub(rnd.random(), self.bases, rnd, self.prop_cuelga, slug)
+        items = [
+            {"title": f"{nombre} - Official Site", "link": oficial,
+             "snippet": f"Welcome to {nombre}", "displayLink": f"www.{slug}.com"},
+            {"title": f"{nombre} | LinkedIn", "link": f"https://www.linkedin.com/company/{slug}",
+             "snippet": "", "displayLink": "www.linkedin.com"},
+        ]
+        cuerpo = json.dumps({"items": items}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def levantar_cse_stub(bases, latencia=0.05, prop_cuelga=0.0):
+    manejador = type("ManejadorCSE", (ManejadorCSE,), {
+        "latencia": latencia, "bases": bases, "prop_cuelga": prop_cuelga
+    })
+    servidor = ServidorStub(("127.0.0.1", 0), manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/customsearch/v1"
+
+
+def generar_publishers(n, bases, semilla=42, prop_sin_url=0.4, prop_cuelga=0.0):
+    """Lista sintética de publishers: nombres con casi duplicados y URLs de la granja (o vacías)"""
+    rnd = random.Random(semilla)
+    websites = [None if rnd.random() < prop_sin_url else _url_stub(rnd.random(), bases, rnd, prop_cuelga, i)
+                for i in range(n)]
+    return pd.DataFrame({"Company Name": generar_nombres(n, semilla), "Website": websites})
+
+
+async def _sin_dns(loop, semaforo, dominio):
+    return False  # offline: ningún dominio adivinado existe, todo pasa por el CSE stub
+
+
+def preparar_offline(url_cse, qps=50.0, timeout=2):
+    """Apunta agente y agentev2 al CSE stub, sin DNS real y con timeout de verificación corto"""
+    for modulo in (agente, agentev2):
+        modulo.API_KEY, modulo.CSE_ID, modulo.URL_CSE = "bench", "bench", url_cse
+        modulo.limitador_cse = LimitadorTasa(por_segundo=qps, rafaga=max(1, int(qps)))
+    busqueda._resuelve = _sin_dns
+    verificacion.TIMEOUT = timeout
+
+
+def correr_pipeline(modulo, df, formatos="csv"):
+    """Corre `modulo.main()` sobre `df` en un directorio temporal; devuelve (segundos totales, reporte)"""
+    original = os.getcwd()
+    entorno = {"VERIFICACION_FORMATOS": formatos, "VERIFICACION_INCREMENTAL": "0"}
+    anterior = {k: os.environ.get(k) for k in (*entorno, "VERIFICACION_REPORTE", "VERIFICACION_TAMANO_BLOQUE")}
+    with tempfile.TemporaryDirectory() as directorio:
+        os.makedirs(os.path.join(directorio, "app"))
+        df.to_csv(os.path.join(directorio, "app", "publishers.csv"), index=False)
+        ruta_reporte = os.path.join(directorio, "reporte.json")
+        try:
+            os.chdir(directorio)
+            os.environ.update(entorno, VERIFICACION_REPORTE=ruta_reporte)
+            os.environ.pop("VERIFICACION_TAMANO_BLOQUE", None)
+            instrumentacion.reiniciar()
+            # La salida por fila de los scripts no es parte de lo que se mide
+            with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+                _, segundos = _cronometrar(modulo.main)
+            with open(ruta_reporte, encoding="utf-8") as f:
+                reporte = json.load(f)
+        finally:
+            os.chdir(original)
+            instrumentacion.desactivar()
+            for clave, valor in anterior.items():
+                if valor is None:
+                    os.environ.pop(clave, None)
+                else:
+                    os.environ[clave] = valor
+    return segundos, reporte
+
+
+def _bench_funciones(n, df):
+    """Scoring, dedup y categorización sueltos sobre la misma lista (sin red)"""
+    nombres = df["Company Name"].tolist()
+    candidatos = [
+        [{"href": f"https://www.{normalizacion.limpiar_nombre(nombre).replace(' ', '')}{tld}",
+          "displayLink": f"www.{normalizacion.limpiar_nombre(nombre).replace(' ', '')}{tld}",
+          "title": f"{nombre} - Official Site", "snippet": ""} for tld in (".com", ".io", ".net")]
+        + [{"href": f"https://www.linkedin.com/company/{i}", "displayLink": "www.linkedin.com",
+            "title": nombre, "snippet": ""}]
+        for i, nombre in enumerate(nombres)
+    ]
+    tiempos = {}
+    _, tiempos["puntuacion"] = _cronometrar(
+        lambda: [PuntuadorOficial(nombre).mejor(c) for nombre, c in zip(nombres, candidatos)])
+    _, tiempos["dedup.agente"] = _cronometrar(agente.detectar_duplicados, df, "Company Name")
+    _, tiempos["dedup.agentev2"] = _cronometrar(agentev2.detectar_duplicados, df, "Company Name")
+    _, tiempos["categorizacion"] = _cronometrar(categorizar_columna, df["Company Name"], df["Website"])
+    return tiempos
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_pipeline(filas, scripts=("agente", "agentev2"), hosts=32, latencia=0.05, latencia_cse=0.05,
+                   prop_cuelga=0.01, timeout=2, qps=50.0, formatos="csv", ruta_json=None):
+    """Tiempo y filas/s de cada fase de los scripts y de las funciones sueltas, para 1k/10k/100k filas"""
+    servidores, bases = levantar_granja_stub(hosts=hosts, latencia=latencia, cuelgue=timeout + 1)
+    servidor_cse, url_cse = levantar_cse_stub(bases, latencia_cse, prop_cuelga)
+    servidores.append(servidor_cse)
+    preparar_offline(url_cse, qps, timeout)
+    resultados = []
+    print(f"{'filas':>8} {'componente':>28} {'segundos':>10} {'filas/s':>10}")
+    try:
+        for n in filas:
+            df = generar_publishers(n, bases, prop_cuelga=prop_cuelga)
+            medidas = {f"funcion.{k}": v for k, v in _bench_funciones(n, df).items()}
+            for nombre in scripts:
+                segundos, reporte = correr_pipeline({"agente": agente, "agentev2": agentev2}[nombre],
+                                                    df.copy(), formatos)
+                medidas[f"{nombre}.total"] = segundos
+                medidas.update({f"{nombre}.{fase}": s for fase, s in reporte["fases_s"].items()})
+            for componente, segundos in medidas.items():
+                print(f"{n:>8} {componente:>28} {segundos:>10.2f} {n / segundos if segundos else 0:>10.0f}")
+                resultados.append({"filas": n, "componente": componente, "segundos": round(segundos, 4),
+                                   "filas_por_segundo": round(n / segundos, 1) if segundos else None})
+    finally:
+        for servidor in servidores:
+            servidor.shutdown()
+    if ruta_json:
+        with open(ruta_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": _commit_actual(), "python": sys.version.split()[0],
+                "parametros": {"hosts": hosts, "latencia": latencia, "latencia_cse": latencia_cse,
+                               "prop_cuelga": prop_cuelga, "timeout": timeout, "qps": qps, "formatos": formatos},
+                "resultados": resultados,
+            }, f, indent=2)
+        print(f"Resultados guardados en '{ruta_json}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    p_dedup = sub.add_parser("dedup", help="deduplicación por bloques/matriz vs O(n²)")
+    p_dedup.add_argument("--filas", type=int, nargs="+", default=[1000, 2000, 10000, 50000])
+    p_dedup.add_argument("--max-exhaustivo", type=int, default=2000,
+                         help="tamaño máximo en el que también se corre la versión O(n²)")
+    p_dedup.add_argument("--procesos", type=int, default=1, help="también mide la versión en un pool de procesos")
+
+    p_verif = sub.add_parser("verificacion", help="verificación secuencial vs asíncrona contra un servidor local")
+    p_verif.add_argument("--urls", type=int, nargs="+", default=[200, 2000])
+    p_verif.add_argument("--latencia", type=float, default=0.2, help="segundos de respuesta de los hosts lentos")
+    p_verif.add_argument("--max-secuencial", type=int, default=200,
+                         help="tamaño máximo en el que también se corre el bucle secuencial")
+
+    p_esc = sub.add_parser("escalonado", help="timeout único vs sondeo DNS -> conexión -> lectura con sitios muertos")
+    p_esc.add_argument("--urls", type=int, default=2000)
+    p_esc.add_argument("--timeout", type=float, default=10)
+    p_esc.add_argument("--prop-muertos", type=float, default=0.3, help="fracción de sitios muertos (DNS o sin conexión)")
+    p_esc.add_argument("--prop-cuelga", type=float, default=0.02, help="fracción que conecta pero no responde")
+
+    p_sondeo = sub.add_parser("sondeo", help="verificar_url con GET completo vs HEAD/GET en streaming")
+    p_sondeo.add_argument("--urls", type=int, default=200)
+    p_sondeo.add_argument("--latencia", type=float, default=0.05)
+    p_sondeo.add_argument("--tamano-cuerpo", type=int, default=2_000_000, help="bytes de cada página")
+
+    p_sesion = sub.add_parser("sesion", help="requests.get sueltos vs sesión con keep-alive y caché DNS")
+    p_sesion.add_argument("--peticiones", type=int, default=500)
+
+    p_norm = sub.add_parser("normalizacion", help="limpiar_nombre_empresa por elemento vs por columna")
+    p_norm.add_argument("--nombres", type=int, default=100_000)
+
+    p_excel = sub.add_parser("excel", help="to_excel + load_workbook + relleno por celda vs write-only")
+    p_excel.add_argument("--filas", type=int, nargs="+", default=[2000, 5000, 100_000])
+    p_excel.add_argument("--max-referencia", type=int, default=5000,
+                         help="tamaño máximo en el que también se corre la fase 4 original")
+
+    p_pipe = sub.add_parser("pipeline", help="agente/agentev2 de punta a punta contra CSE y sitios simulados")
+    p_pipe.add_argument("--filas", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    p_pipe.add_argument("--scripts", nargs="+", choices=["agente", "agentev2"], default=["agente", "agentev2"])
+    p_pipe.add_argument("--hosts", type=int, default=32, help="hosts de la granja de sitios")
+    p_pipe.add_argument("--latencia", type=float, default=0.05, help="segundos de respuesta de los sitios")
+    p_pipe.add_argument("--latencia-cse", type=float, default=0.05, help="segundos de respuesta del CSE stub")
+    p_pipe.add_argument("--prop-cuelga", type=float, default=0.01, help="fracción de sitios que no responden")
+    p_pipe.add_argument("--timeout", type=float, default=2, help="timeout de verificación (segundos)")
+    p_pipe.add_argument("--qps", type=float, default=50.0, help="consultas/s permitidas por el limitador CSE")
+    p_pipe.add_argument("--formatos", default="csv", help="VERIFICACION_FORMATOS de las corridas")
+    p_pipe.add_argument("--json", help="guarda los resultados (con el commit actual) para comparar")
+
+    args = parser.parse_args()
+    if args.benchmark == "dedup":
+        bench_dedup(args.filas, args.max_exhaustivo, args.procesos)
+    elif args.benchmark == "verificacion":
+        bench_verificacion(args.urls, args.latencia, args.max_secuencial)
+    elif args.benchmark == "escalonado":
+        bench_escalonado(args.urls, args.timeout, args.prop_muertos, args.prop_cuelga)
+    elif args.benchmark == "sondeo":
+        bench_sondeo(args.urls, args.latencia, args.tamano_cuerpo)
+    elif args.benchmark == "sesion":
+        bench_sesion(args.peticiones)
+    elif args.benchmark == "normalizacion":
+        bench_normalizacion(args.nombres)
+    elif args.benchmark == "excel":
+        bench_excel(args.filas, args.max_referencia)
+    elif args.benchmark == "pipeline":
+        bench_pipeline(args.filas, args.scripts, args.hosts, args.latencia, args.latencia_cse,
+                       args.prop_cuelga, args.timeout, args.qps, args.formatos, args.json)
+
+
+if __name__ == "__main__":
+    main()
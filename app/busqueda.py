@@ -0,0 +1,204 @@
+import asyncio
+import re
+import socket
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache_busquedas import normalizar_consulta
+from http_cliente import obtener_sesion
+from instrumentacion import instrumentar
+from verificacion import leer_portadas_async, verificar_urls_async
+
+# -----------------------------
+# Fase de búsqueda concurrente
+# -----------------------------
+# Las búsquedas de distintas empresas son independientes: se lanzan en un
+# pool de hilos y el ritmo real lo marca el limitador compartido de CSE, no
+# la suma de las latencias de cada consulta. Los nombres repetidos (tras
+# normalizar) se buscan una sola vez.
+
+MAX_WORKERS = 8
+
+
+def buscar_sitios_concurrente(consultas_por_fila, buscar, max_workers=MAX_WORKERS, al_completar=None):
+    """Ejecuta `buscar(consulta)` para cada fila en paralelo y devuelve {fila: resultado}.
+
+    `consultas_por_fila` es un dict {fila: consulta}. Cada consulta normalizada
+    se busca una única vez y su resultado se reparte a todas sus filas; el dict
+    devuelto sigue el orden de `consultas_por_fila`. Si se pasa
+    `al_completar(fila, resultado)`, se llama (en este hilo) por cada fila en
+    cuanto su búsqueda termina.
+    """
+    filas_por_clave = {}
+    unicas = {}
+    for fila, consulta in consultas_por_fila.items():
+        clave = normalizar_consulta(consulta)
+        unicas.setdefault(clave, consulta)
+        filas_por_clave.setdefault(clave, []).append(fila)
+
+    # Una conexión a CSE por hilo en el pool de la sesión compartida
+    obtener_sesion("cse", workers=max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futuros = {executor.submit(buscar, consulta): clave for clave, consulta in unicas.items()}
+        por_clave = {}
+        for futuro in as_completed(futuros):
+            clave = futuros[futuro]
+            por_clave[clave] = futuro.result()
+            if al_completar is not None:
+                for fila in filas_por_clave[clave]:
+                    al_completar(fila, por_clave[clave])
+    except BaseException:
+        # Ctrl-C o error: no esperar a las búsquedas que aún no empezaron
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    return {
+        fila: por_clave[normalizar_consulta(consulta)]
+        for fila, consulta in consultas_por_fila.items()
+    }
+
+# -----------------------------
+# Cascada de consultas con salida temprana
+# -----------------------------
+# Las variantes de consulta se lanzan de a una; tras cada una se puntúan los
+# candidatos nuevos y, si el mejor ya supera el umbral de confianza, no se
+# gastan más consultas en esa empresa.
+
+UMBRAL_CONFIANZA = 90
+
+
+def buscar_en_cascada(consultas, buscar_consulta, puntuar, umbral=UMBRAL_CONFIANZA):
+    """Devuelve (candidatos, consultas_usadas).
+
+    `buscar_consulta(query)` devuelve (candidatos, peticiones): la lista de
+    candidatos de una consulta y cuántas peticiones reales a la API hizo (0 si
+    salió de la caché o no se pudo lanzar). `puntuar(candidato)` da el score de
+    un candidato. Con umbral=None se lanzan todas las consultas.
+    """
+    candidatos, urls_vistas = [], set()
+    mejor = None
+    usadas = 0
+    for query in consultas:
+        encontrados, peticiones = buscar_consulta(query)
+        usadas += peticiones
+        for candidato in encontrados:
+            if candidato["href"] in urls_vistas:
+                continue
+            urls_vistas.add(candidato["href"])
+            candidatos.append(candidato)
+            score = puntuar(candidato)
+            if mejor is None or score > mejor:
+                mejor = score
+        if umbral is not None and mejor is not None and mejor >= umbral:
+            break
+    return candidatos, usadas
+
+# -----------------------------
+# Atajo: adivinar el dominio antes de gastar cuota de búsqueda
+# -----------------------------
+# Muchos nombres coinciden con su dominio (Zscaler -> zscaler.com). Antes de
+# ir a Google CSE se prueban dominios derivados del nombre completo (sin
+# quitarle "games", "media", etc.: "Epic Games" no es epic.com): primero DNS
+# (barato, descarta la mayoría) y luego un sondeo HTTP ligero. Sólo se acepta
+# el dominio si su etiqueta contiene todas las palabras significativas del
+# nombre, su portada (título o texto) también las menciona y no es de un
+# dominio aparcado o en venta, y el scoring de sitio oficial, con ese título
+# y texto, no lo descarta; el resto de los nombres sigue por la búsqueda
+# normal. Ante empate de score gana el primero en orden de TLDS_ADIVINADOS.
+
+TLDS_ADIVINADOS = (".com", ".net", ".io", ".org")
+# Piso del scoring: palabras en el dominio + TLD conocido, sin penalizaciones
+# (una palabra con dominio exacto da 80+, dos palabras unidas 65+)
+UMBRAL_DOMINIO = 65
+MAX_DNS_EN_VUELO = 50
+# Formas jurídicas y conectores que no forman parte del dominio
+PALABRAS_NO_SIGNIFICATIVAS = {"inc", "corp", "ltd", "llc", "gmbh", "srl", "the", "and"}
+# Frases típicas de las páginas de dominios aparcados o en venta
+DOMINIO_APARCADO = re.compile(
+    r"domain (?:name )?(?:is |may be )?for sale|buy this domain|this domain is parked|parked (?:free|domain)"
+    r"|domain parking|make an offer on this domain|dominio (?:está )?en venta|sedo|dan\.com|hugedomains",
+    re.I,
+)
+
+
+def palabras_significativas(nombre):
+    """Palabras del nombre en minúsculas (sin formas jurídicas, conectores ni palabras de 1-2 letras)"""
+    palabras = re.findall(r'[a-z0-9]+', str(nombre).lower())
+    return [p for p in palabras if len(p) > 2 and p not in PALABRAS_NO_SIGNIFICATIVAS]
+
+
+def dominios_candidatos(nombre):
+    """Dominios plausibles para el nombre completo ("Zen Video" -> zenvideo.com, zen-video.com, ...)"""
+    palabras = palabras_significativas(nombre)
+    if not palabras:
+        return []
+    bases = ["".join(palabras)]
+    if len(palabras) > 1:
+        bases.append("-".join(palabras))
+    return [base + tld for base in bases for tld in TLDS_ADIVINADOS]
+
+
+def cubre_nombre(dominio, palabras):
+    """True si la etiqueta del dominio (sin TLD ni guiones) contiene todas las palabras"""
+    etiqueta = dominio.rsplit(".", 1)[0].replace("-", "")
+    return bool(palabras) and all(p in etiqueta for p in palabras)
+
+
+def portada_confirma(titulo, texto, palabras):
+    """True si la portada menciona todas las palabras y no es de un dominio aparcado o en venta"""
+    contenido = f"{titulo} {texto}".lower()
+    return bool(palabras) and all(p in contenido for p in palabras) and not DOMINIO_APARCADO.search(contenido)
+
+
+async def _resuelve(loop, semaforo, dominio):
+    async with semaforo:
+        try:
+            await loop.getaddrinfo(dominio, 443)
+            return True
+        except (socket.gaierror, UnicodeError, OSError):
+            return False
+
+
+async def _adivinar_async(consultas, puntuar, umbral):
+    loop = asyncio.get_running_loop()
+    semaforo = asyncio.Semaphore(MAX_DNS_EN_VUELO)
+    por_consulta = {consulta: dominios_candidatos(consulta) for consulta in consultas}
+    todos = sorted({d for dominios in por_consulta.values() for d in dominios})
+
+    resueltos = await asyncio.gather(*(_resuelve(loop, semaforo, d) for d in todos))
+    con_dns = [d for d, ok in zip(todos, resueltos) if ok]
+    verificados = await verificar_urls_async([f"https://{d}" for d in con_dns])
+    funcionan = [d for d, (ok, _) in zip(con_dns, verificados) if ok]
+    portadas = dict(zip(funcionan, await leer_portadas_async([f"https://{d}" for d in funcionan])))
+
+    resultados = {}
+    for consulta, dominios in por_consulta.items():
+        palabras = palabras_significativas(consulta)
+        puntuados = [(puntuar(f"https://{d}", d, *portadas[d], consulta), d) for d in dominios
+                     if d in portadas and cubre_nombre(d, palabras) and portada_confirma(*portadas[d], palabras)]
+        if puntuados:
+            # `dominios` va en orden de TLDS_ADIVINADOS: ante empate gana el primero
+            score, dominio = max(puntuados, key=lambda p: p[0])
+            if score >= umbral:
+                resultados[consulta] = (f"https://{dominio}", f"domain guess, score {score}, domain: {dominio}")
+    return resultados
+
+
+@instrumentar("busqueda.resolver_por_dominio")
+def resolver_por_dominio(consultas_por_fila, puntuar, umbral=UMBRAL_DOMINIO):
+    """Intenta resolver cada fila adivinando su dominio; devuelve {fila: (url, notas)} sólo de los aciertos.
+
+    `puntuar(url, dominio, titulo, texto, consulta)` aplica el scoring de sitio oficial
+    con el título y el texto leídos de la portada (misma firma que `es_sitio_oficial`).
+    """
+    unicas = {}
+    for consulta in consultas_por_fila.values():
+        unicas.setdefault(normalizar_consulta(consulta), consulta)
+    aciertos = asyncio.run(_adivinar_async(list(unicas.values()), puntuar, umbral))
+    resultados = {}
+    for fila, consulta in consultas_por_fila.items():
+        acierto = aciertos.get(unicas[normalizar_consulta(consulta)])
+        if acierto:
+            resultados[fila] = acierto
+    return resultados
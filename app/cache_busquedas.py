@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+import time
+
+# -----------------------------
+# Caché persistente de resultados de Google CSE
+# -----------------------------
+# Guarda en SQLite los items devueltos por cada consulta (normalizada), para
+# que una nueva corrida sobre el mismo publishers.csv no gaste cuota ni
+# latencia en nombres ya buscados. Las entradas caducan tras `ttl` segundos y
+# la tabla nunca pasa de `max_entradas`: cada inserción descarta, en la misma
+# transacción, las menos usadas recientemente que sobren (COUNT(*) y el
+# índice por último acceso hacen que sea barato hacerlo siempre).
+
+RUTA_CACHE = "./app/cache_busquedas.sqlite"
+TTL = 30 * 24 * 3600  # 30 días
+MAX_ENTRADAS = 100_000
+
+
+def normalizar_consulta(consulta):
+    """Clave de caché: minúsculas y espacios colapsados"""
+    return " ".join(str(consulta).lower().split())
+
+
+class CacheBusquedas:
+    """Caché clave -> items de CSE con TTL, desalojo LRU y contadores de aciertos"""
+
+    def __init__(self, ruta=RUTA_CACHE, ttl=TTL, max_entradas=MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS busquedas ("
+            " consulta TEXT PRIMARY KEY, items TEXT NOT NULL,"
+            " creado REAL NOT NULL, ultimo_acceso REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_acceso ON busquedas (ultimo_acceso)")
+        self._conn.commit()
+
+    def obtener(self, consulta):
+        """Devuelve los items cacheados de la consulta o None si no hay o caducaron"""
+        clave = normalizar_consulta(consulta)
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT items, creado FROM busquedas WHERE consulta = ?", (clave,)
+            ).fetchone()
+            if fila is None or ahora - fila[1] > self.ttl:
+                if fila is not None:
+                    self._conn.execute("DELETE FROM busquedas WHERE consulta = ?", (clave,))
+                    self._conn.commit()
+                self.fallos += 1
+                return None
+            self._conn.execute(
+                "UPDATE busquedas SET ultimo_acceso = ? WHERE consulta = ?", (ahora, clave)
+            )
+            self._conn.commit()
+            self.aciertos += 1
+            return json.loads(fila[0])
+
+    def guardar(self, consulta, items):
+        """Guarda los items de una consulta respondida correctamente"""
+        clave = normalizar_consulta(consulta)
+        ahora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO busquedas (consulta, items, creado, ultimo_acceso)"
+                " VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(items), ahora, ahora)
+            )
+            self._desalojar()
+            self._conn.commit()
+
+    def _desalojar(self):
+        """Borra las entradas menos usadas recientemente por encima de max_entradas"""
+        cursor = self._conn.execute(
+            "DELETE FROM busquedas WHERE rowid IN ("
+            " SELECT rowid FROM busquedas ORDER BY ultimo_acceso"
+            " LIMIT max(0, (SELECT COUNT(*) FROM busquedas) - ?))",
+            (self.max_entradas,)
+        )
+        self.desalojos += cursor.rowcount
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+            "desalojos": self.desalojos,
+        }
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
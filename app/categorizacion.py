@@ -0,0 +1,171 @@
+import re
+
+import pandas as pd
+
+from instrumentacion import instrumentar
+
+# -----------------------------
+# Categorizador precompilado
+# -----------------------------
+# Misma tabla y mismas reglas que `categorizar_empresa`, pero las ~120
+# palabras clave se compilan una sola vez (al importar) en una expresión
+# regular con forma de trie. Una única pasada sobre "nombre website" devuelve
+# todas las apariciones: en cada posición se captura la palabra clave más
+# larga que empieza ahí y las demás (prefijos o subcadenas suyas, como
+# "game" dentro de "games") se derivan de una tabla precalculada.
+
+CATEGORIAS = {
+    # Publisher categories
+    "Game Publisher": [
+        "games", "gaming", "entertainment", "studios", "interactive", "digital entertainment",
+        "game", "publisher", "publishing", "media", "activision", "electronic arts", "ubisoft"
+    ],
+    "Book Publisher": [
+        "books", "publishing", "publications", "press", "editorial", "penguin", "harper",
+        "macmillan", "scholastic", "textbook", "academic press"
+    ],
+    "Software Publisher": [
+        "software", "applications", "apps", "programs", "development", "dev", "solutions",
+        "microsoft", "adobe", "autodesk", "oracle"
+    ],
+    "Media Publisher": [
+        "media", "news", "magazine", "newspaper", "broadcast", "streaming", "content",
+        "netflix", "disney", "warner", "paramount"
+    ],
+
+    # Hardware categories
+    "Computer Hardware": [
+        "computers", "pc", "laptop", "desktop", "workstation", "server", "dell", "hp",
+        "lenovo", "asus", "acer", "apple computer"
+    ],
+    "Components Provider": [
+        "components", "parts", "processors", "cpu", "gpu", "memory", "storage", "motherboard",
+        "intel", "amd", "nvidia", "corsair", "kingston", "seagate", "western digital"
+    ],
+    "Network Hardware": [
+        "network", "networking", "router", "switch", "firewall", "wireless", "wifi",
+        "cisco", "netgear", "tp-link", "ubiquiti", "juniper"
+    ],
+    "Mobile Hardware": [
+        "mobile", "smartphone", "tablet", "phone", "cellular", "samsung", "apple iphone",
+        "huawei", "xiaomi", "oneplus"
+    ],
+
+    # Service categories
+    "Cloud Services": [
+        "cloud", "hosting", "datacenter", "infrastructure", "saas", "paas", "iaas",
+        "amazon aws", "google cloud", "microsoft azure", "digitalocean"
+    ],
+    "IT Services": [
+        "consulting", "services", "integration", "support", "managed services",
+        "ibm services", "accenture", "capgemini", "tcs"
+    ],
+    "Security Provider": [
+        "security", "cybersecurity", "antivirus", "firewall", "encryption", "norton",
+        "mcafee", "symantec", "kaspersky", "palo alto"
+    ]
+}
+
+
+def _regex_trie(palabras):
+    """Construye una alternancia con forma de trie (sin backtracking entre ramas)"""
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for char in palabra:
+            nodo = nodo.setdefault(char, {})
+        nodo[""] = {}
+
+    def patron(nodo):
+        fin = "" in nodo
+        ramas = [re.escape(char) + patron(hijo) for char, hijo in sorted(nodo.items()) if char]
+        if not ramas:
+            return ""
+        cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+        # Greedy: se prefiere la palabra más larga y se cae a la corta si no sigue
+        return f"(?:{cuerpo})?" if fin else cuerpo
+
+    return patron(trie)
+
+
+def _tipo_y_descripcion(categoria):
+    if "Publisher" in categoria:
+        return "Publisher", categoria.replace(" Publisher", "").replace("_", " ")[:50]
+    elif "Hardware" in categoria or "Provider" in categoria:
+        return "Hardware Provider", categoria.replace(" Hardware", "").replace(" Provider", "").replace("_", " ")[:50]
+    elif "Services" in categoria:
+        return "Service Provider", categoria.replace(" Services", "").replace(" Provider", "").replace("_", " ")[:50]
+    return "Other", categoria.replace("_", " ")[:50]
+
+
+# Tablas precalculadas al importar
+_PALABRAS = sorted({p for palabras in CATEGORIAS.values() for p in palabras})
+_REGEX = re.compile(f"(?=({_regex_trie(_PALABRAS)}))")
+# Palabra clave -> [(palabra contenida, desplazamiento)] (incluida ella misma en 0)
+_CONTENIDAS = {
+    larga: [(corta, m.start()) for corta in _PALABRAS
+            for m in re.finditer(f"(?={re.escape(corta)})", larga)]
+    for larga in _PALABRAS
+}
+# Palabra clave -> [(índice de categoría, ...)] en el orden original de CATEGORIAS
+_NOMBRES_CATEGORIAS = list(CATEGORIAS)
+_CATEGORIAS_DE = {
+    palabra: [i for i, cat in enumerate(_NOMBRES_CATEGORIAS) if palabra in CATEGORIAS[cat]]
+    for palabra in _PALABRAS
+}
+_RESULTADOS = [_tipo_y_descripcion(cat) for cat in _NOMBRES_CATEGORIAS]
+
+# Valores posibles de company_type y category_description (categóricas de salida)
+TIPOS_EMPRESA = sorted({tipo for tipo, _ in _RESULTADOS} | {"Unknown"})
+DESCRIPCIONES = sorted({descripcion for _, descripcion in _RESULTADOS} | {"No data", "Unclassified"})
+
+
+def palabras_encontradas(nombre, texto_completo):
+    """Devuelve {palabra: aparece_en_nombre} para todas las palabras clave del texto (una pasada)"""
+    limite = len(nombre)
+    encontradas = {}
+    for match in _REGEX.finditer(texto_completo):
+        inicio = match.start()
+        for palabra, desplazamiento in _CONTENIDAS[match.group(1)]:
+            en_nombre = inicio + desplazamiento + len(palabra) <= limite
+            encontradas[palabra] = encontradas.get(palabra, False) or en_nombre
+    return encontradas
+
+
+def categorizar(nombre, website=""):
+    """Equivalente precompilado de `categorizar_empresa`: devuelve (company_type, category_description)"""
+    if pd.isna(nombre):
+        return "Unknown", "No data"
+
+    nombre = str(nombre).lower()
+    website = str(website).lower() if not pd.isna(website) else ""
+
+    puntuaciones = [0] * len(_NOMBRES_CATEGORIAS)
+    for palabra, en_nombre in palabras_encontradas(nombre, f"{nombre} {website}").items():
+        for i in _CATEGORIAS_DE[palabra]:
+            puntuaciones[i] += 3 if en_nombre else 1
+
+    # max() se queda con la primera categoría en caso de empate, como el original
+    mejor = max(range(len(puntuaciones)), key=puntuaciones.__getitem__)
+    if puntuaciones[mejor] > 0:
+        return _RESULTADOS[mejor]
+    return "Unknown", "Unclassified"
+
+
+@instrumentar("categorizacion.categorizar_columna")
+def categorizar_columna(nombres, websites=None):
+    """Categoriza columnas completas; devuelve un DataFrame con company_type y category_description.
+
+    Los pares (nombre, website) repetidos se categorizan una sola vez.
+    """
+    nombres = pd.Series(nombres)
+    if websites is None:
+        websites = pd.Series([""] * len(nombres), index=nombres.index)
+    memo = {}
+    resultados = []
+    for nombre, website in zip(nombres, websites):
+        clave = (None if pd.isna(nombre) else str(nombre), None if pd.isna(website) else str(website))
+        if clave not in memo:
+            memo[clave] = categorizar(nombre, website)
+        resultados.append(memo[clave])
+    return pd.DataFrame(resultados, index=nombres.index, columns=["company_type", "category_description"])
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# -----------------------------
+# Checkpoints de la corrida
+# -----------------------------
+# Cada fila terminada en una fase (búsqueda, verificación) se guarda al
+# momento en SQLite, y los resultados de fases completas (grupos de
+# duplicados) también. Si la corrida se corta (error, Ctrl-C), la siguiente
+# sobre el mismo archivo de entrada reanuda: sólo procesa las filas que
+# faltan. Si el archivo de entrada cambió, el checkpoint se descarta.
+
+RUTA_CHECKPOINT = "./app/checkpoint.sqlite"
+
+
+def huella_archivo(ruta):
+    """SHA-1 del contenido del archivo (identifica la entrada del checkpoint)"""
+    sha = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class Checkpoint:
+    """Almacén (fase, fila) -> resultado, thread-safe, ligado a una huella de la entrada"""
+
+    def __init__(self, huella, ruta=RUTA_CHECKPOINT):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS filas ("
+            " fase TEXT NOT NULL, fila INTEGER NOT NULL, datos TEXT NOT NULL, guardado REAL NOT NULL,"
+            " PRIMARY KEY (fase, fila))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS fases (fase TEXT PRIMARY KEY, datos TEXT NOT NULL)")
+
+        fila = self._conn.execute("SELECT valor FROM meta WHERE clave = 'huella'").fetchone()
+        self.reanudado = fila is not None and fila[0] == huella
+        if not self.reanudado:
+            self._conn.execute("DELETE FROM filas")
+            self._conn.execute("DELETE FROM fases")
+            self._conn.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('huella', ?)", (huella,))
+        self._conn.commit()
+
+    def completadas(self, fase):
+        """{fila: datos} de las filas ya terminadas en `fase`"""
+        with self._lock:
+            filas = self._conn.execute("SELECT fila, datos FROM filas WHERE fase = ?", (fase,)).fetchall()
+        return {fila: json.loads(datos) for fila, datos in filas}
+
+    def guardar(self, fase, fila, datos):
+        """Registra una fila terminada (se confirma en disco al momento)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO filas (fase, fila, datos, guardado) VALUES (?, ?, ?, ?)",
+                (fase, int(fila), json.dumps(datos), time.time())
+            )
+            self._conn.commit()
+
+    def guardar_varios(self, fase, datos_por_fila):
+        """Registra varias filas terminadas con un solo commit"""
+        ahora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO filas (fase, fila, datos, guardado) VALUES (?, ?, ?, ?)",
+                [(fase, int(fila), json.dumps(datos), ahora) for fila, datos in datos_por_fila.items()]
+            )
+            self._conn.commit()
+
+    def resultado_fase(self, fase):
+        """Resultado guardado de una fase completa o None"""
+        with self._lock:
+            fila = self._conn.execute("SELECT datos FROM fases WHERE fase = ?", (fase,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def guardar_fase(self, fase, datos):
+        """Registra el resultado de una fase que se calcula de una vez"""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO fases (fase, datos) VALUES (?, ?)",
+                               (fase, json.dumps(datos)))
+            self._conn.commit()
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    def borrar(self):
+        """Cierra y elimina el checkpoint (al terminar la corrida con éxito)"""
+        self.cerrar()
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(self.ruta + sufijo):
+                os.remove(self.ruta + sufijo)
@@ -0,0 +1,274 @@
+import math
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# -----------------------------
+# Motor de deduplicación por bloques
+# -----------------------------
+# En vez de comparar cada fila contra todas las demás con SequenceMatcher
+# (O(n²) en Python), cada nombre limpio se indexa por sus n-gramas de
+# caracteres y los pares se descartan con cotas exactas del ratio, calculadas
+# con numpy sobre todos los candidatos de una fila a la vez:
+#
+# - longitud: ratio <= 2*min(la, lb)/(la+lb);
+# - n-gramas: si el ratio llega al umbral quedan pocos caracteres sin
+#   emparejar, y cada uno rompe a lo sumo n n-gramas, así que el par tiene
+#   que compartir un mínimo de n-gramas (ver _cota_compartidos);
+# - caracteres: quick_ratio de SequenceMatcher (caracteres en común contando
+#   repeticiones), con histogramas de caracteres por fila.
+#
+# Como un par que llega al umbral comparte al menos k n-gramas, basta buscar
+# candidatos en los bloques de todos los n-gramas del nombre menos los k-1
+# más frecuentes (filtro de prefijo): los bloques enormes (" co", "ing") se
+# saltean sin perder pares. Si la cota no exige ningún n-grama en común
+# (nombres cortos, umbrales bajos) se miran todas las filas de longitud
+# compatible. Sólo los que pasan todo se puntúan con SequenceMatcher.ratio,
+# así que los grupos son exactamente los de la comparación exhaustiva.
+
+def claves_ngramas(nombre, n=3):
+    """Devuelve el conjunto de n-gramas de caracteres del nombre (con relleno)"""
+    relleno = f" {nombre} "
+    return {relleno[k:k + n] for k in range(len(relleno) - n + 1)}
+
+
+def _cabe_longitud(la, lb, threshold):
+    """Cota por longitud: 2*min/(la+lb) >= threshold (con tolerancia: en el umbral justo no descarta)"""
+    return 2 * np.minimum(la, lb) >= threshold * (la + lb) - 1e-9
+
+
+def _cota_compartidos(ga, gb, la, lb, threshold, n):
+    """Mínimo de n-gramas en común (ga y gb n-gramas distintos) para que el ratio pueda llegar al umbral.
+
+    Con ratio = 2M/(la+lb) >= threshold quedan a lo sumo U = la+lb-2M
+    caracteres sin emparejar entre los dos nombres, y cada uno (o cada corte
+    entre bloques, que tiene alguno al lado) rompe como mucho n n-gramas de
+    cada nombre. Vale para escalares y arrays.
+    """
+    total = la + lb
+    sin_emparejar = total - 2 * np.ceil(threshold * total / 2 - 1e-9)
+    return np.maximum(ga, gb) - n * sin_emparejar
+
+
+class IndiceNombres:
+    """Nombres indexados por n-gramas, con longitudes e histogramas de caracteres para filtrar pares"""
+
+    def __init__(self, nombres, n=3):
+        self.nombres = [nombre or "" for nombre in nombres]
+        self.n = n
+        self.gramas = [claves_ngramas(nombre, n) if nombre else set() for nombre in self.nombres]
+        self.longitudes = np.array([len(nombre) for nombre in self.nombres], dtype=np.int64)
+        # Cada bloque queda ordenado por (longitud, fila): se recorta a las longitudes compatibles
+        filas_por_grama = defaultdict(list)
+        for i in np.argsort(self.longitudes, kind="stable").tolist():
+            for clave in self.gramas[i]:
+                filas_por_grama[clave].append(i)
+        self.bloques = {clave: np.array(filas, dtype=np.int64) for clave, filas in filas_por_grama.items()}
+        self.longitudes_bloque = {clave: self.longitudes[filas] for clave, filas in self.bloques.items()}
+        self.n_gramas = np.array([len(claves) for claves in self.gramas], dtype=np.int64)
+        # Filas de cada longitud y el mínimo de n-gramas distintos entre ellas (para las cotas por longitud)
+        self.filas_por_longitud = defaultdict(list)
+        for i, longitud in enumerate(self.longitudes.tolist()):
+            self.filas_por_longitud[longitud].append(i)
+        self.filas_por_longitud = {lb: np.array(filas, dtype=np.int64) for lb, filas in self.filas_por_longitud.items()}
+        self.min_gramas = {lb: int(self.n_gramas[filas].min()) for lb, filas in self.filas_por_longitud.items()}
+        self._cotas = {}
+
+        alfabeto = {c: k for k, c in enumerate(sorted(set().union(*self.nombres)))}
+        self.histogramas = np.zeros((len(self.nombres), len(alfabeto)), dtype=np.int32)
+        for i, nombre in enumerate(self.nombres):
+            for c, cuenta in Counter(nombre).items():
+                self.histogramas[i, alfabeto[c]] = cuenta
+        self._matcher = SequenceMatcher(None)
+
+    def _cotas_fila(self, la, ga, threshold):
+        """(mínimo de n-gramas en común y rango de las longitudes que lo exigen, longitudes sin esa exigencia)"""
+        clave = (la, ga, threshold)
+        if clave not in self._cotas:
+            cotas, sin_cota = {}, []
+            for lb, gb in self.min_gramas.items():
+                if not _cabe_longitud(la, lb, threshold):
+                    continue
+                cota = int(_cota_compartidos(ga, gb, la, lb, threshold, self.n))
+                if cota <= 0:
+                    sin_cota.append(lb)
+                else:
+                    cotas[lb] = cota
+            if cotas:
+                self._cotas[clave] = min(cotas.values()), min(cotas), max(cotas), sorted(sin_cota)
+            else:
+                self._cotas[clave] = None, None, None, sorted(sin_cota)
+        return self._cotas[clave]
+
+    def candidatos(self, i, threshold, excluidas=None):
+        """Filas j > i (array ascendente) que pasan las cotas de longitud, n-gramas y caracteres.
+
+        `excluidas` (array de bool por fila) descarta además las filas marcadas.
+        """
+        la, ga = int(self.longitudes[i]), int(self.n_gramas[i])
+        minimo, desde, hasta, sin_cota = self._cotas_fila(la, ga, threshold)
+        partes, compartidos = [], []
+        if minimo is not None:
+            tramos = []
+            limites = np.array([desde, hasta + 1])
+            for clave in self.gramas[i]:
+                inicio, fin = self.longitudes_bloque[clave].searchsorted(limites)
+                tramos.append(self.bloques[clave][inicio:fin])
+            # Filtro de prefijo: un par que llega al umbral comparte al menos `minimo`
+            # n-gramas, así que alguno está fuera de los minimo-1 tramos más grandes
+            tramos.sort(key=len)
+            ignoradas = minimo - 1
+            filas = np.concatenate(tramos[:len(tramos) - ignoradas])
+            filas, cuentas = np.unique(filas[filas > i], return_counts=True)
+            if sin_cota:
+                # Esas longitudes se agregan enteras abajo
+                fuera = ~np.isin(self.longitudes[filas], sin_cota)
+                filas, cuentas = filas[fuera], cuentas[fuera]
+            partes.append(filas)
+            # Los n-gramas ignorados pueden estar compartidos: se cuentan como si lo estuvieran
+            compartidos.append(cuentas + ignoradas)
+        for lb in sin_cota:
+            # Longitudes para las que la cota no exige n-gramas en común: todas sus filas siguientes
+            filas = self.filas_por_longitud[lb]
+            filas = filas[np.searchsorted(filas, i, side="right"):]
+            partes.append(filas)
+            compartidos.append(np.full(len(filas), np.iinfo(np.int64).max))
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        candidatos, compartidos = np.concatenate(partes), np.concatenate(compartidos)
+        if len(partes) > 1:
+            orden = np.argsort(candidatos, kind="stable")
+            candidatos, compartidos = candidatos[orden], compartidos[orden]
+
+        lb = self.longitudes[candidatos]
+        pasan = _cabe_longitud(la, lb, threshold)
+        pasan &= compartidos >= _cota_compartidos(ga, self.n_gramas[candidatos], la, lb, threshold, self.n)
+        if excluidas is not None:
+            pasan &= ~excluidas[candidatos]
+        candidatos = candidatos[pasan]
+
+        # quick_ratio de todos los candidatos a la vez
+        comunes = np.minimum(self.histogramas[candidatos], self.histogramas[i]).sum(axis=1)
+        return candidatos[2 * comunes >= threshold * (la + self.longitudes[candidatos]) - 1e-9]
+
+    def similares(self, i, threshold, excluidas=None):
+        """Filas j > i (ascendentes) con SequenceMatcher(None, nombre_i, nombre_j).ratio() >= threshold"""
+        matcher = self._matcher
+        matcher.set_seq1(self.nombres[i])
+        similares = []
+        for j in self.candidatos(i, threshold, excluidas).tolist():
+            matcher.set_seq2(self.nombres[j])
+            if matcher.ratio() >= threshold:
+                similares.append(j)
+        return similares
+
+
+def detectar_duplicados_bloques(nombres, threshold=0.85, n=3):
+    """Agrupa nombres ya limpios puntuando sólo los pares que pasan las cotas exactas.
+
+    Mismos grupos que `agente.detectar_duplicados`: recorrido voraz en orden
+    de fila, ratio de `SequenceMatcher` >= threshold y grupos como listas de
+    posiciones.
+    """
+    indice = IndiceNombres(nombres, n)
+    procesadas = np.zeros(len(indice.nombres), dtype=bool)
+    duplicados = []
+    for i, nombre in enumerate(indice.nombres):
+        if procesadas[i] or not nombre:
+            continue
+        similares = indice.similares(i, threshold, excluidas=procesadas)
+        if similares:
+            grupo_duplicados = [i] + similares
+            duplicados.append(grupo_duplicados)
+            procesadas[grupo_duplicados] = True
+    return duplicados
+
+
+def pares_similares(indice, filas, threshold=0.85):
+    """{i: [j > i con ratio >= threshold]} para cada i de `filas` del `IndiceNombres`, con las
+    mismas cotas que `detectar_duplicados_bloques` pero sin depender de las filas ya agrupadas.
+
+    Cada i es independiente, así que se puede repartir entre procesos (ver paralelo.py).
+    """
+    pares = {}
+    for i in filas:
+        if not indice.nombres[i]:
+            continue
+        similares = indice.similares(i, threshold)
+        if similares:
+            pares[i] = similares
+    return pares
+
+
+def agrupar_voraz(n_filas, pares):
+    """Recorrido voraz en orden de fila sobre `pares_similares`: mismos grupos que `detectar_duplicados_bloques`"""
+    duplicados = []
+    procesados = set()
+    for i in range(n_filas):
+        if i in procesados or i not in pares:
+            continue
+        grupo_duplicados = [i] + [j for j in pares[i] if j not in procesados]
+        if len(grupo_duplicados) > 1:
+            duplicados.append(grupo_duplicados)
+            procesados.update(grupo_duplicados)
+    return duplicados
+
+# -----------------------------
+# Matriz de similitud por bloques (rapidfuzz) + componentes conexas
+# -----------------------------
+class UnionFind:
+    """Conjuntos disjuntos para agrupar duplicados por componentes conexas"""
+
+    def __init__(self, n):
+        self.padre = list(range(n))
+
+    def find(self, x):
+        while self.padre[x] != x:
+            self.padre[x] = self.padre[self.padre[x]]  # compresión por mitades
+            x = self.padre[x]
+        return x
+
+    def union(self, a, b):
+        raiz_a, raiz_b = self.find(a), self.find(b)
+        if raiz_a != raiz_b:
+            # La raíz es siempre el índice menor: los grupos quedan en orden de fila
+            if raiz_b < raiz_a:
+                raiz_a, raiz_b = raiz_b, raiz_a
+            self.padre[raiz_b] = raiz_a
+
+    def grupos(self):
+        """Devuelve las componentes con más de un elemento, ordenadas por su primera fila"""
+        componentes = defaultdict(list)
+        for x in range(len(self.padre)):
+            componentes[self.find(x)].append(x)
+        return [miembros for raiz, miembros in sorted(componentes.items()) if len(miembros) > 1]
+
+
+def detectar_duplicados_matriz(nombres, threshold=85, chunk=2000, workers=-1):
+    """Agrupa nombres ya limpios con `rapidfuzz.process.cdist` calculado en bloques.
+
+    Sólo se calcula el triángulo superior de la matriz, en baldosas de
+    chunk x chunk (memoria acotada a chunk² bytes por baldosa), usando todos
+    los núcleos vía `workers`. Cada par con fuzz.ratio >= threshold une sus
+    filas; los grupos son las componentes conexas resultantes.
+    """
+    from rapidfuzz import fuzz, process
+
+    validos = [i for i, nombre in enumerate(nombres) if nombre]
+    textos = [nombres[i] for i in validos]
+    uf = UnionFind(len(nombres))
+
+    for fila_ini in range(0, len(textos), chunk):
+        bloque_filas = textos[fila_ini:fila_ini + chunk]
+        for col_ini in range(fila_ini, len(textos), chunk):
+            scores = process.cdist(
+                bloque_filas, textos[col_ini:col_ini + chunk],
+                scorer=fuzz.ratio, score_cutoff=threshold, dtype=np.uint8, workers=workers
+            )
+            filas, cols = np.nonzero(scores >= threshold)
+            for f, c in zip((filas + fila_ini).tolist(), (cols + col_ini).tolist()):
+                if c > f:
+                    uf.union(validos[f], validos[c])
+
+    return uf.grupos()
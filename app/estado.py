@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+import time
+
+from cache_busquedas import normalizar_consulta
+from verificacion import url_canonica
+
+# -----------------------------
+# Estado entre corridas (modo incremental)
+# -----------------------------
+# Guarda el último resultado de búsqueda de cada nombre y la última
+# verificación de cada URL, con su fecha. En modo incremental una corrida
+# sólo busca los nombres nuevos (o cambiados) y sólo vuelve a verificar las
+# URLs nuevas, las que fallaron la vez anterior o las verificadas hace más de
+# `max_edad` segundos; el resto de las filas se copia tal cual. Las
+# búsquedas también vencen (`max_edad_busquedas`, más larga porque cuestan
+# cuota) y las que no encontraron sitio no se copian: se vuelven a buscar.
+#
+# Las verificaciones se guardan por sitio, bajo su URL canónica (ver
+# verificacion.url_canonica), así que el mismo objeto sirve de `cache` para
+# `verificar_urls_async` / `VerificadorContinuo` en modo incremental: sólo se
+# reutilizan los OK recientes y cada resultado nuevo se registra al terminar.
+
+RUTA_ESTADO = "./app/estado_verificacion.sqlite"
+MAX_EDAD = 24 * 3600  # 1 día
+MAX_EDAD_BUSQUEDAS = 30 * 24 * 3600  # 30 días
+LOTE_CONSULTA = 500  # claves por SELECT ... IN (...) (límite de variables de SQLite)
+
+
+class EstadoVerificacion:
+    """Últimos resultados por nombre (búsqueda) y por URL (verificación)"""
+
+    def __init__(self, ruta=RUTA_ESTADO, max_edad=MAX_EDAD, max_edad_busquedas=MAX_EDAD_BUSQUEDAS):
+        self.max_edad = max_edad
+        self.max_edad_busquedas = max_edad_busquedas
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS busquedas ("
+            " nombre TEXT PRIMARY KEY, url TEXT, notas TEXT, consultas INTEGER NOT NULL,"
+            " buscado REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verificaciones ("
+            " url TEXT PRIMARY KEY, funciona INTEGER NOT NULL, estado TEXT NOT NULL,"
+            " verificado REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _por_clave(self, consulta, claves, *parametros):
+        """Filas de `consulta` (termina en "IN ({})") para `claves`, en lotes de LOTE_CONSULTA"""
+        claves = list(claves)
+        filas = []
+        with self._lock:
+            for inicio in range(0, len(claves), LOTE_CONSULTA):
+                lote = claves[inicio:inicio + LOTE_CONSULTA]
+                filas += self._conn.execute(consulta.format(','.join('?' * len(lote))),
+                                            (*parametros, *lote)).fetchall()
+        return filas
+
+    def busquedas_previas(self, nombres):
+        """{nombre normalizado: (url, notas, consultas)} de los nombres con sitio encontrado hace menos de `max_edad_busquedas`"""
+        filas = self._por_clave(
+            "SELECT nombre, url, notas, consultas FROM busquedas"
+            " WHERE url IS NOT NULL AND buscado >= ? AND nombre IN ({})",
+            {normalizar_consulta(n) for n in nombres}, time.time() - self.max_edad_busquedas
+        )
+        return {nombre: (url, notas, consultas) for nombre, url, notas, consultas in filas}
+
+    def guardar_busquedas(self, resultados):
+        """Registra {nombre: (url, notas, consultas)}"""
+        ahora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO busquedas (nombre, url, notas, consultas, buscado)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(normalizar_consulta(nombre), url, notas, int(consultas), ahora)
+                 for nombre, (url, notas, consultas) in resultados.items()]
+            )
+            self._conn.commit()
+
+    def verificaciones_vigentes(self, urls):
+        """{url: (funciona, estado)} de las URLs verificadas OK hace menos de `max_edad`"""
+        claves = {url: url_canonica(url) for url in urls}
+        vigentes = self.obtener_varios(clave for clave in claves.values() if clave is not None)
+        return {url: vigentes[clave] for url, clave in claves.items() if clave in vigentes}
+
+    def guardar_verificaciones(self, resultados):
+        """Registra {url: (funciona, estado)}"""
+        self.guardar_varios({url_canonica(url): resultado for url, resultado in resultados.items()
+                             if url_canonica(url) is not None})
+
+    # Interfaz de caché del verificador (claves ya canónicas)
+
+    def obtener_varios(self, claves):
+        """{clave: (funciona, estado)} de las claves verificadas OK hace menos de `max_edad`"""
+        claves = set(claves)
+        filas = self._por_clave(
+            "SELECT url, estado FROM verificaciones WHERE funciona = 1 AND verificado >= ? AND url IN ({})",
+            claves, time.time() - self.max_edad
+        )
+        vigentes = {url: (True, estado) for url, estado in filas}
+        with self._lock:
+            self.aciertos += len(vigentes)
+            self.fallos += len(claves) - len(vigentes)
+        return vigentes
+
+    def obtener(self, clave):
+        """(funciona, estado) vigente de una clave o None"""
+        return self.obtener_varios([clave]).get(clave)
+
+    def guardar_varios(self, resultados):
+        """Registra {clave: (funciona, estado)}"""
+        ahora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO verificaciones (url, funciona, estado, verificado)"
+                " VALUES (?, ?, ?, ?)",
+                [(clave, int(funciona), estado, ahora) for clave, (funciona, estado) in resultados.items()]
+            )
+            self._conn.commit()
+
+    def estadisticas(self):
+        """Contadores de uso como caché de verificaciones"""
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+        }
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
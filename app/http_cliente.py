@@ -0,0 +1,160 @@
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+from urllib3.util.retry import Retry
+
+# -----------------------------
+# Cliente HTTP compartido
+# -----------------------------
+# Sesiones requests compartidas por todo el proceso (una para Google CSE y
+# otra para verificar sitios): reutilizan conexiones (keep-alive) en vez de
+# pagar TCP + TLS en cada petición, con un pool del tamaño de los workers que
+# las usan, reintentos sólo ante fallos de conexión (los 429/5xx de CSE los
+# gestiona el limitador) y una caché de DNS en memoria con TTL.
+
+HOSTS_EN_POOL = 16  # hosts distintos con conexiones abiertas por sesión
+DNS_TTL = 300  # segundos
+DNS_MAX_ENTRADAS = 4096
+
+# Reintentos de conexión por uso: la verificación no reintenta para no
+# multiplicar los timeouts de los hosts caídos
+REINTENTOS_POR_USO = {"cse": 2, "verificacion": 0}
+
+_sesiones = {}
+_lock_sesion = threading.Lock()
+
+# -----------------------------
+# Caché de DNS de las sesiones
+# -----------------------------
+# Sólo la usan las conexiones de las sesiones de este módulo (ver
+# AdaptadorCacheDNS): socket.getaddrinfo queda intacto para el resto del
+# proceso (aiohttp tiene su propia caché y FiltroDNS necesita resolver de
+# verdad). Es un LRU acotado en entradas y cada una vence a los DNS_TTL
+# segundos; los fallos de resolución no se guardan.
+
+
+class CacheDNS:
+    """(host, puerto) -> direcciones de getaddrinfo, con TTL y a lo sumo `max_entradas` (LRU), thread-safe"""
+
+    def __init__(self, ttl=DNS_TTL, max_entradas=DNS_MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.estadisticas = {"aciertos": 0, "fallos": 0}
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolver(self, host, puerto):
+        """Lista de (familia, dirección) para conectarse a host:puerto (lanza socket.gaierror)"""
+        clave = (host, puerto)
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                self._entradas.move_to_end(clave)
+                self.estadisticas["aciertos"] += 1
+                return entrada[1]
+            self.estadisticas["fallos"] += 1
+        direcciones = [(familia, direccion[0])
+                       for familia, _, _, _, direccion in socket.getaddrinfo(host, puerto, 0, socket.SOCK_STREAM)]
+        with self._lock:
+            self._entradas[clave] = (ahora + self.ttl, direcciones)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return direcciones
+
+
+cache_dns = CacheDNS()
+estadisticas_dns = cache_dns.estadisticas
+
+
+class _ConexionCacheDNS:
+    """Mezcla para las conexiones de urllib3: resuelve con `cache_dns` y prueba cada dirección"""
+
+    def _new_conn(self):
+        if _es_ip(self._dns_host):
+            return super()._new_conn()
+        try:
+            direcciones = cache_dns.resolver(self._dns_host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        host, error = self._dns_host, None
+        try:
+            # _dns_host sólo se usa para abrir el socket; SNI y la cabecera Host siguen con el nombre
+            for _, direccion in direcciones:
+                self._dns_host = direccion
+                try:
+                    return super()._new_conn()
+                except NewConnectionError as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+
+
+def _es_ip(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class _ConexionHTTP(_ConexionCacheDNS, HTTPConnection):
+    pass
+
+
+class _ConexionHTTPS(_ConexionCacheDNS, HTTPSConnection):
+    pass
+
+
+class _PoolHTTP(HTTPConnectionPool):
+    ConnectionCls = _ConexionHTTP
+
+
+class _PoolHTTPS(HTTPSConnectionPool):
+    ConnectionCls = _ConexionHTTPS
+
+
+class AdaptadorCacheDNS(HTTPAdapter):
+    """HTTPAdapter cuyas conexiones resuelven los nombres con `cache_dns`"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _PoolHTTP, "https": _PoolHTTPS}
+
+
+def crear_sesion(tamano_pool=1, reintentos_conexion=2):
+    """Crea una Session con `tamano_pool` conexiones por host, caché de DNS y reintentos ante errores de conexión"""
+    sesion = requests.Session()
+    reintentos = Retry(total=None, connect=reintentos_conexion, read=0, status=0, other=0,
+                       backoff_factor=0.3, raise_on_status=False)
+    adaptador = AdaptadorCacheDNS(pool_connections=HOSTS_EN_POOL, pool_maxsize=tamano_pool,
+                                  max_retries=reintentos)
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    sesion.tamano_pool = tamano_pool
+    return sesion
+
+
+def obtener_sesion(uso="verificacion", workers=None):
+    """Sesión compartida del proceso para `uso` ("cse" o "verificacion"); se crea en el primer uso.
+
+    `workers` es cuántos hilos la usan a la vez: si supera el pool actual, la
+    sesión se reemplaza por una con una conexión por hilo (hacerlo antes de
+    lanzarlos, ver buscar_sitios_concurrente).
+    """
+    with _lock_sesion:
+        sesion = _sesiones.get(uso)
+        if sesion is None or (workers or 1) > sesion.tamano_pool:
+            _sesiones[uso] = crear_sesion(max(workers or 1, 1),
+                                          reintentos_conexion=REINTENTOS_POR_USO.get(uso, 0))
+        return _sesiones[uso]
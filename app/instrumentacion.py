@@ -0,0 +1,190 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# -----------------------------
+# Instrumentación del pipeline
+# -----------------------------
+# Contadores y latencias (p50/p95/p99) por fase y por función caliente, más
+# las esperas del limitador, para saber en qué se fue el tiempo de una
+# corrida (latencia de CSE, throttling, hosts lentos, CPU de dedup...). Está
+# desactivada por defecto: cada punto instrumentado cuesta una comprobación
+# de un booleano. Al final se vuelca un reporte JSON.
+#
+# Los "niveles" son valores que cambian durante la corrida (como la
+# concurrencia del control adaptativo): se guarda cada cambio con su instante
+# para ver la evolución, no sólo el valor final.
+
+_activo = False
+_lock = threading.Lock()
+_contadores = defaultdict(int)
+_latencias = defaultdict(list)
+_fases = {}
+_niveles = defaultdict(list)
+_inicio = time.perf_counter()
+MAX_PUNTOS_SERIE = 200
+
+
+def activar():
+    global _activo, _inicio
+    _activo = True
+    _inicio = time.perf_counter()
+
+
+def desactivar():
+    global _activo
+    _activo = False
+
+
+def reiniciar():
+    """Borra todo lo registrado hasta ahora"""
+    with _lock:
+        _contadores.clear()
+        _latencias.clear()
+        _fases.clear()
+        _niveles.clear()
+
+
+def contar(nombre, n=1):
+    if _activo:
+        with _lock:
+            _contadores[nombre] += n
+
+
+def registrar(nombre, segundos):
+    """Agrega una muestra de latencia (o de espera) en segundos"""
+    if _activo:
+        with _lock:
+            _latencias[nombre].append(segundos)
+
+
+def nivel(nombre, valor):
+    """Registra el valor actual de un nivel (con el instante relativo al inicio)"""
+    if _activo:
+        with _lock:
+            _niveles[nombre].append((time.perf_counter() - _inicio, valor))
+
+
+class medir:
+    """Context manager que registra la duración del bloque bajo `nombre` (y cuenta las excepciones)"""
+
+    __slots__ = ("nombre", "inicio")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.inicio = None
+
+    def __enter__(self):
+        if _activo:
+            self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if self.inicio is not None:
+            registrar(self.nombre, time.perf_counter() - self.inicio)
+            if tipo is not None:
+                contar(f"{self.nombre}.errores")
+        return False
+
+
+def instrumentar(nombre=None):
+    """Decorador: registra la latencia de cada llamada (funciones normales o async)"""
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__qualname__
+
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura(*args, **kwargs):
+                if not _activo:
+                    return await funcion(*args, **kwargs)
+                with medir(etiqueta):
+                    return await funcion(*args, **kwargs)
+        else:
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not _activo:
+                    return funcion(*args, **kwargs)
+                with medir(etiqueta):
+                    return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+class CronometroFases:
+    """Mide fases consecutivas: cada `fase(nombre)` cierra la anterior y abre la siguiente"""
+
+    def __init__(self):
+        self._actual = None
+        self._inicio = None
+
+    def fase(self, nombre):
+        self.terminar()
+        self._actual, self._inicio = nombre, time.perf_counter()
+
+    def terminar(self):
+        if self._actual is not None:
+            segundos = time.perf_counter() - self._inicio
+            registrar(f"fase.{self._actual}", segundos)
+            if _activo:
+                with _lock:
+                    _fases[self._actual] = _fases.get(self._actual, 0.0) + segundos
+            self._actual = None
+
+
+def _resumen(muestras):
+    valores = np.asarray(muestras, dtype=float)
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {
+        "n": int(valores.size),
+        "total_s": float(valores.sum()),
+        "media_s": float(valores.mean()),
+        "p50_s": float(p50),
+        "p95_s": float(p95),
+        "p99_s": float(p99),
+        "max_s": float(valores.max()),
+    }
+
+
+def _resumen_nivel(puntos):
+    valores = np.asarray([valor for _, valor in puntos], dtype=float)
+    # La serie se submuestrea para que el JSON no crezca con la corrida
+    paso = max(1, len(puntos) // MAX_PUNTOS_SERIE)
+    serie = puntos[::paso]
+    if serie[-1] is not puntos[-1]:
+        serie.append(puntos[-1])
+    return {
+        "cambios": len(puntos),
+        "final": float(valores[-1]),
+        "min": float(valores.min()),
+        "max": float(valores.max()),
+        "media": float(valores.mean()),
+        "serie": [[round(t, 3), valor] for t, valor in serie],
+    }
+
+
+def reporte(**extra):
+    """Dict con fases, contadores, resumen de latencias y niveles; `extra` agrega secciones (limitador, caché...)"""
+    with _lock:
+        fases = dict(_fases)
+        contadores = dict(sorted(_contadores.items()))
+        latencias = {nombre: list(muestras) for nombre, muestras in sorted(_latencias.items())}
+        niveles = {nombre: list(puntos) for nombre, puntos in sorted(_niveles.items())}
+    return {
+        "generado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fases_s": fases,
+        "contadores": contadores,
+        "latencias": {nombre: _resumen(muestras) for nombre, muestras in latencias.items() if muestras},
+        "niveles": {nombre: _resumen_nivel(puntos) for nombre, puntos in niveles.items() if puntos},
+        **extra,
+    }
+
+
+def guardar_reporte(ruta, **extra):
+    """Escribe el reporte JSON de la corrida en `ruta`"""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(reporte(**extra), f, indent=2, ensure_ascii=False, default=str)
@@ -0,0 +1,134 @@
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from instrumentacion import contar, registrar
+
+# -----------------------------
+# Limitador de tasa (token bucket) con backoff adaptativo
+# -----------------------------
+# Sustituye las pausas fijas (sleep(1) entre consultas, sleep(30) ante 429,
+# 2-4 s entre empresas) por un balde de fichas compartido: las peticiones
+# salen tan rápido como lo permite la cuota configurada y, cuando la API
+# responde 429/5xx, todo el limitador se pausa con backoff exponencial con
+# jitter (o lo que indique Retry-After).
+
+class CuotaAgotada(Exception):
+    """Se alcanzó la cuota diaria configurada"""
+
+
+def _segundos_retry_after(response):
+    """Lee la cabecera Retry-After (segundos o fecha HTTP); None si no viene"""
+    valor = response.headers.get("Retry-After")
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class LimitadorTasa:
+    """Token bucket thread-safe con cuota diaria opcional y backoff con jitter"""
+
+    def __init__(self, por_segundo=1.0, rafaga=3, cuota_diaria=None,
+                 backoff_base=1.0, backoff_max=60.0):
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga
+        self.cuota_diaria = cuota_diaria
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = float(rafaga)
+        self._ultima_recarga = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._dia = date.today()
+        self._usadas_hoy = 0
+        self._lock = threading.Lock()
+        self.metricas = {
+            "peticiones": 0,
+            "reintentos": 0,
+            "respuestas_throttle": 0,
+            "segundos_esperando_fichas": 0.0,
+            "segundos_en_backoff": 0.0,
+        }
+
+    def _recargar(self, ahora):
+        self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultima_recarga) * self.por_segundo)
+        self._ultima_recarga = ahora
+
+    def _comprobar_cuota(self):
+        if date.today() != self._dia:
+            self._dia, self._usadas_hoy = date.today(), 0
+        if self.cuota_diaria is not None and self._usadas_hoy >= self.cuota_diaria:
+            raise CuotaAgotada(f"cuota diaria de {self.cuota_diaria} peticiones agotada")
+
+    def adquirir(self):
+        """Bloquea hasta que haya una ficha disponible (y no haya pausa por backoff)"""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._recargar(ahora)
+                en_pausa = self._pausa_hasta > ahora
+                if not en_pausa:
+                    self._comprobar_cuota()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._usadas_hoy += 1
+                        self.metricas["peticiones"] += 1
+                        return
+                    espera = (1 - self._tokens) / self.por_segundo
+                    self.metricas["segundos_esperando_fichas"] += espera
+                    registrar("limitador.espera_fichas", espera)
+                else:
+                    espera = self._pausa_hasta - ahora
+                    self.metricas["segundos_en_backoff"] += espera
+                    registrar("limitador.espera_backoff", espera)
+            time.sleep(espera)
+
+    def penalizar(self, intento, retry_after=None):
+        """Pausa el limitador: Retry-After si viene, si no backoff exponencial con jitter"""
+        if retry_after is not None:
+            espera = min(retry_after, self.backoff_max)
+        else:
+            espera = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + espera)
+            self._tokens = 0.0
+
+    def ejecutar(self, peticion, max_reintentos=4):
+        """Ejecuta `peticion()` (devuelve una Response) respetando la tasa y reintentando 429/5xx"""
+        for intento in range(max_reintentos + 1):
+            self.adquirir()
+            response = peticion()
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            with self._lock:
+                self.metricas["respuestas_throttle"] += 1
+            contar(f"limitador.respuestas_{response.status_code}")
+            if intento == max_reintentos:
+                return response
+            with self._lock:
+                self.metricas["reintentos"] += 1
+            self.penalizar(intento, _segundos_retry_after(response))
+        return response
+
+    def resumen(self):
+        """Métricas acumuladas del limitador"""
+        with self._lock:
+            return dict(self.metricas, usadas_hoy=self._usadas_hoy)
+
+
+def crear_limitador_cse():
+    """Limitador para Google CSE configurable con GOOGLE_CSE_QPS y GOOGLE_CSE_DAILY_QUOTA"""
+    cuota = os.getenv("GOOGLE_CSE_DAILY_QUOTA")
+    return LimitadorTasa(
+        por_segundo=float(os.getenv("GOOGLE_CSE_QPS", "1.0")),
+        cuota_diaria=int(cuota) if cuota else None,
+    )
@@ -0,0 +1,50 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Normalización de nombres de empresa
+# -----------------------------
+# Mismas reglas que `limpiar_nombre_empresa`, con los patrones compilados una
+# sola vez. `limpiar_nombre` memoiza nombres repetidos y `limpiar_columna`
+# normaliza una Serie completa: factoriza los valores (cada nombre distinto
+# se limpia una vez) y aplica las sustituciones con operaciones `.str`.
+
+SUFIJOS = [
+    re.compile(r'\b(inc|corp|corporation|ltd|limited|llc|llp|lp|co|company|enterprises|group|holding|international|global|worldwide|systems|solutions|software|technologies|technology|tech|services|consulting|digital|media|studios|games|entertainment|publishing|publishers|hardware|computers|computing)\b'),
+    re.compile(r'\b(gmbh|ag|sa|srl|spa|bv|nv|oy|ab|as|\&|\+|\.|,)\b')
+]
+NO_PALABRA = re.compile(r'[^\w\s]')
+ESPACIOS = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=200_000)
+def _limpiar(nombre):
+    nombre = nombre.lower().strip()
+    for sufijo in SUFIJOS:
+        nombre = sufijo.sub('', nombre)
+    nombre = NO_PALABRA.sub(' ', nombre)
+    return ESPACIOS.sub(' ', nombre).strip()
+
+
+def limpiar_nombre(nombre):
+    """Limpia el nombre de la empresa para comparación (memoizado)"""
+    if pd.isna(nombre):
+        return ""
+    return _limpiar(str(nombre))
+
+
+def limpiar_columna(nombres):
+    """Normaliza una Serie de nombres; devuelve una Serie de str con el mismo índice"""
+    nombres = pd.Series(nombres)
+    codigos, unicos = pd.factorize(nombres, use_na_sentinel=True)
+    limpios = pd.Series(unicos, dtype=object).astype(str).str.lower().str.strip()
+    for sufijo in SUFIJOS:
+        limpios = limpios.str.replace(sufijo, '', regex=True)
+    limpios = limpios.str.replace(NO_PALABRA, ' ', regex=True)
+    limpios = limpios.str.replace(ESPACIOS, ' ', regex=True).str.strip()
+    # Los NaN quedan con código -1, que apunta al "" agregado al final
+    valores = np.append(limpios.to_numpy(dtype=object), "")
+    return pd.Series(valores[codigos], index=nombres.index, dtype=object)
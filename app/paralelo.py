@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from categorizacion import categorizar_columna
+from deduplicacion import IndiceNombres, agrupar_voraz, detectar_duplicados_bloques, pares_similares
+from normalizacion import limpiar_columna
+
+# -----------------------------
+# Etapas de CPU en un pool de procesos
+# -----------------------------
+# Deduplicación, normalización y categorización son Python puro y bajo el GIL
+# usan un solo núcleo. En modo CPU (VERIFICACION_PROCESOS) se reparten en
+# trozos entre procesos. Los datos de sólo lectura (nombres, índice de
+# n-gramas, tablas de palabras clave) se dejan en una global del módulo antes
+# de crear el pool: con fork los hijos la heredan sin serializarla y cada
+# tarea sólo lleva su número de trozo. Fork sólo se usa en Linux y si el
+# proceso no tiene otros hilos vivos (un hijo forkeado puede heredar un lock
+# tomado por un hilo que ya no existe; en macOS además no es seguro). Si no,
+# se usa forkserver o spawn y los datos se pasan una vez por proceso en el
+# inicializador, nunca por tarea. Las listas chicas se procesan en serie:
+# arrancar el pool cuesta más que lo que ahorra.
+
+MIN_FILAS = 20_000
+TROZOS_POR_PROCESO = 4  # trozos intercalados por proceso para repartir la carga
+
+_compartido = {}
+
+
+def procesos_desde_entorno():
+    """Procesos de VERIFICACION_PROCESOS ("auto" = todos los núcleos); 1 (por defecto) es modo serie"""
+    valor = os.getenv("VERIFICACION_PROCESOS", "1").strip().lower()
+    if valor == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(valor))
+
+
+def _inicializar(datos):
+    _compartido.clear()
+    _compartido.update(datos)
+
+
+def _usa_fork():
+    """Si `_pool` va a crear los procesos con fork (y los hijos heredan `_compartido`)"""
+    return sys.platform.startswith("linux") and threading.active_count() == 1
+
+
+def _pool(procesos, datos):
+    """Pool con `datos` visibles en `_compartido` dentro de cada proceso"""
+    _compartido.clear()
+    _compartido.update(datos)
+    if _usa_fork():
+        return ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context("fork"))
+    metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context(metodo),
+                               initializer=_inicializar, initargs=(datos,))
+
+
+def _mapear(procesos, datos, tarea, n_trozos):
+    try:
+        with _pool(procesos, datos) as pool:
+            return list(pool.map(tarea, range(n_trozos)))
+    finally:
+        _compartido.clear()
+
+
+def _trozo(n, k, n_trozos):
+    """Límites [inicio, fin) del trozo k de n elementos"""
+    return n * k // n_trozos, n * (k + 1) // n_trozos
+
+
+# -----------------------------
+# Deduplicación
+# -----------------------------
+def _pares_trozo(k):
+    datos = _compartido
+    if "indice" not in datos:
+        # spawn: el índice se reconstruye una vez por proceso en vez de viajar serializado
+        datos["indice"] = IndiceNombres(datos["nombres"], datos["n"])
+    # Filas intercaladas: las primeras filas tienen más candidatos (j > i) que las últimas
+    filas = range(k, len(datos["nombres"]), datos["n_trozos"])
+    return pares_similares(datos["indice"], filas, datos["threshold"])
+
+
+def detectar_duplicados_paralelo(nombres, threshold=0.85, procesos=None, n=3):
+    """Mismos grupos que `detectar_duplicados_bloques`, con la búsqueda de pares repartida entre procesos"""
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(nombres) < MIN_FILAS:
+        return detectar_duplicados_bloques(nombres, threshold, n)
+    n_trozos = procesos * TROZOS_POR_PROCESO
+    datos = {"nombres": list(nombres), "threshold": threshold, "n": n, "n_trozos": n_trozos}
+    if _usa_fork():
+        datos["indice"] = IndiceNombres(datos["nombres"], n)
+    pares = {}
+    for parcial in _mapear(procesos, datos, _pares_trozo, n_trozos):
+        pares.update(parcial)
+    return agrupar_voraz(len(datos["nombres"]), pares)
+
+
+# -----------------------------
+# Normalización y categorización
+# -----------------------------
+def _limpiar_trozo(k):
+    inicio, fin = _trozo(len(_compartido["unicos"]), k, _compartido["n_trozos"])
+    return limpiar_columna(pd.Series(_compartido["unicos"][inicio:fin], dtype=object)).tolist()
+
+
+def limpiar_columna_paralelo(nombres, procesos=None):
+    """Como `limpiar_columna`, limpiando los nombres distintos en paralelo"""
+    nombres = pd.Series(nombres)
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(nombres) < MIN_FILAS:
+        return limpiar_columna(nombres)
+    codigos, unicos = pd.factorize(nombres, use_na_sentinel=True)
+    n_trozos = procesos * TROZOS_POR_PROCESO
+    limpios = _mapear(procesos, {"unicos": list(unicos), "n_trozos": n_trozos}, _limpiar_trozo, n_trozos)
+    # Los NaN quedan con código -1, que apunta al "" agregado al final
+    valores = np.array([x for trozo in limpios for x in trozo] + [""], dtype=object)
+    return pd.Series(valores[codigos], index=nombres.index, dtype=object)
+
+
+def _categorizar_trozo(k):
+    inicio, fin = _trozo(len(_compartido["nombres"]), k, _compartido["n_trozos"])
+    tabla = categorizar_columna(_compartido["nombres"][inicio:fin], _compartido["websites"][inicio:fin])
+    return list(zip(tabla["company_type"], tabla["category_description"]))
+
+
+def categorizar_columna_paralelo(nombres, websites=None, procesos=None):
+    """Como `categorizar_columna`, repartiendo las filas entre procesos"""
+    nombres = pd.Series(nombres)
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(nombres) < MIN_FILAS:
+        return categorizar_columna(nombres, websites)
+    if websites is None:
+        websites = pd.Series([""] * len(nombres), index=nombres.index)
+    n_trozos = procesos * TROZOS_POR_PROCESO
+    datos = {"nombres": nombres.reset_index(drop=True), "websites": pd.Series(websites).reset_index(drop=True),
+             "n_trozos": n_trozos}
+    filas = [fila for trozo in _mapear(procesos, datos, _categorizar_trozo, n_trozos) for fila in trozo]
+    return pd.DataFrame(filas, index=nombres.index, columns=["company_type", "category_description"])
@@ -0,0 +1,75 @@
+import queue
+import threading
+
+# -----------------------------
+# Etapas encadenadas con colas acotadas
+# -----------------------------
+# En lugar de terminar cada fase antes de empezar la siguiente, las filas
+# pasan de la búsqueda a la verificación y de ahí a la categorización en
+# cuanto están listas. Cada etapa tiene su propio pool (hilos de búsqueda,
+# event loop de verificación, hilo de categorización) y se comunican por
+# colas acotadas: si una etapa se atrasa, la anterior se frena en vez de
+# acumular filas en memoria. La corrida tarda lo que la etapa más lenta y no
+# la suma de todas.
+
+TAMANO_COLA = 1000
+TAMANO_LOTE = 500
+
+
+class EtapaLotes:
+    """Hilo que consume una cola acotada y procesa lo que haya acumulado de a lotes de hasta `tamano_lote`.
+
+    `procesar(lote)` recibe la lista de elementos enviados; sirve para etapas
+    vectorizadas (como `categorizar_columna`) que rinden más por lote.
+    """
+
+    def __init__(self, procesar, tamano_lote=TAMANO_LOTE, tamano_cola=TAMANO_COLA, nombre="etapa"):
+        self.procesar = procesar
+        self.tamano_lote = tamano_lote
+        self._entrada = queue.Queue(maxsize=tamano_cola)
+        self._error = None
+        self._hilo = threading.Thread(target=self._correr, name=nombre, daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def enviar(self, elemento):
+        """Encola un elemento (bloquea mientras la cola esté llena)"""
+        while True:
+            if self._error is not None:
+                raise RuntimeError(f"La etapa '{self._hilo.name}' se detuvo") from self._error
+            try:
+                self._entrada.put(elemento, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def cerrar(self):
+        """Procesa lo pendiente y termina (relanza el error del hilo, si lo hubo)"""
+        if self._hilo.is_alive():
+            self._entrada.put(None)
+            self._hilo.join()
+        if self._error is not None:
+            raise self._error
+
+    def _correr(self):
+        try:
+            terminado = False
+            while not terminado:
+                lote = []
+                elemento = self._entrada.get()
+                # Lo que ya esté en la cola va en el mismo lote
+                while elemento is not None:
+                    lote.append(elemento)
+                    if len(lote) >= self.tamano_lote:
+                        break
+                    try:
+                        elemento = self._entrada.get_nowait()
+                    except queue.Empty:
+                        break
+                terminado = elemento is None
+                if lote:
+                    self.procesar(lote)
+        except BaseException as e:
+            self._error = e
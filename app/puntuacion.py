@@ -0,0 +1,92 @@
+import re
+
+# -----------------------------
+# Scoring de sitio oficial por lotes
+# -----------------------------
+# Mismas reglas que `es_sitio_oficial`, pero lo que depende sólo de la
+# consulta (minúsculas, quitar sufijos, palabras de más de 2 letras) se
+# calcula una vez por empresa al construir el puntuador, y las listas de
+# plataformas, palabras oficiales y subdominios son expresiones regulares
+# compiladas al importar. `desglose` devuelve los puntos de cada rasgo y el
+# score es su suma acotada a [0, 100], así que el desglose sale gratis.
+
+SUFIJOS_CONSULTA = re.compile(r'\b(software|hardware|inc|corp|ltd|llc|sa|srl|gmbh|ag)\b')
+
+
+def _alternativas(textos):
+    return re.compile("|".join(re.escape(t) for t in textos))
+
+
+PLATAFORMAS = _alternativas([
+    'facebook.com', 'twitter.com', 'linkedin.com', 'youtube.com', 'instagram.com',
+    'wikipedia.org', 'crunchbase.com', 'bloomberg.com', 'reuters.com',
+    'amazon.com', 'ebay.com', 'alibaba.com', 'github.com'
+])
+PALABRAS_OFICIALES = _alternativas(['official', 'homepage', 'home page', 'corporate', 'company'])
+SUBDOMINIOS = _alternativas(['support.', 'help.', 'docs.', 'forum.', 'community.', 'blog.'])
+
+
+class PuntuadorOficial:
+    """Puntúa candidatos a sitio oficial de una empresa (se construye una vez por consulta)"""
+
+    TLDS = ('.com', '.net', '.org', '.io', '.tech')
+    OFICIALES = PALABRAS_OFICIALES
+    PENALIZAR_SUBDOMINIOS = True
+    REGLAS_URL = True  # -5 por URL profunda y +5 por https
+
+    def __init__(self, consulta):
+        self.consulta = consulta
+        base = SUFIJOS_CONSULTA.sub('', consulta.lower()).strip()
+        self.palabras = [p for p in base.split() if len(p) > 2]
+        # "palabra." al inicio del dominio o ".palabra." en medio
+        self._exacto = (
+            re.compile(r'(?:^|\.)(?:' + "|".join(re.escape(p) for p in self.palabras) + r')\.')
+            if self.palabras else None
+        )
+
+    def desglose(self, url, domain, title="", snippet=""):
+        """Puntos aportados por cada rasgo (antes de acotar el total)"""
+        domain_lower = domain.lower()
+        title_lower = title.lower()
+        rasgos = {
+            "palabras_dominio": 25 * sum(1 for p in self.palabras if p in domain_lower),
+            "dominio_exacto": 40 if self._exacto is not None and self._exacto.search(domain_lower) else 0,
+            "tld": 15 if domain.endswith(self.TLDS) else 0,
+            "plataforma": -30 if PLATAFORMAS.search(domain_lower) else 0,
+            "titulo_oficial": 10 if self.OFICIALES.search(title_lower) else 0,
+            "palabras_titulo": 5 * sum(1 for p in self.palabras if p in title_lower),
+        }
+        if self.PENALIZAR_SUBDOMINIOS:
+            rasgos["subdominio"] = -10 if SUBDOMINIOS.search(domain_lower) else 0
+        if self.REGLAS_URL:
+            rasgos["profundidad"] = -5 if url.count('/') > 3 else 0
+            rasgos["https"] = 5 if url.startswith('https://') else 0
+        return rasgos
+
+    def puntuar(self, url, domain, title="", snippet=""):
+        """Score 0-100 de un candidato"""
+        return max(0, min(100, sum(self.desglose(url, domain, title, snippet).values())))
+
+    def puntuar_candidato(self, item):
+        """Score de un resultado de CSE ({"href", "displayLink", "title", "snippet"})"""
+        return self.puntuar(item["href"], item.get("displayLink", ""), item.get("title", ""),
+                            item.get("snippet", ""))
+
+    def puntuar_candidatos(self, candidatos):
+        """Puntúa todos los candidatos con href; devuelve [(score, desglose, item)] en el mismo orden"""
+        puntuados = []
+        for item in candidatos:
+            url = item.get("href", "")
+            if not url:
+                continue
+            rasgos = self.desglose(url, item.get("displayLink", ""), item.get("title", ""),
+                                   item.get("snippet", ""))
+            puntuados.append((max(0, min(100, sum(rasgos.values()))), rasgos, item))
+        return puntuados
+
+    def mejor(self, candidatos):
+        """(score, desglose, item) del mejor candidato o None; ante empate gana el primero"""
+        puntuados = self.puntuar_candidatos(candidatos)
+        if not puntuados:
+            return None
+        return max(puntuados, key=lambda p: p[0])
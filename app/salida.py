@@ -0,0 +1,164 @@
+import os
+
+import pandas as pd
+
+from categorizacion import DESCRIPCIONES, TIPOS_EMPRESA
+from salida_excel import escribir_excel
+
+# -----------------------------
+# Formatos de salida
+# -----------------------------
+# Además del Excel, los resultados se pueden guardar en formatos columnares
+# (Parquet, Arrow IPC) o CSV, con columnas tipadas: url_works e is_duplicate
+# como booleanos, search_queries como entero y company_type /
+# category_description como categóricas. Los trabajos posteriores pueden
+# leer (o mapear en memoria, con Arrow) y filtrar sin parsear el xlsx.
+# Parquet y Arrow requieren pyarrow (extra opcional "arrow" del paquete),
+# que se importa sólo al usarlos.
+
+FORMATOS = ("xlsx", "parquet", "arrow", "csv")
+EXTENSIONES = {"xlsx": ".xlsx", "parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+_BOOLEANOS = {"True": True, "False": False, True: True, False: False}
+# Categorías fijas (más cualquier valor nuevo): mismo diccionario en todos los bloques
+_CATEGORICAS = {"company_type": TIPOS_EMPRESA, "category_description": DESCRIPCIONES}
+
+
+def formatos_desde_entorno(por_defecto="xlsx"):
+    """Lista de formatos de VERIFICACION_FORMATOS (p. ej. "xlsx,parquet"); valida los nombres y que esté pyarrow"""
+    formatos = [f.strip().lower() for f in os.getenv("VERIFICACION_FORMATOS", por_defecto).split(",") if f.strip()]
+    desconocidos = [f for f in formatos if f not in FORMATOS]
+    if desconocidos:
+        raise ValueError(f"Formatos de salida no soportados: {desconocidos} (opciones: {', '.join(FORMATOS)})")
+    if "parquet" in formatos or "arrow" in formatos:
+        _importar_pyarrow()
+    return formatos
+
+
+def _importar_pyarrow():
+    """(pyarrow, pyarrow.parquet); si falta, el error indica cómo instalar el extra"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Los formatos parquet y arrow requieren pyarrow, incluido en el extra 'arrow':"
+            " pip install \"app[arrow]\" (o pip install pyarrow)"
+        ) from e
+    return pa, pq
+
+
+def tipar_resultados(df, inferir=True):
+    """Copia de `df` con las columnas de resultado tipadas (las que no estén se ignoran).
+
+    Las demás columnas toman el tipo nullable inferido (Int64, string...) o,
+    con inferir=False, siempre string: así todos los bloques de una corrida en
+    streaming tienen el mismo esquema.
+    """
+    df = df.copy()
+    tipadas = set()
+    for col in ("url_works", "is_duplicate"):
+        if col in df:
+            df[col] = df[col].map(_BOOLEANOS).astype("boolean")
+            tipadas.add(col)
+    if "search_queries" in df:
+        df["search_queries"] = pd.to_numeric(df["search_queries"], errors="coerce").astype("Int64")
+        tipadas.add("search_queries")
+    for col, categorias in _CATEGORICAS.items():
+        if col in df:
+            extra = set(df[col].dropna().astype(str)) - set(categorias)
+            df[col] = df[col].astype(pd.CategoricalDtype(categorias + sorted(extra)))
+            tipadas.add(col)
+    if inferir:
+        df = df.convert_dtypes()
+    resto = [col for col in df.columns if col not in tipadas and (not inferir or df[col].dtype == object)]
+    # A texto: columnas con valores mezclados (Arrow no admite objetos heterogéneos) o todas sin inferir
+    for col in resto:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str)).astype("string")
+    return df
+
+
+def esquema_arrow(df):
+    """Esquema Arrow estable para `df` ya tipado (las columnas sólo nulas pasan a string)"""
+    pa, _ = _importar_pyarrow()
+    campos = []
+    for campo in pa.Schema.from_pandas(df, preserve_index=False):
+        if pa.types.is_null(campo.type):
+            campo = campo.with_type(pa.string())
+        elif pa.types.is_dictionary(campo.type):
+            campo = campo.with_type(pa.dictionary(pa.int32(), pa.string()))
+        campos.append(campo)
+    return pa.schema(campos)
+
+
+def _tabla_arrow(df, esquema):
+    pa, _ = _importar_pyarrow()
+    return pa.Table.from_pandas(df, schema=esquema, preserve_index=False)
+
+
+def guardar_resultados(df, ruta_base, formatos=("xlsx",), rellenos=None):
+    """Guarda `df` en cada formato pedido como `ruta_base` + extensión; devuelve las rutas escritas.
+
+    `rellenos` sólo se usa en el Excel (colores por fila).
+    """
+    rutas = []
+    tipado = None
+    for formato in formatos:
+        ruta = ruta_base + EXTENSIONES[formato]
+        if formato == "xlsx":
+            escribir_excel(df, ruta, rellenos)
+        else:
+            if tipado is None:
+                tipado = tipar_resultados(df)
+            if formato == "csv":
+                tipado.to_csv(ruta, index=False)
+            elif formato == "parquet":
+                _, pq = _importar_pyarrow()
+                pq.write_table(_tabla_arrow(tipado, esquema_arrow(tipado)), ruta)
+            else:
+                pa, _ = _importar_pyarrow()
+                tabla = _tabla_arrow(tipado, esquema_arrow(tipado))
+                with pa.OSFile(ruta, "wb") as f, pa.ipc.new_file(f, tabla.schema) as escritor:
+                    escritor.write_table(tabla)
+        rutas.append(ruta)
+    return rutas
+
+
+class EscritorBloques:
+    """Escritura incremental (modo streaming) en csv, parquet o arrow.
+
+    El esquema se fija con el primer bloque, así todos los bloques terminan
+    en el mismo archivo con los mismos tipos.
+    """
+
+    def __init__(self, ruta, formato="csv"):
+        if formato not in ("csv", "parquet", "arrow"):
+            raise ValueError(f"Formato no soportado en streaming: {formato}")
+        self.ruta = ruta
+        self.formato = formato
+        self.filas = 0
+        self._esquema = None
+        self._escritor = None
+        self._archivo = None
+
+    def escribir(self, bloque):
+        tipado = tipar_resultados(bloque, inferir=False)
+        if self.formato == "csv":
+            tipado.to_csv(self.ruta, mode="w" if self.filas == 0 else "a", header=self.filas == 0, index=False)
+        else:
+            pa, pq = _importar_pyarrow()
+            if self._esquema is None:
+                self._esquema = esquema_arrow(tipado)
+                if self.formato == "parquet":
+                    self._escritor = pq.ParquetWriter(self.ruta, self._esquema)
+                else:
+                    self._archivo = pa.OSFile(self.ruta, "wb")
+                    self._escritor = pa.ipc.new_file(self._archivo, self._esquema)
+            self._escritor.write_table(_tabla_arrow(tipado, self._esquema))
+        self.filas += len(bloque)
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+        if self._archivo is not None:
+            self._archivo.close()
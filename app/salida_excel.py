@@ -0,0 +1,67 @@
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+# -----------------------------
+# Escritura de Excel en una pasada
+# -----------------------------
+# En lugar de `df.to_excel`, volver a abrir el archivo con `load_workbook` y
+# pintar celda por celda, el libro se escribe una sola vez en modo
+# write-only: las filas sin color salen como listas de valores y sólo las
+# filas resaltadas llevan celdas con relleno. El color de cada fila se
+# decide con operaciones vectorizadas sobre las columnas de estado.
+
+AZUL = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")      # duplicados
+AMARILLO = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # errores
+VERDE = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")     # URLs encontradas
+
+# Mismo formato de cabecera que `df.to_excel`
+_FINO = Side(style="thin")
+_CABECERA = {
+    "font": Font(bold=True),
+    "border": Border(left=_FINO, right=_FINO, top=_FINO, bottom=_FINO),
+    "alignment": Alignment(horizontal="center", vertical="top"),
+}
+
+
+def rellenos_por_estado(df):
+    """Relleno de cada fila (o None): duplicado > URL con error > URL encontrada"""
+    condiciones = [
+        (df['is_duplicate'] == True).to_numpy(),
+        (df['url_works'] == "False").to_numpy(),
+        df['found_url'].notna().to_numpy(),
+    ]
+    codigos = np.select(condiciones, [1, 2, 3], default=0)
+    return np.array([None, AZUL, AMARILLO, VERDE], dtype=object)[codigos]
+
+
+def escribir_excel(df, ruta, rellenos=None):
+    """Escribe `df` (sin índice) en una única pasada; `rellenos` tiene un PatternFill o None por fila"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+
+    cabecera = []
+    for columna in df.columns:
+        celda = WriteOnlyCell(ws, value=str(columna))
+        celda.font, celda.border, celda.alignment = (_CABECERA["font"], _CABECERA["border"],
+                                                     _CABECERA["alignment"])
+        cabecera.append(celda)
+    ws.append(cabecera)
+
+    # Tipos nativos de Python (bool, int, str) y celdas vacías para NaN/None
+    valores = df.astype(object).where(df.notna(), None)
+    if rellenos is None:
+        rellenos = [None] * len(df)
+    for fila, relleno in zip(valores.itertuples(index=False, name=None), rellenos):
+        if relleno is None:
+            ws.append(fila)
+            continue
+        celdas = []
+        for valor in fila:
+            celda = WriteOnlyCell(ws, value=valor)
+            celda.fill = relleno
+            celdas.append(celda)
+        ws.append(celdas)
+
+    wb.save(ruta)
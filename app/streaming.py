@@ -0,0 +1,127 @@
+import codecs
+
+import pandas as pd
+
+from busqueda import buscar_sitios_concurrente
+from categorizacion import categorizar_columna
+from verificacion import verificar_urls
+
+# -----------------------------
+# Procesamiento por bloques (streaming)
+# -----------------------------
+# Para listas muy grandes: el encoding se detecta una sola vez sobre una
+# muestra del archivo, el CSV se lee por bloques y cada bloque pasa por
+# búsqueda, verificación y categorización encadenando generadores. El
+# resultado se escribe bloque a bloque, así que la memoria no crece con el
+# tamaño de la entrada.
+
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-8-sig']
+TAMANO_MUESTRA = 1 << 20  # 1 MB
+TAMANO_BLOQUE = 5000  # filas
+
+
+def detectar_encoding(ruta, encodings=ENCODINGS, tamano_muestra=TAMANO_MUESTRA):
+    """Primer encoding de la lista que decodifica la muestra inicial del archivo (o None)"""
+    with open(ruta, "rb") as f:
+        muestra = f.read(tamano_muestra)
+    for encoding in encodings:
+        try:
+            # Decodificador incremental: tolera un carácter multibyte cortado al final
+            codecs.getincrementaldecoder(encoding)().decode(muestra, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def leer_en_bloques(ruta, encoding, tamano_bloque=TAMANO_BLOQUE):
+    """Genera DataFrames de `tamano_bloque` filas (el índice sigue la numeración global).
+
+    Los bytes inválidos más allá de la muestra se reemplazan en vez de abortar
+    la corrida a mitad de archivo.
+    """
+    with pd.read_csv(ruta, encoding=encoding, encoding_errors="replace", chunksize=tamano_bloque) as lector:
+        yield from lector
+
+
+def _sin_url(serie):
+    return serie.isna() | (serie.astype(str).str.strip() == '')
+
+
+def etapa_busqueda(bloques, name_col, website_col, buscar, resolver=None):
+    """Completa las URLs faltantes de cada bloque.
+
+    `buscar(consulta)` devuelve (url, notas, consultas_usadas) y `resolver`
+    (opcional) recibe {fila: consulta} y devuelve {fila: (url, notas)} de las
+    filas que puede resolver sin gastar búsquedas.
+    """
+    for bloque in bloques:
+        bloque[website_col] = bloque[website_col].astype(object)
+        bloque['found_url'] = None
+        bloque['search_notes'] = None
+        bloque['search_queries'] = None
+
+        consultas_por_fila = {}
+        for idx in bloque.index[_sin_url(bloque[website_col])]:
+            consulta = str(bloque.at[idx, name_col]).strip()
+            if not consulta or consulta.lower() == 'nan':
+                bloque.at[idx, 'search_notes'] = "empty name"
+                continue
+            consultas_por_fila[idx] = consulta
+
+        resultados = {}
+        if resolver is not None and consultas_por_fila:
+            resultados = {idx: (url, notas, 0) for idx, (url, notas) in resolver(consultas_por_fila).items()}
+        pendientes = {idx: c for idx, c in consultas_por_fila.items() if idx not in resultados}
+        if pendientes:
+            resultados.update(buscar_sitios_concurrente(pendientes, buscar))
+
+        for idx, (url, notas, usadas) in resultados.items():
+            bloque.at[idx, 'search_queries'] = usadas
+            bloque.at[idx, 'search_notes'] = notas
+            if url:
+                bloque.at[idx, website_col] = url
+                bloque.at[idx, 'found_url'] = url
+        yield bloque
+
+
+def etapa_verificacion(bloques, website_col, **config):
+    """Verifica las URLs de cada bloque (`config` se pasa a `verificar_urls`)"""
+    for bloque in bloques:
+        bloque['url_works'] = "False"
+        bloque['verification_status'] = "No URL"
+        filas = bloque.index[~_sin_url(bloque[website_col])]
+        if len(filas):
+            resultados = verificar_urls(bloque.loc[filas, website_col], **config)
+            bloque.loc[filas, 'url_works'] = ["True" if funciona else "False" for funciona, _ in resultados]
+            bloque.loc[filas, 'verification_status'] = [estado for _, estado in resultados]
+        yield bloque
+
+
+def etapa_categorizacion(bloques, name_col, website_col):
+    """Agrega company_type y category_description a cada bloque"""
+    for bloque in bloques:
+        categorias = categorizar_columna(bloque[name_col], bloque[website_col])
+        bloque['company_type'] = categorias['company_type']
+        bloque['category_description'] = categorias['category_description']
+        yield bloque
+
+
+def escribir_bloques(bloques, escritores, al_escribir=None):
+    """Pasa cada bloque a todos los `escritores` (ver salida.EscritorBloques); devuelve las filas escritas.
+
+    `al_escribir(bloque)` (opcional) se llama tras escribir cada bloque. Los
+    escritores se cierran siempre, aunque la corrida se corte.
+    """
+    filas = 0
+    try:
+        for bloque in bloques:
+            for escritor in escritores:
+                escritor.escribir(bloque)
+            filas += len(bloque)
+            if al_escribir is not None:
+                al_escribir(bloque)
+    finally:
+        for escritor in escritores:
+            escritor.cerrar()
+    return filas
@@ -0,0 +1,676 @@
+import asyncio
+import concurrent.futures
+import html
+import ipaddress
+import os
+import re
+import socket
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlparse, urlsplit
+
+import aiohttp
+import pandas as pd
+
+from http_cliente import DNS_TTL, obtener_sesion
+from instrumentacion import contar, instrumentar, nivel
+
+MAX_EN_VUELO = 100
+MAX_POR_HOST = 4
+TIMEOUT = 10
+TIMEOUT_CONEXION = 3  # escalón de conexión del sondeo escalonado
+MAX_DNS_EN_VUELO = 50
+
+
+def normalizar_url(url):
+    """Devuelve la URL lista para pedir (con esquema) o None si está vacía"""
+    if pd.isna(url) or not str(url).strip():
+        return None
+    url_str = str(url).strip()
+    if not url_str.lower().startswith(('http://', 'https://')):
+        url_str = 'http://' + url_str
+    return url_str
+
+
+def url_canonica(url):
+    """Clave del sitio: sin esquema ni "www.", host en minúsculas y sin "/" final (None si está vacía).
+
+    "zenoss.com" y "http://www.zenoss.com/" dan la misma clave y se verifican una sola vez.
+    """
+    url_str = normalizar_url(url)
+    if url_str is None:
+        return None
+    try:
+        partes = urlsplit(url_str)
+        host = (partes.hostname or "").lower()
+        puerto = partes.port
+    except ValueError:
+        return url_str.lower().rstrip("/")
+    if host.startswith("www."):
+        host = host[4:]
+    clave = host + (f":{puerto}" if puerto not in (None, 80, 443) else "") + partes.path.rstrip("/")
+    return clave + (f"?{partes.query}" if partes.query else "")
+
+
+# -----------------------------
+# Sondeo ligero: HEAD y GET en streaming
+# -----------------------------
+# Para saber si un sitio funciona basta el código de estado: se pide HEAD y,
+# sólo si el servidor responde con error (muchos rechazan HEAD con 405/501),
+# se confirma con un GET en streaming que se cierra tras las cabeceras sin
+# descargar el cuerpo.
+
+def _bytes_cabeceras(response):
+    """Aproxima los bytes de la línea de estado y cabeceras de una respuesta"""
+    return 15 + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+
+
+def _bytes_respuesta(response, cuerpo=0):
+    """Bytes de la respuesta final más los de las redirecciones intermedias"""
+    return sum(_bytes_cabeceras(r) for r in response.history) + _bytes_cabeceras(response) + cuerpo
+
+
+def sondear_url(url_str, timeout=10, registro=None):
+    """Devuelve el código de estado de la URL usando HEAD y GET en streaming como respaldo.
+
+    Si se pasa `registro` (lista), se agrega un dict por sondeo con el método
+    usado, los bytes transferidos y la latencia.
+    """
+    inicio = time.perf_counter()
+    sesion = obtener_sesion()
+    response = sesion.head(url_str, timeout=timeout, allow_redirects=True)
+    metodo, transferidos = "HEAD", _bytes_respuesta(response)
+
+    if response.status_code >= 400:
+        with sesion.get(url_str, timeout=timeout, allow_redirects=True, stream=True) as response:
+            metodo, transferidos = "HEAD+GET", transferidos + _bytes_respuesta(response)
+
+    if registro is not None:
+        registro.append({"url": url_str, "metodo": metodo, "status": response.status_code,
+                         "bytes": transferidos, "segundos": time.perf_counter() - inicio})
+    return response.status_code
+
+
+def pedir_url(url_str, timeout=10, registro=None):
+    """GET completo (comportamiento original); registra los bytes descargados"""
+    inicio = time.perf_counter()
+    response = obtener_sesion().get(url_str, timeout=timeout, allow_redirects=True)
+    if registro is not None:
+        registro.append({"url": url_str, "metodo": "GET", "status": response.status_code,
+                         "bytes": _bytes_respuesta(response, len(response.content)),
+                         "segundos": time.perf_counter() - inicio})
+    return response.status_code
+
+
+# -----------------------------
+# Concurrencia adaptativa (AIMD)
+# -----------------------------
+# El tope global de peticiones en vuelo no es fijo: se revisa por ventanas de
+# respuestas (tantas como el límite actual, o sea más o menos una "ronda").
+# Si en la ventana la tasa de timeouts y errores de conexión supera la
+# habitual de la corrida, o la latencia mediana de las respuestas se dispara
+# respecto a la mejor observada, el límite se reduce a la mitad; si no, crece
+# (duplicándose hasta la primera señal de saturación y después de a un 10%,
+# con un mínimo de 1, para no pasarse de largo cuando el límite es chico).
+# Los hosts muertos no frenan la verificación: sólo cuentan los fallos de
+# hosts que ya respondieron en la corrida (un host muerto falla con cualquier
+# carga), y aun así un rechazo que llega antes que una respuesta normal no
+# esperó en ninguna cola.
+
+MIN_EN_VUELO = 4
+MAX_EN_VUELO_ADAPTATIVO = 1000
+MIN_VENTANA = 20
+FRACCION_AUMENTO = 0.1
+FACTOR_REDUCCION = 0.5
+MARGEN_FALLOS = 0.1    # tasa de fallos por encima de la habitual que indica saturación
+FACTOR_LATENCIA = 2.0  # latencia mediana / mejor latencia que indica saturación
+ESTADOS_TIMEOUT = ("Timeout", "Connect Timeout", "Read Timeout")
+ESTADOS_SATURACION = ESTADOS_TIMEOUT + ("Connection Error",)
+
+
+class ControlConcurrencia:
+    """Semáforo de límite variable; con `adaptativo=False` queda fijo en `inicial`.
+
+    El nivel actual se registra en la instrumentación como
+    "verificacion.concurrencia" cada vez que cambia.
+    """
+
+    def __init__(self, inicial=MAX_EN_VUELO, minimo=MIN_EN_VUELO, maximo=MAX_EN_VUELO_ADAPTATIVO,
+                 adaptativo=True):
+        self.adaptativo = adaptativo
+        self.limite = inicial
+        self.minimo = min(minimo, inicial)
+        self.maximo = max(maximo, inicial) if adaptativo else inicial
+        self.en_vuelo = 0
+        self.limite_min = self.limite_max = inicial
+        self.reducciones = 0
+        self._arranque = True
+        self._esperando = deque()
+        self._latencias = []
+        self._respuestas = 0
+        self._fallos = 0
+        self._tasa_habitual = None
+        self._mejor_latencia = None
+        self._hosts_vivos = set()
+        nivel("verificacion.concurrencia", inicial)
+
+    async def adquirir(self):
+        if self.en_vuelo < self.limite and not self._esperando:
+            self.en_vuelo += 1
+            return
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperando.append(futuro)
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            if futuro.done() and not futuro.cancelled():
+                self.liberar()  # el turno llegó junto con la cancelación
+            raise
+
+    def liberar(self, estado=None, segundos=None, host=None):
+        """Devuelve el turno; con `estado` y `segundos` la respuesta cuenta para el ajuste"""
+        self.en_vuelo -= 1
+        if estado is not None and self.adaptativo:
+            self._observar(estado, segundos, host)
+        self._despertar()
+
+    def resumen(self):
+        return {"adaptativo": self.adaptativo, "limite": self.limite, "minimo": self.limite_min,
+                "maximo": self.limite_max, "reducciones": self.reducciones}
+
+    def _despertar(self):
+        # Cola FIFO propia (como asyncio.Semaphore) para no despertar a todos en cada turno
+        while self._esperando and self.en_vuelo < self.limite:
+            futuro = self._esperando.popleft()
+            if not futuro.done():
+                self.en_vuelo += 1
+                futuro.set_result(None)
+
+    def _observar(self, estado, segundos, host):
+        self._respuestas += 1
+        if estado not in ESTADOS_SATURACION:
+            self._hosts_vivos.add(host)
+            self._latencias.append(segundos)
+        elif host is None or host in self._hosts_vivos:
+            if estado != "Connection Error" or segundos >= (self._mejor_latencia or 0):
+                self._fallos += 1
+        if self._respuestas < max(MIN_VENTANA, self.limite):
+            return
+
+        tasa = self._fallos / self._respuestas
+        latencia = statistics.median(self._latencias) if self._latencias else None
+        self._respuestas, self._fallos, self._latencias = 0, 0, []
+        if self._tasa_habitual is None:
+            self._tasa_habitual = tasa
+        if self._mejor_latencia is None:
+            self._mejor_latencia = latencia
+
+        saturado = tasa > self._tasa_habitual + MARGEN_FALLOS or (
+            latencia is not None and latencia > FACTOR_LATENCIA * self._mejor_latencia
+        )
+        if latencia is not None:
+            # La referencia sigue despacio a la latencia actual para no quedar
+            # clavada en el mínimo si la red se vuelve más lenta de verdad
+            self._mejor_latencia = min(latencia, self._mejor_latencia + (latencia - self._mejor_latencia) * 0.05)
+        if saturado:
+            self._arranque = False
+            self.reducciones += 1
+            contar("verificacion.concurrencia_reducciones")
+            self._ajustar(max(self.minimo, int(self.limite * FACTOR_REDUCCION)))
+        else:
+            self._tasa_habitual += (tasa - self._tasa_habitual) * 0.2
+            aumento = self.limite if self._arranque else max(1, int(self.limite * FRACCION_AUMENTO))
+            self._ajustar(min(self.maximo, self.limite + aumento))
+
+    def _ajustar(self, limite):
+        if limite == self.limite:
+            return
+        self.limite = limite
+        self.limite_min = min(self.limite_min, limite)
+        self.limite_max = max(self.limite_max, limite)
+        nivel("verificacion.concurrencia", limite)
+
+
+def control_desde_entorno(max_en_vuelo=MAX_EN_VUELO):
+    """ControlConcurrencia según VERIFICACION_CONCURRENCIA ("adaptativa", por defecto, o "fija")"""
+    valor = os.getenv("VERIFICACION_CONCURRENCIA", "adaptativa").strip().lower()
+    if valor not in ("adaptativa", "fija"):
+        raise ValueError(f"VERIFICACION_CONCURRENCIA inválida: {valor!r} (usar 'adaptativa' o 'fija')")
+    return ControlConcurrencia(max_en_vuelo, adaptativo=valor == "adaptativa")
+
+
+# -----------------------------
+# Sondeo escalonado (DNS -> conexión -> lectura)
+# -----------------------------
+# Con un único timeout cada sitio muerto cuesta el timeout entero. En modo
+# escalonado cada host se resuelve primero una sola vez (un NXDOMAIN falla
+# al instante, sin ocupar turnos de la verificación); después la conexión
+# tiene su propio timeout corto (TIMEOUT_CONEXION) y el timeout largo sólo
+# corre para los hosts que aceptaron la conexión. Los estados distinguen
+# "DNS Error", "Connect Timeout" y "Read Timeout", y `estadisticas_sondeo`
+# lleva la cuenta de cada escalón y de los segundos ahorrados frente a
+# esperar el timeout completo en cada conexión que no responde.
+
+# Estas excepciones no existen en aiohttp < 3.10 / 3.11: ahí todo timeout es
+# "Read Timeout" y los errores de DNS de aiohttp quedan como "Connection Error"
+_TIMEOUT_CONEXION_AIOHTTP = getattr(aiohttp, "ConnectionTimeoutError", ())
+_DNS_AIOHTTP = getattr(aiohttp, "ClientConnectorDNSError", ())
+
+estadisticas_sondeo = {"dns": 0, "conexion": 0, "lectura": 0, "segundos_ahorrados": 0.0}
+_lock_sondeo = threading.Lock()
+
+
+def _es_ip(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class FiltroDNS:
+    """Primer escalón: resuelve cada host una vez (por event loop) y descarta los que no existen"""
+
+    def __init__(self, max_en_vuelo=MAX_DNS_EN_VUELO):
+        self._hosts = {}
+        self._semaforo = asyncio.Semaphore(max_en_vuelo)
+        # Hilos propios: el executor por defecto tiene pocos y lo comparten otras tareas
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_en_vuelo, thread_name_prefix="dns")
+
+    async def resuelve(self, host):
+        if _es_ip(host):
+            return True
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.ensure_future(self._consultar(host))
+        return await asyncio.shield(self._hosts[host])
+
+    async def _consultar(self, host):
+        loop = asyncio.get_running_loop()
+        async with self._semaforo:
+            try:
+                await loop.run_in_executor(self._executor, lambda: socket.getaddrinfo(host, None))
+                return True
+            except (socket.gaierror, UnicodeError, OSError):
+                # También EAI_AGAIN: el resolvedor ya agotó su propio timeout y
+                # aiohttp repetiría la misma espera. Los errores no se reutilizan
+                # entre corridas (ver estado.py), así que se reintentan en la próxima
+                return False
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False)
+
+
+def _anotar_sondeo(estado, segundos, timeout):
+    clave = {"DNS Error": "dns", "Connect Timeout": "conexion", "Read Timeout": "lectura"}.get(estado)
+    if clave is None:
+        return
+    with _lock_sondeo:
+        estadisticas_sondeo[clave] += 1
+        if clave == "conexion" and timeout:
+            estadisticas_sondeo["segundos_ahorrados"] += max(0.0, timeout - segundos)
+
+
+def reiniciar_estadisticas_sondeo():
+    with _lock_sondeo:
+        estadisticas_sondeo.update(dns=0, conexion=0, lectura=0, segundos_ahorrados=0.0)
+
+
+# -----------------------------
+# Verificación asíncrona de URLs
+# -----------------------------
+# Equivalente a `verificar_url` pero para listas grandes: todas las URLs se
+# verifican concurrentemente en un único event loop, con un tope global de
+# peticiones en vuelo (adaptativo, ver ControlConcurrencia) y un tope por host
+# para no saturar un mismo servidor. Con `escalonado=False` devuelve
+# exactamente las mismas tuplas (funciona, estado) que `verificar_url`.
+
+def _clasificar_excepcion(e, escalonado=False):
+    """Traduce excepciones de aiohttp a los mismos estados que `verificar_url` (o a los del sondeo escalonado)"""
+    if escalonado:
+        if isinstance(e, _TIMEOUT_CONEXION_AIOHTTP):
+            return "Connect Timeout"
+        if isinstance(e, asyncio.TimeoutError):
+            return "Read Timeout"
+        if isinstance(e, _DNS_AIOHTTP):
+            return "DNS Error"
+    if isinstance(e, asyncio.TimeoutError):
+        return "Timeout"
+    if isinstance(e, aiohttp.ClientConnectionError):
+        return "Connection Error"
+    if isinstance(e, aiohttp.ClientError):
+        return f"Request Error: {str(e)[:50]}"
+    return f"General Error: {str(e)[:50]}"
+
+
+async def _status_async(session, url_str, modo):
+    """Código de estado vía GET o, en modo "sonda", HEAD con GET de respaldo"""
+    if modo == "sonda":
+        async with session.head(url_str, allow_redirects=True) as response:
+            if response.status < 400:
+                return response.status
+    # Al salir del contexto sin leer el cuerpo la conexión se libera sin descargarlo
+    async with session.get(url_str, allow_redirects=True) as response:
+        return response.status
+
+
+async def _verificar(session, url, control, semaforos_host, max_por_host, modo, dns=None):
+    """Con `dns` (FiltroDNS) se usa el sondeo escalonado"""
+    url_str = normalizar_url(url)
+    if url_str is None:
+        return False, "Empty URL"
+
+    host = urlparse(url_str).hostname or url_str
+    if dns is not None and not await dns.resuelve(host):
+        _anotar_sondeo("DNS Error", 0.0, None)
+        contar("verificacion.DNS Error")
+        return False, "DNS Error"
+    semaforo_host = semaforos_host.setdefault(host, asyncio.Semaphore(max_por_host))
+
+    # Primero el turno del host: quien espera a un host ocupado no retiene cupo global
+    async with semaforo_host:
+        await control.adquirir()
+        estado, inicio = None, time.perf_counter()
+        try:
+            resultado = await _verificar_sin_espera(session, url_str, modo, dns is not None)
+            estado = resultado[1]
+        finally:
+            segundos = time.perf_counter() - inicio
+            control.liberar(estado, segundos, host)
+    if dns is not None:
+        _anotar_sondeo(resultado[1], segundos, session.timeout.total)
+    # Contador por tipo de estado ("Error 404", "Timeout", "Request Error"...)
+    contar(f"verificacion.{resultado[1].split(':')[0]}")
+    return resultado
+
+
+@instrumentar("verificacion.url")
+async def _verificar_sin_espera(session, url_str, modo, escalonado=False):
+    """Petición de una URL ya con su turno (la latencia medida no incluye la cola de semáforos)"""
+    try:
+        status = await _status_async(session, url_str, modo)
+        if status == 404:
+            return False, "Error 404"
+        elif status >= 400:
+            return False, f"Error {status}"
+        else:
+            return True, "OK"
+    except Exception as e:
+        return False, _clasificar_excepcion(e, escalonado)
+
+
+async def _avisar(i, corrutina, al_completar):
+    resultado = await corrutina
+    al_completar(i, resultado)
+    return resultado
+
+
+async def verificar_urls_async(urls, max_en_vuelo=MAX_EN_VUELO, max_por_host=MAX_POR_HOST,
+                               timeout=None, connect_timeout=None, modo="sonda", al_completar=None,
+                               cache=None, control=None, escalonado=True):
+    """Verifica una lista de URLs concurrentemente; devuelve las tuplas en el mismo orden.
+
+    Con `escalonado` (por defecto) se usa el sondeo DNS -> conexión -> lectura;
+    `connect_timeout` reemplaza entonces a TIMEOUT_CONEXION.
+
+    `control` (ControlConcurrencia) permite conservar el nivel aprendido entre
+    llamadas; sin él se crea uno adaptativo que arranca en `max_en_vuelo`.
+
+    Las URLs con la misma `url_canonica` se piden una sola vez y el resultado
+    se copia a todas; con `cache` (EstadoVerificacion) tampoco se piden las
+    verificadas hace poco, y los resultados nuevos se guardan en ella.
+
+    Si se pasa `al_completar(posicion, resultado)`, se llama por cada URL en
+    cuanto termina (posición dentro de `urls`). Sin `timeout` se usa TIMEOUT
+    (leído al llamar, así los benchmarks pueden acortarlo).
+    """
+    if timeout is None:
+        timeout = TIMEOUT
+    if control is None:
+        control = ControlConcurrencia(max_en_vuelo)
+    claves = [url_canonica(url) for url in urls]
+    posiciones = defaultdict(list)
+    for i, clave in enumerate(claves):
+        posiciones[clave].append(i)
+    resultados = {None: (False, "Empty URL")}
+    if cache is not None:
+        resultados.update(cache.obtener_varios(clave for clave in posiciones if clave is not None))
+    contar("verificacion.urls_repetidas", len(urls) - len(posiciones))
+    contar("verificacion.cache_aciertos", len(resultados) - 1)
+
+    def repartir(clave, resultado):
+        resultados[clave] = resultado
+        if al_completar is not None:
+            for i in posiciones[clave]:
+                al_completar(i, resultado)
+
+    for clave in [clave for clave in posiciones if clave in resultados]:
+        repartir(clave, resultados[clave])
+    # Una URL representativa (la primera) por sitio pendiente
+    pendientes = [(clave, urls[filas[0]]) for clave, filas in posiciones.items() if clave not in resultados]
+    if pendientes:
+        nuevos = await _verificar_distintas(pendientes, control, max_por_host, timeout,
+                                            connect_timeout, modo, repartir, escalonado)
+        if cache is not None:
+            cache.guardar_varios(nuevos)
+    return [resultados[clave] for clave in claves]
+
+
+async def _verificar_distintas(pendientes, control, max_por_host, timeout, connect_timeout, modo, repartir,
+                               escalonado=True):
+    """Verifica [(clave, url)] y devuelve {clave: resultado}; `repartir(clave, resultado)` al terminar cada una"""
+    semaforos_host = {}
+    dns = FiltroDNS() if escalonado else None
+    try:
+        async with _sesion_async(control.maximo, max_por_host, timeout, connect_timeout, escalonado) as session:
+            tareas = [
+                _avisar(clave, _verificar(session, url, control, semaforos_host, max_por_host, modo, dns), repartir)
+                for clave, url in pendientes
+            ]
+            return dict(zip((clave for clave, _ in pendientes), await asyncio.gather(*tareas)))
+    finally:
+        if dns is not None:
+            dns.cerrar()
+
+
+def _sesion_async(max_en_vuelo, max_por_host, timeout, connect_timeout, escalonado=False):
+    if escalonado:
+        # Conexión con timeout corto propio; la lectura conserva el timeout completo
+        sock_connect = min(TIMEOUT_CONEXION if connect_timeout is None else connect_timeout, timeout)
+        cliente_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=sock_connect, sock_read=timeout)
+    else:
+        cliente_timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+    connector = aiohttp.TCPConnector(limit=max_en_vuelo, limit_per_host=max_por_host,
+                                     use_dns_cache=True, ttl_dns_cache=DNS_TTL)
+    return aiohttp.ClientSession(timeout=cliente_timeout, connector=connector)
+
+
+def verificar_urls(urls, **config):
+    """Versión síncrona de `verificar_urls_async` para usar desde los scripts"""
+    return asyncio.run(verificar_urls_async(list(urls), **config))
+
+
+# -----------------------------
+# Lectura de portadas
+# -----------------------------
+# Un 200 no dice de quién es el sitio: un dominio aparcado o en venta responde
+# igual que uno real. Para juzgarlo hace falta el título y algo del texto de
+# la portada; se leen sólo los primeros MAX_BYTES_PORTADA (el <title> y el
+# principio del cuerpo) y sin scripts ni estilos.
+
+MAX_BYTES_PORTADA = 64 * 1024
+MAX_TEXTO_PORTADA = 1000
+_TITULO = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+_DESCRIPCION = re.compile(r"<meta[^>]+name=[\"']description[\"'][^>]*content=[\"']([^\"']*)", re.I)
+_NO_TEXTO = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>|<!--.*?-->", re.I | re.S)
+_ETIQUETA = re.compile(r"<[^>]+>")
+
+
+def _texto_plano(fragmento):
+    return " ".join(html.unescape(_ETIQUETA.sub(" ", fragmento)).split())
+
+
+def extraer_portada(cuerpo):
+    """(título, texto) de un HTML: la descripción meta seguida del texto visible, recortado"""
+    titulo = _TITULO.search(cuerpo)
+    descripcion = _DESCRIPCION.search(cuerpo)
+    texto = _texto_plano(_NO_TEXTO.sub(" ", _TITULO.sub(" ", cuerpo)))
+    if descripcion:
+        texto = f"{html.unescape(descripcion.group(1)).strip()} {texto}"
+    return (_texto_plano(titulo.group(1)) if titulo else ""), texto[:MAX_TEXTO_PORTADA]
+
+
+async def _leer_portada(session, url, semaforo):
+    async with semaforo:
+        try:
+            async with session.get(url, allow_redirects=True) as response:
+                if response.status >= 400:
+                    return "", ""
+                cuerpo = await response.content.read(MAX_BYTES_PORTADA)
+                return extraer_portada(cuerpo.decode(response.charset or "utf-8", errors="replace"))
+        except Exception:
+            return "", ""
+
+
+async def leer_portadas_async(urls, max_en_vuelo=MAX_EN_VUELO, max_por_host=MAX_POR_HOST, timeout=None):
+    """(título, texto) de la portada de cada URL, en el mismo orden ("", "" si no se pudo leer)"""
+    if timeout is None:
+        timeout = TIMEOUT
+    semaforo = asyncio.Semaphore(max_en_vuelo)
+    async with _sesion_async(max_en_vuelo, max_por_host, timeout, None) as session:
+        return await asyncio.gather(*(_leer_portada(session, url, semaforo) for url in urls))
+
+
+# -----------------------------
+# Verificación continua (pipeline)
+# -----------------------------
+# Para encadenar con la búsqueda sin esperar a que termine: las filas entran
+# de a una por una cola acotada (quien las envía se bloquea si la
+# verificación va atrasada) y un event loop en su propio hilo las verifica
+# con el mismo control de concurrencia, el mismo tope por host, la misma
+# deduplicación por URL canónica y la misma caché que `verificar_urls_async`.
+
+TAMANO_COLA = 1000
+LOTE_CACHE = 500  # resultados nuevos por escritura en la caché
+
+
+class VerificadorContinuo:
+    """Verifica filas a medida que llegan; `al_completar(fila, resultado)` se llama desde su hilo"""
+
+    def __init__(self, al_completar, cache=None, max_en_vuelo=MAX_EN_VUELO, max_por_host=MAX_POR_HOST,
+                 timeout=None, connect_timeout=None, modo="sonda", tamano_cola=TAMANO_COLA, control=None,
+                 escalonado=True):
+        self.al_completar = al_completar
+        self.cache = cache
+        self.control = ControlConcurrencia(max_en_vuelo) if control is None else control
+        self.max_por_host = max_por_host
+        self.timeout = TIMEOUT if timeout is None else timeout
+        self.connect_timeout = connect_timeout
+        self.modo = modo
+        self.escalonado = escalonado
+        self.tamano_cola = tamano_cola
+        self._loop = asyncio.new_event_loop()
+        self._entrada = asyncio.Queue(maxsize=tamano_cola)
+        self._resultados = {}   # clave canónica -> resultado
+        self._esperando = {}    # clave canónica en vuelo -> filas que la comparten
+        self._nuevos = {}
+        self._error = None
+        self._hilo = threading.Thread(target=self._correr, name="verificacion", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def enviar(self, fila, url):
+        """Encola una fila (bloquea mientras la cola esté llena)"""
+        self._encolar((fila, url))
+
+    def _encolar(self, item):
+        futuro = asyncio.run_coroutine_threadsafe(self._entrada.put(item), self._loop)
+        while True:
+            try:
+                futuro.result(timeout=0.5)
+                return
+            except concurrent.futures.TimeoutError:
+                if self._error is not None or not self._hilo.is_alive():
+                    futuro.cancel()
+                    raise RuntimeError("La verificación se detuvo") from self._error
+
+    def cerrar(self):
+        """Espera a que terminen las filas enviadas (y relanza el error del hilo, si lo hubo)"""
+        if self._hilo.is_alive():
+            self._encolar(None)
+            self._hilo.join()
+        if self._error is not None:
+            raise self._error
+
+    def _correr(self):
+        try:
+            self._loop.run_until_complete(self._principal())
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._loop.close()
+
+    def _repartir(self, clave, resultado):
+        self._resultados[clave] = resultado
+        for fila in self._esperando.pop(clave):
+            self.al_completar(fila, resultado)
+
+    async def _uno(self, session, clave, url, semaforos_host, dns, cupo):
+        try:
+            resultado = await _verificar(session, url, self.control, semaforos_host, self.max_por_host,
+                                         self.modo, dns)
+            self._nuevos[clave] = resultado
+            if self.cache is not None and len(self._nuevos) >= LOTE_CACHE:
+                self.cache.guardar_varios(self._nuevos)
+                self._nuevos = {}
+            self._repartir(clave, resultado)
+        except BaseException as e:
+            self._error = e  # los productores dejan de encolar en vez de bloquearse
+            raise
+        finally:
+            cupo.release()
+
+    async def _principal(self):
+        semaforos_host = {}
+        dns = FiltroDNS() if self.escalonado else None
+        # Tope de sitios aceptados y sin terminar: la cola de entrada sólo avanza si hay lugar
+        cupo = asyncio.Semaphore(self.tamano_cola)
+        tareas = set()
+        try:
+            async with _sesion_async(self.control.maximo, self.max_por_host, self.timeout,
+                                     self.connect_timeout, self.escalonado) as session:
+                while True:
+                    item = await self._entrada.get()
+                    if item is None:
+                        break
+                    fila, url = item
+                    clave = url_canonica(url)
+                    if clave is None:
+                        self.al_completar(fila, (False, "Empty URL"))
+                    elif clave in self._resultados:
+                        contar("verificacion.urls_repetidas")
+                        self.al_completar(fila, self._resultados[clave])
+                    elif clave in self._esperando:
+                        contar("verificacion.urls_repetidas")
+                        self._esperando[clave].append(fila)
+                    else:
+                        self._esperando[clave] = [fila]
+                        guardado = self.cache.obtener(clave) if self.cache is not None else None
+                        if guardado is not None:
+                            contar("verificacion.cache_aciertos")
+                            self._repartir(clave, guardado)
+                            continue
+                        await cupo.acquire()
+                        tarea = asyncio.create_task(self._uno(session, clave, normalizar_url(url), semaforos_host,
+                                                              dns, cupo))
+                        tareas.add(tarea)
+                        tarea.add_done_callback(tareas.discard)
+                await asyncio.gather(*tareas)
+        finally:
+            if dns is not None:
+                dns.cerrar()
+        if self.cache is not None and self._nuevos:
+            self.cache.guardar_varios(self._nuevos)